@@ -0,0 +1,271 @@
+# batch_jobs.py
+# Background batch-scoring jobs, checkpointed per chunk under jobs/<job_id>/.
+#   python batch_jobs.py list [--jobs-dir jobs]
+#   python batch_jobs.py remove <job_id> [--jobs-dir jobs]
+#   python batch_jobs.py prune [--jobs-dir jobs]
+import os
+import json
+import time
+import shutil
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from batch_stream import DEFAULT_CHUNK_ROWS, score_chunk
+from repair_pipeline import sha256_hex, write_atomic
+
+DEFAULT_JOBS_DIR = "jobs"
+JOB_VERSION = 1
+# retention: older jobs beyond the newest MAX_JOBS, or older than RETENTION_DAYS, are deleted on submit
+MAX_JOBS = 20
+RETENTION_DAYS = 7
+# on disk; "interrupted" is reported for queued/running jobs that no thread of this process owns
+QUEUED, RUNNING, DONE, CANCELLED, FAILED, INTERRUPTED = "queued", "running", "done", "cancelled", "failed", "interrupted"
+RESUMABLE = (CANCELLED, FAILED, INTERRUPTED)
+
+
+def job_id_for(data, key):
+    """Content id: same input bytes + same scoring setup (models, options) -> same job and result."""
+    return sha256_hex(sha256_hex(data).encode() + json.dumps(key, sort_keys=True, default=str).encode())[:16]
+
+
+def make_chunk_scorer(feature_list, processed_df=None, encoding=None, **score_kwargs):
+    """fn(chunk) -> chunk with prediction columns; score_kwargs go to batch_stream.score_chunk."""
+    def score(chunk):
+        if encoding is not None:
+            chunk = encoding.encode(chunk, amenity_bits=False)
+        return score_chunk(chunk, feature_list, processed_df, **score_kwargs)
+    return score
+
+
+class BatchJobQueue:
+    """
+    Runs batch-scoring jobs on a background thread, so they outlive the Streamlit rerun (and the
+    session) that started them.
+
+    Each job is a directory: the uploaded input.csv, a job.json manifest and one part file per
+    scored chunk. The manifest is rewritten (atomically) after every chunk, so a job that crashed,
+    was cancelled or whose process restarted resumes from its last completed chunk. Finished jobs
+    keep only result.csv; submitting the same input with the same models and options returns the
+    finished job instead of scoring it again. Every submit prunes jobs past the retention limits
+    (max_jobs, retention_days); running jobs are never pruned.
+    """
+
+    def __init__(self, jobs_dir=DEFAULT_JOBS_DIR, max_workers=1, max_jobs=MAX_JOBS, retention_days=RETENTION_DAYS):
+        self.jobs_dir = jobs_dir
+        self.max_jobs = max_jobs
+        self.retention_days = retention_days
+        # one job at a time by default: a job's scorer already uses every core it is given
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-job")
+        self._active = {}  # job_id -> (future, cancel event)
+        self._lock = threading.Lock()
+
+    # -------------------------
+    # Paths / manifest
+    # -------------------------
+    def job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+
+    def _path(self, job_id, name):
+        return os.path.join(self.job_dir(job_id), name)
+
+    def result_path(self, job_id):
+        return self._path(job_id, "result.csv")
+
+    def _read(self, job_id):
+        try:
+            with open(self._path(job_id, "job.json")) as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return job if job.get("version") == JOB_VERSION else None
+
+    def _write(self, job):
+        job["updated"] = time.time()
+        write_atomic(self._path(job["id"], "job.json"), lambda f: json.dump(job, f, indent=2), mode="w")
+
+    def _is_active_locked(self, job_id):
+        entry = self._active.get(job_id)
+        return entry is not None and not entry[0].done()
+
+    def _is_active(self, job_id):
+        with self._lock:
+            return self._is_active_locked(job_id)
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    def submit(self, data, score_fn, key, name="", chunk_rows=DEFAULT_CHUNK_ROWS):
+        """
+        Queue scoring of CSV bytes with score_fn(chunk) -> chunk. key (JSON-able: model fingerprint,
+        options) identifies the scoring setup. Returns the job id; a finished or running job with the
+        same id is returned as is, an interrupted one is resumed.
+        """
+        job_id = job_id_for(data, key)
+        # check and start under one lock hold: two sessions submitting the same file get one run
+        with self._lock:
+            job = self._read(job_id)
+            if job is not None and job["status"] == DONE and os.path.exists(self.result_path(job_id)):
+                return job_id
+            if self._is_active_locked(job_id):
+                return job_id
+            self._prepare(job_id, job, data, key, name, chunk_rows)
+            self._start_locked(job_id, score_fn)
+        self.prune(keep=(job_id,))
+        return job_id
+
+    def _prepare(self, job_id, job, data, key, name, chunk_rows):
+        if job is None or job["status"] == DONE:  # new, or finished but its result was deleted
+            os.makedirs(self._path(job_id, "parts"), exist_ok=True)
+            write_atomic(self._path(job_id, "input.csv"), lambda f: f.write(data))
+            job = {
+                "version": JOB_VERSION, "id": job_id, "name": name, "created": time.time(),
+                "status": QUEUED, "key": json.loads(json.dumps(key, default=str)),
+                "chunk_rows": int(chunk_rows), "rows_estimate": max(0, data.count(b"\n") - 1),
+                "rows_done": 0, "chunks": [], "seconds": 0.0, "error": None,
+            }
+            self._write(job)
+
+    def resume(self, job_id, score_fn, key):
+        """Continue a cancelled, failed or interrupted job from its last completed chunk."""
+        job = self._read(job_id)
+        if job is None:
+            raise KeyError(f"No such job: {job_id}")
+        if job["key"] != json.loads(json.dumps(key, default=str)):
+            raise ValueError("The models or options changed since this job started; submit the file again")
+        with self._lock:
+            if not self._is_active_locked(job_id) and job["status"] != DONE:
+                self._start_locked(job_id, score_fn)
+        return job_id
+
+    def cancel(self, job_id):
+        """Stop after the chunk being scored; completed chunks are kept for resume()."""
+        with self._lock:
+            entry = self._active.get(job_id)
+        if entry is not None:
+            entry[1].set()
+
+    def get(self, job_id):
+        """The job's manifest (status, rows_done, rows_estimate, ...) or None."""
+        job = self._read(job_id)
+        if job is not None and job["status"] in (QUEUED, RUNNING) and not self._is_active(job_id):
+            job["status"] = INTERRUPTED
+        return job
+
+    def jobs(self, job_ids=None):
+        """Jobs on disk, newest first: every job, or only those in job_ids (e.g. one session's jobs)."""
+        if job_ids is None:
+            try:
+                job_ids = os.listdir(self.jobs_dir)
+            except OSError:
+                return []
+        jobs = [job for job in (self.get(i) for i in set(job_ids)) if job is not None]
+        return sorted(jobs, key=lambda job: job["created"], reverse=True)
+
+    def prune(self, keep=()):
+        """Delete inactive jobs beyond the newest max_jobs or older than retention_days; returns their ids."""
+        cutoff = time.time() - self.retention_days * 86400 if self.retention_days is not None else None
+        removed = []
+        for n, job in enumerate(self.jobs()):
+            if job["id"] in keep or self._is_active(job["id"]):
+                continue
+            too_many = self.max_jobs is not None and n >= self.max_jobs
+            if too_many or (cutoff is not None and job.get("updated", job["created"]) < cutoff):
+                self.remove(job["id"])
+                removed.append(job["id"])
+        return removed
+
+    def remove(self, job_id):
+        self.cancel(job_id)
+        with self._lock:
+            entry = self._active.get(job_id)
+        if entry is not None:
+            entry[0].result()  # wait for the cancelled chunk, so the directory is not in use
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    # -------------------------
+    # Worker
+    # -------------------------
+    def _start_locked(self, job_id, score_fn):
+        cancel = threading.Event()
+        future = self._pool.submit(self._run, job_id, score_fn, cancel)
+        self._active[job_id] = (future, cancel)
+
+    def _run(self, job_id, score_fn, cancel):
+        job = self._read(job_id)
+        if job is None or job["status"] == DONE:  # removed, or finished by an earlier run
+            return None if job is None else DONE
+        # keep the checkpointed chunks up to the first one whose part file is missing
+        chunks = []
+        for c in job["chunks"]:
+            if not os.path.exists(self._path(job_id, c["part"])):
+                break
+            chunks.append(c)
+        job.update(status=RUNNING, chunks=chunks, rows_done=sum(c["rows"] for c in chunks), error=None)
+        self._write(job)
+        t0 = time.perf_counter()
+        seconds = job["seconds"]
+        try:
+            reader = pd.read_csv(self._path(job_id, "input.csv"), chunksize=job["chunk_rows"])
+            for index, chunk in enumerate(reader):
+                if index < len(chunks):
+                    continue  # scored before the interruption
+                if cancel.is_set():
+                    job["status"] = CANCELLED
+                    break
+                chunk = score_fn(chunk)
+                part = os.path.join("parts", f"part-{index:05d}.csv")
+                text = chunk.to_csv(index=False, header=(index == 0)).encode("utf-8")
+                write_atomic(self._path(job_id, part), lambda f: f.write(text))
+                job["chunks"].append({"index": index, "rows": len(chunk), "part": part})
+                job["rows_done"] += len(chunk)
+                job["seconds"] = seconds + time.perf_counter() - t0
+                self._write(job)
+            else:
+                self._assemble(job)
+                job["status"] = DONE
+        except Exception as e:
+            job.update(status=FAILED, error=f"{type(e).__name__}: {e}")
+        job["seconds"] = seconds + time.perf_counter() - t0
+        self._write(job)
+        return job["status"]
+
+    def _assemble(self, job):
+        """Concatenate the part files into result.csv, then drop the parts and the input copy."""
+        def write(f):
+            for c in job["chunks"]:
+                with open(self._path(job["id"], c["part"]), "rb") as part:
+                    shutil.copyfileobj(part, f, 1 << 20)
+        write_atomic(self.result_path(job["id"]), write)
+        shutil.rmtree(self._path(job["id"], "parts"), ignore_errors=True)
+        os.remove(self._path(job["id"], "input.csv"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect checkpointed batch-scoring jobs")
+    parser.add_argument("command", choices=["list", "remove", "prune"])
+    parser.add_argument("job_id", nargs="?")
+    parser.add_argument("--jobs-dir", default=DEFAULT_JOBS_DIR)
+    args = parser.parse_args()
+
+    queue = BatchJobQueue(args.jobs_dir)
+    if args.command == "remove":
+        if not args.job_id:
+            parser.error("remove needs a job id")
+        queue.remove(args.job_id)
+        print(f"Removed {args.job_id}")
+        return
+    if args.command == "prune":
+        removed = queue.prune()
+        print(f"Removed {len(removed)} job(s) past {queue.max_jobs} jobs / {queue.retention_days} days")
+        return
+    for job in queue.jobs():
+        created = time.strftime("%Y-%m-%d %H:%M", time.localtime(job["created"]))
+        print(f"{job['id']}  {created}  {job['status']:<11} {job['rows_done']:>10,} / ~{job['rows_estimate']:,} rows  "
+              f"{job['seconds']:7.1f}s  {job['name']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# batch_stream.py
+import time
+import tempfile
+
+import pandas as pd
+
+from feature_schema import FeatureSchema
+from scoring import align_inputs_to_features
+from prediction_cache import score_shared_cached
+
+DEFAULT_CHUNK_ROWS = 50_000
+# Results above this size spill from memory to a temp file on disk
+SPOOL_MAX_BYTES = 64 * 1024 * 1024
+
+
+def add_scored_columns(df_out, scored):
+    """Append the prediction columns of a score_shared() result to df_out in place."""
+    if scored["clf_pred"] is not None:
+        df_out["Good_Investment_Pred"] = scored["clf_pred"]
+        if scored["clf_proba"] is not None:
+            df_out["Good_Investment_Prob"] = scored["clf_proba"]
+    if scored["reg_pred"] is not None:
+        df_out["Future_Price_5Yrs_Pred"] = scored["reg_pred"]
+        bands = scored["bands"]
+        if bands is not None:
+            df_out["Future_Price_5Yrs_Std"] = bands["std"]
+            if "quantiles" in bands:
+                df_out["Future_Price_5Yrs_P10"] = bands["quantiles"][0.1]
+                df_out["Future_Price_5Yrs_P90"] = bands["quantiles"][0.9]
+    return df_out
+
+
+def score_chunk(chunk, feature_list, processed_df=None, clf_model=None, reg_model=None, schema=None,
+                with_uncertainty=False, engine="sklearn", cache=None, fingerprint=None, stage_seconds=None,
+                scorer=None):
+    """
+    Align one chunk and append prediction columns to it in place.
+    The chunk is owned by the reader, so no defensive copy is made.
+    With a PredictionCache (opt-in: pass one only when chunks repeat rows), duplicate and previously
+    seen rows are not scored again; without one the chunk goes straight to the scorer.
+    stage_seconds (dict), when given, accumulates time spent per stage.
+    scorer (e.g. a ParallelScorer) replaces score_shared for the rows that need scoring.
+    """
+    t0 = time.perf_counter()
+    X_chunk = align_inputs_to_features(chunk, feature_list, processed_df, schema=schema)
+    t1 = time.perf_counter()
+    scored = score_shared_cached(X_chunk, clf_model=clf_model, reg_model=reg_model, cache=cache,
+                                 fingerprint=fingerprint, with_uncertainty=with_uncertainty, engine=engine,
+                                 scorer=scorer)
+    add_scored_columns(chunk, scored)
+    if stage_seconds is not None:
+        stage_seconds["align"] = stage_seconds.get("align", 0.0) + (t1 - t0)
+        stage_seconds["score"] = stage_seconds.get("score", 0.0) + (time.perf_counter() - t1)
+        for name, seconds in scored["timings"].items():
+            stage_seconds[f"score: {name}"] = stage_seconds.get(f"score: {name}", 0.0) + seconds
+    return chunk
+
+
+def stream_batch_predictions(source, feature_list, processed_df=None, clf_model=None, reg_model=None,
+                             chunk_rows=DEFAULT_CHUNK_ROWS, progress_callback=None, preview_rows=5,
+                             schema=None, with_uncertainty=False, engine="sklearn", cache=None, fingerprint=None,
+                             scorer=None, encoding=None):
+    """
+    Score a CSV (path or file-like) chunk by chunk and write results incrementally.
+
+    Only one chunk of input, its aligned copy and its CSV text are alive at any time.
+    progress_callback(rows_done, rows_per_sec) is called after each chunk.
+    encoding (a FrameEncoding) puts each chunk on processed_df's compact dtypes before alignment.
+    Returns (spooled_file_positioned_at_0, stats_dict, preview_df); stats["stage_seconds"] holds
+    the time spent reading, aligning, scoring and writing, summed over chunks.
+    """
+    if schema is None:
+        schema = FeatureSchema.from_processed(feature_list, processed_df)
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode="w+b")
+    rows_done = 0
+    n_chunks = 0
+    preview = None
+    stage_seconds = {"read_csv": 0.0}
+    t0 = time.perf_counter()
+    try:
+        reader = iter(pd.read_csv(source, chunksize=int(chunk_rows)))
+        while True:
+            t_read = time.perf_counter()
+            chunk = next(reader, None)
+            stage_seconds["read_csv"] += time.perf_counter() - t_read
+            if chunk is None:
+                break
+            if encoding is not None:
+                t_encode = time.perf_counter()
+                chunk = encoding.encode(chunk, amenity_bits=False)
+                stage_seconds["encode"] = stage_seconds.get("encode", 0.0) + (time.perf_counter() - t_encode)
+            chunk = score_chunk(chunk, feature_list, processed_df, clf_model, reg_model, schema=schema,
+                                with_uncertainty=with_uncertainty, engine=engine, cache=cache, fingerprint=fingerprint,
+                                stage_seconds=stage_seconds, scorer=scorer)
+            t_write = time.perf_counter()
+            out.write(chunk.to_csv(index=False, header=(n_chunks == 0)).encode("utf-8"))
+            stage_seconds["to_csv"] = stage_seconds.get("to_csv", 0.0) + (time.perf_counter() - t_write)
+            if preview is None:
+                preview = chunk.head(preview_rows)
+            rows_done += len(chunk)
+            n_chunks += 1
+            if progress_callback is not None:
+                elapsed = time.perf_counter() - t0
+                progress_callback(rows_done, rows_done / elapsed if elapsed > 0 else 0.0)
+    except Exception:
+        out.close()
+        raise
+    elapsed = time.perf_counter() - t0
+    out.seek(0)
+    stats = {
+        "rows": rows_done,
+        "chunks": n_chunks,
+        "seconds": elapsed,
+        "rows_per_sec": rows_done / elapsed if elapsed > 0 else 0.0,
+        "spilled_to_disk": bool(getattr(out, "_rolled", False)),
+        "stage_seconds": stage_seconds,
+    }
+    return out, stats, preview
@@ -0,0 +1,59 @@
+# bench_alignment.py
+# Micro-benchmark: feature alignment with a schema rebuilt per call (the old behaviour)
+# vs. a FeatureSchema built once at startup.
+#   python bench_alignment.py [--rows 1000000] [--repeat 50]
+import os
+import time
+import argparse
+
+import pandas as pd
+
+from feature_schema import FeatureSchema
+from scoring import align_inputs_to_features, infer_feature_list_from_models
+from synthetic_data import make_synthetic_properties
+
+PROCESSED_CSV = "data/final_data.csv"
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feature alignment micro-benchmark")
+    parser.add_argument("--rows", type=int, default=100_000, help="rows in the batch case")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if os.path.exists(PROCESSED_CSV):
+        processed_df = pd.read_csv(PROCESSED_CSV)
+        print(f"Using {PROCESSED_CSV} ({len(processed_df):,} rows) as training data")
+    else:
+        processed_df = make_synthetic_properties(200_000)
+        print(f"{PROCESSED_CSV} not found; using {len(processed_df):,} synthetic rows")
+    feature_list = infer_feature_list_from_models(processed_df, None, None)
+
+    single = processed_df[feature_list].head(1).rename(columns={"Size_in_SqFt": "sqft", "BHK": "bhk"})
+    single = single.drop(columns=["Parking_Space"], errors="ignore")
+    batch = make_synthetic_properties(args.rows, seed=1)[feature_list]
+
+    t0 = time.perf_counter()
+    schema = FeatureSchema.from_processed(feature_list, processed_df)
+    build = time.perf_counter() - t0
+    print(f"\nSchema build (once): {build * 1e3:.2f} ms")
+
+    print(f"\n{'case':<10}{'per-call schema':>18}{'prebuilt schema':>18}{'speedup':>10}")
+    for name, frame, repeat in (("1 row", single, args.repeat), (f"{args.rows:,} rows", batch, max(3, args.repeat // 10))):
+        old = best_of(lambda: align_inputs_to_features(frame, feature_list, processed_df), repeat)
+        new = best_of(lambda: align_inputs_to_features(frame, feature_list, schema=schema), repeat)
+        print(f"{name:<10}{old * 1e3:>15.3f} ms{new * 1e3:>15.3f} ms{old / new:>9.1f}x")
+        print(f"{'':<10}{old / len(frame) * 1e6:>15.3f} us{new / len(frame) * 1e6:>15.3f} us  (per row)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# bench_forest_eval.py
+# Forest-stage benchmark: sklearn's per-tree predict vs. the vectorized NumPy evaluator
+# (forest_eval.py) on the same pre-transformed matrix.
+#   python bench_forest_eval.py [--sizes 1,1000,1000000] [--repeat 5]
+import os
+import time
+import argparse
+
+import numpy as np
+
+from model_registry import try_load_model
+from shared_inference import split_pipeline
+from compact_forest import compile_forest
+from synthetic_data import make_synthetic_properties, train_synthetic_pipelines
+
+MODEL_PATHS = {"classifier": "models/classifier_pipeline.pkl", "regressor": "models/regressor_pipeline.pkl"}
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def load_pipelines():
+    models = {}
+    for name, path in MODEL_PATHS.items():
+        if os.path.exists(path):
+            model, err = try_load_model(path)
+            if model is not None:
+                models[name] = model
+    if len(models) == len(MODEL_PATHS):
+        print("Using models/*.pkl")
+        return models
+    print("models/*.pkl not found; training synthetic pipelines (100 trees)")
+    clf, reg, _ = train_synthetic_pipelines()
+    return {"classifier": clf, "regressor": reg}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sklearn vs. NumPy forest evaluation benchmark")
+    parser.add_argument("--sizes", default="1,1000,1000000", help="comma-separated batch sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    models = load_pipelines()
+    rows = make_synthetic_properties(max(sizes), seed=1)
+
+    print(f"\n{'model':<12}{'rows':>10}{'sklearn':>14}{'numpy':>14}{'speedup':>10}{'max |diff|':>13}")
+    for name, model in models.items():
+        preproc, forest = split_pipeline(model)
+        t0 = time.perf_counter()
+        compiled = compile_forest(forest)
+        print(f"{name}: compiled {compiled.n_trees} trees / {compiled.n_nodes:,} nodes in "
+              f"{(time.perf_counter() - t0) * 1e3:.1f} ms (once per loaded model)")
+        X_all = preproc.transform(rows[list(preproc.feature_names_in_)]) if preproc is not None else rows
+        is_clf = hasattr(forest, "predict_proba") and hasattr(forest, "classes_")
+        for n in sizes:
+            X = X_all[:n]
+            repeat = args.repeat if n < 100_000 else 1
+            if is_clf:
+                ref, fast = forest.predict_proba(X), compiled.predict_proba(X)
+                t_sk = best_of(lambda: forest.predict_proba(X), repeat)
+                t_np = best_of(lambda: compiled.predict_proba(X), repeat)
+            else:
+                ref, fast = forest.predict(X), compiled.predict(X)
+                t_sk = best_of(lambda: forest.predict(X), repeat)
+                t_np = best_of(lambda: compiled.predict(X), repeat)
+            diff = float(np.max(np.abs(np.asarray(ref) - np.asarray(fast))))
+            print(f"{name:<12}{n:>10,}{t_sk * 1e3:>11.2f} ms{t_np * 1e3:>11.2f} ms{t_sk / t_np:>9.1f}x{diff:>13.2e}")
+
+
+if __name__ == "__main__":
+    main()
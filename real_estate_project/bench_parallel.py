@@ -0,0 +1,104 @@
+# bench_parallel.py
+# Batch scoring on one core (score_shared in-process) vs. the worker process pool (parallel_batch.py).
+#   python bench_parallel.py [--rows 200000] [--workers 1,2,4,8] [--shard-rows 20000] [--uncertainty]
+#
+# Run it on the deployment hardware before raising the app's worker count above the default of 1.
+# "worker MB" is the mean proportional set size (PSS) of a worker after scoring: pages of the
+# memory-mapped forest arrays are shared, so it grows far slower than one model copy per worker.
+import os
+import time
+import pickle
+import argparse
+import tempfile
+
+import numpy as np
+
+from bench_forest_eval import MODEL_PATHS, best_of
+from feature_schema import FeatureSchema
+from scoring import infer_feature_list_from_models
+from shared_inference import score_shared
+from parallel_batch import ParallelScorer, DEFAULT_SHARD_ROWS, default_workers, start_method
+from model_registry import try_load_model
+from scoring_core import default_model_path
+from synthetic_data import make_synthetic_properties, train_synthetic_pipelines
+
+
+def model_paths(tmp_dir):
+    """{"clf", "reg"} -> artifact path the workers load (compact exports preferred); synthetic pickles otherwise."""
+    paths = {"clf": default_model_path(MODEL_PATHS["classifier"]), "reg": default_model_path(MODEL_PATHS["regressor"])}
+    if all(os.path.exists(p) for p in paths.values()):
+        return paths
+    print("models/*.pkl not found; training synthetic pipelines (100 trees)")
+    clf, reg, _ = train_synthetic_pipelines()
+    for name, model in (("clf", clf), ("reg", reg)):
+        paths[name] = os.path.join(tmp_dir, f"{name}.pkl")
+        with open(paths[name], "wb") as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return paths
+
+
+def worker_pss_mb(scorer):
+    """Mean PSS of the scorer's pool workers in MB (Linux /proc), or None."""
+    sizes = []
+    for proc in getattr(scorer._pool, "_pool", []):
+        try:
+            with open(f"/proc/{proc.pid}/smaps_rollup") as f:
+                sizes += [int(line.split()[1]) / 1024 for line in f if line.startswith("Pss:")]
+        except OSError:
+            return None
+    return sum(sizes) / len(sizes) if sizes else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process vs. process-pool batch scoring benchmark")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", default=None, help="comma-separated worker counts (default 1,2,4,... up to the cores)")
+    parser.add_argument("--shard-rows", type=int, default=DEFAULT_SHARD_ROWS)
+    parser.add_argument("--uncertainty", action="store_true", help="include per-tree std and P10/P90 bands")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cores = default_workers()
+    if args.workers:
+        worker_counts = [int(w) for w in args.workers.split(",") if w]
+    else:
+        worker_counts = [w for w in (1, 2, 4, 8, 16, 32, 64) if w < cores] + [cores]
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench-parallel-")
+    paths = model_paths(tmp_dir)
+    clf, reg = try_load_model(paths["clf"])[0], try_load_model(paths["reg"])[0]
+    df = make_synthetic_properties(args.rows, seed=1)
+    X = FeatureSchema.from_processed(infer_feature_list_from_models(df, reg, clf), df).align(df)
+    del df
+
+    def run(scorer):
+        return scorer(X, clf, reg, with_uncertainty=args.uncertainty)
+
+    print(f"\n{args.rows:,} rows, shards of {args.shard_rows:,}, {cores} usable cores, {start_method()} workers"
+          f"{', with uncertainty' if args.uncertainty else ''}")
+    print(f"{'workers':>8}{'start ms':>10}{'seconds':>10}{'rows/s':>12}{'speedup':>9}{'efficiency':>12}{'worker MB':>11}")
+    reference = run(score_shared)
+    base = best_of(lambda: run(score_shared), args.repeat)
+    print(f"{'in-proc':>8}{'-':>10}{base:>10.3f}{args.rows / base:>12,.0f}{1.0:>9.2f}{'-':>12}")
+    for workers in worker_counts:
+        scorer = ParallelScorer(workers=workers, shard_rows=args.shard_rows, model_paths=paths)
+        try:
+            t0 = time.perf_counter()
+            got = run(scorer)  # starts the pool (workers load the models); later runs reuse it
+            first = time.perf_counter() - t0
+            seconds = best_of(lambda: run(scorer), args.repeat)
+            pss = worker_pss_mb(scorer)
+        finally:
+            scorer.close()
+        start_ms = max(0.0, first - seconds) * 1e3
+        # workers evaluate the compact (float32 threshold) export: equal to sklearn to float32 precision
+        if not np.allclose(got["reg_pred"], reference["reg_pred"], rtol=1e-5, atol=1e-4):
+            print(f"  warning: {workers} workers changed predictions "
+                  f"(max |diff| {np.abs(got['reg_pred'] - reference['reg_pred']).max():.2e})")
+        speedup = base / seconds
+        print(f"{workers:>8}{start_ms:>10.0f}{seconds:>10.3f}{args.rows / seconds:>12,.0f}{speedup:>9.2f}"
+              f"{speedup / workers:>12.0%}{f'{pss:,.0f}' if pss is not None else '-':>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+# bench_suite.py
+# End-to-end benchmark on synthetic data shaped like data/final_data.csv, from 1k to 10M rows.
+#   python bench_suite.py [--sizes 1000,100000,1000000] [--out bench_results/run.json]
+#   python bench_suite.py --compare bench_results/old.json bench_results/new.json
+#
+# Every size runs in a fresh subprocess, so peak RSS is per size and earlier sizes don't warm caches.
+# Stages: CSV load, feature alignment, classifier predict / predict_proba, regressor predict,
+# per-tree uncertainty and the shared (one-encode) scoring path. Results are JSON: one record per
+# (rows, stage) with seconds, rows/sec and the process's peak RSS after the stage.
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import platform
+import resource
+import subprocess
+
+DATA_DIR = "bench_data"
+RESULTS_DIR = "bench_results"
+MODEL_PATHS = {"classifier": "models/classifier_pipeline.pkl", "regressor": "models/regressor_pipeline.pkl"}
+DEFAULT_SIZES = "1000,100000,1000000"
+STAGES = ("csv_load", "align", "clf_predict", "clf_predict_proba", "reg_predict", "reg_uncertainty", "score_shared")
+REGRESSION_THRESHOLD = 0.10
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, timeout=10).stdout.strip()
+        return out.stdout.strip() + ("-dirty" if dirty else "") if out.returncode == 0 else None
+    except Exception:
+        return None
+
+
+def environment():
+    import numpy as np
+    import pandas as pd
+    import sklearn
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+# -------------------------
+# Inputs
+# -------------------------
+def dataset_path(n_rows, seed):
+    return os.path.join(DATA_DIR, f"synthetic_{n_rows}_{seed}.csv")
+
+
+def ensure_dataset(n_rows, seed):
+    """Synthetic CSV for this size, generated once (in chunks) and reused by later runs."""
+    from synthetic_data import write_synthetic_csv
+
+    path = dataset_path(n_rows, seed)
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        t0 = time.perf_counter()
+        write_synthetic_csv(path, n_rows, seed=seed)
+        print(f"  generated {path} in {time.perf_counter() - t0:.1f}s", flush=True)
+    return path
+
+
+def ensure_models(seed):
+    """models/*.pkl when both exist, else synthetic pipelines trained once and cached in bench_data/."""
+    if all(os.path.exists(p) for p in MODEL_PATHS.values()):
+        return dict(MODEL_PATHS), "models/*.pkl"
+    paths = {name: os.path.join(DATA_DIR, f"synthetic_{name}_{seed}.pkl") for name in MODEL_PATHS}
+    if not all(os.path.exists(p) for p in paths.values()):
+        from synthetic_data import train_synthetic_pipelines
+
+        os.makedirs(DATA_DIR, exist_ok=True)
+        print("  models/*.pkl not found; training synthetic pipelines", flush=True)
+        clf, reg, _ = train_synthetic_pipelines(seed=seed)
+        for name, model in (("classifier", clf), ("regressor", reg)):
+            with open(paths[name], "wb") as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return paths, "synthetic (bench_data/)"
+
+
+# -------------------------
+# One size (runs in a child process)
+# -------------------------
+def run_size(n_rows, seed, model_paths, repeat, stages):
+    import pandas as pd
+
+    from model_registry import try_load_model
+    from feature_schema import FeatureSchema
+    from scoring import infer_feature_list_from_models
+    from shared_inference import split_pipeline, score_shared
+    from uncertainty import tree_prediction_stats, DEFAULT_QUANTILES
+
+    clf, err = try_load_model(model_paths["classifier"])
+    if clf is None:
+        raise SystemExit(err)
+    reg, err = try_load_model(model_paths["regressor"])
+    if reg is None:
+        raise SystemExit(err)
+    csv_path = dataset_path(n_rows, seed)
+    results = []
+    state = {}
+
+    def timed(stage, fn):
+        if stage not in stages:
+            return None
+        best, value = float("inf"), None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            value = fn()
+            best = min(best, time.perf_counter() - t0)
+        results.append({
+            "rows": n_rows, "stage": stage, "seconds": best,
+            "rows_per_sec": n_rows / best if best > 0 else None, "peak_rss_mb": peak_rss_mb(),
+        })
+        return value
+
+    df = timed("csv_load", lambda: pd.read_csv(csv_path))
+    if df is None:
+        df = pd.read_csv(csv_path)
+    feature_list = infer_feature_list_from_models(df, reg, clf)
+    schema = FeatureSchema.from_processed(feature_list, df)
+    X = timed("align", lambda: schema.align(df))
+    if X is None:
+        X = schema.align(df)
+    del df
+
+    timed("clf_predict", lambda: clf.predict(X))
+    timed("clf_predict_proba", lambda: clf.predict_proba(X))
+    timed("reg_predict", lambda: reg.predict(X))
+
+    def uncertainty():
+        preproc, final = split_pipeline(reg)
+        X_trans = preproc.transform(X) if preproc is not None else X
+        return tree_prediction_stats(final.estimators_, X_trans, quantiles=DEFAULT_QUANTILES)
+
+    if hasattr(split_pipeline(reg)[1], "estimators_"):
+        timed("reg_uncertainty", uncertainty)
+    timed("score_shared", lambda: score_shared(X, clf, reg, with_uncertainty=True))
+    return results
+
+
+# -------------------------
+# Comparison
+# -------------------------
+def compare(old_path, new_path, threshold=REGRESSION_THRESHOLD):
+    """Print per-(rows, stage) time ratios new/old; returns the number of regressions beyond threshold."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_by_key = {(r["rows"], r["stage"]): r for r in old["results"]}
+    print(f"old: {old['meta'].get('commit')}  new: {new['meta'].get('commit')}")
+    print(f"{'rows':>10}  {'stage':<20}{'old s':>10}{'new s':>10}{'ratio':>8}{'old MB':>9}{'new MB':>9}")
+    regressions = 0
+    for r in new["results"]:
+        o = old_by_key.get((r["rows"], r["stage"]))
+        if o is None:
+            continue
+        ratio = r["seconds"] / o["seconds"] if o["seconds"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions += 1
+            flag = "  <-- slower"
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{r['rows']:>10,}  {r['stage']:<20}{o['seconds']:>10.4f}{r['seconds']:>10.4f}{ratio:>8.2f}"
+              f"{o['peak_rss_mb']:>9.0f}{r['peak_rss_mb']:>9.0f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic-data benchmark suite for the scoring path")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated row counts (up to 10000000)")
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--repeat", type=int, default=3, help="best-of-N per stage (1 for sizes >= 1M)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="JSON results path (default bench_results/<commit>-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--run-size", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--model-paths", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    stages = [s for s in args.stages.split(",") if s]
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, threshold=args.threshold) else 0)
+
+    if args.run_size is not None:
+        # child: one size, results as JSON on stdout
+        repeat = 1 if args.run_size >= 1_000_000 else args.repeat
+        results = run_size(args.run_size, args.seed, json.loads(args.model_paths), repeat, stages)
+        print(json.dumps(results))
+        return
+
+    model_paths, model_source = ensure_models(args.seed)
+    commit = git_commit()
+    meta = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "seed": args.seed,
+        "models": model_source,
+        **environment(),
+    }
+    results = []
+    print(f"{'rows':>10}  {'stage':<20}{'seconds':>10}{'rows/s':>14}{'peak MB':>10}")
+    for n_rows in [int(s) for s in args.sizes.split(",") if s]:
+        ensure_dataset(n_rows, args.seed)
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run-size", str(n_rows), "--seed", str(args.seed),
+             "--repeat", str(args.repeat), "--stages", ",".join(stages), "--model-paths", json.dumps(model_paths)],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            print(proc.stderr, file=sys.stderr)
+            raise SystemExit(f"benchmark for {n_rows:,} rows failed")
+        for r in json.loads(proc.stdout.strip().splitlines()[-1]):
+            results.append(r)
+            print(f"{r['rows']:>10,}  {r['stage']:<20}{r['seconds']:>10.4f}{r['rows_per_sec'] or 0:>14,.0f}"
+                  f"{r['peak_rss_mb']:>10.0f}")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit or 'nocommit'}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"\nWrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# columnar_store.py
+# Typed, memory-mappable copy of data/final_data.csv.
+#   python columnar_store.py [data/final_data.csv] [--format feather|parquet]
+import os
+import argparse
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as pa_feather
+    import pyarrow.parquet as pa_parquet
+except Exception:
+    pa = None
+
+DEFAULT_FORMAT = "feather"
+SUFFIXES = {"feather": ".feather", "parquet": ".parquet"}
+# string columns with fewer distinct values than this share of rows become categoricals
+CATEGORY_MAX_RATIO = 0.5
+_SOURCE_KEY = b"source_stat"
+
+
+def columnar_path(csv_path, fmt=DEFAULT_FORMAT):
+    return os.path.splitext(csv_path)[0] + SUFFIXES[fmt]
+
+
+def source_stat(csv_path):
+    """"<mtime_ns>:<size>" of the CSV a derived file was built from, or None when it is missing."""
+    try:
+        st = os.stat(csv_path)
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def to_categoricals(df, max_ratio=CATEGORY_MAX_RATIO):
+    """Dictionary-encode low/medium-cardinality string columns; numeric columns are left alone."""
+    n_rows = max(1, len(df))
+    converted = {}
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s):
+            if s.nunique(dropna=True) <= max_ratio * n_rows:
+                converted[c] = s.astype("category")
+    return df.assign(**converted) if converted else df
+
+
+def write_columnar(df, out_path, csv_path=None, fmt=None):
+    """
+    Write df as Feather (uncompressed Arrow IPC, so reads can be zero-copy mmaps) or Parquet.
+    The source CSV's (mtime, size) is stored in the file metadata to detect staleness.
+    Written to a temp file and renamed, so readers never see a half-written file.
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required for the columnar store (pip install pyarrow)")
+    fmt = fmt or ("parquet" if out_path.endswith(".parquet") else "feather")
+    table = pa.Table.from_pandas(to_categoricals(df), preserve_index=False)
+    source = source_stat(csv_path) if csv_path else None
+    if source is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _SOURCE_KEY: source.encode()})
+    tmp_path = out_path + ".tmp"
+    if fmt == "parquet":
+        pa_parquet.write_table(table, tmp_path)
+    else:
+        pa_feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def convert_csv_to_columnar(csv_path, out_path=None, fmt=DEFAULT_FORMAT):
+    """Parse csv_path once and store it as a typed columnar file next to it."""
+    out_path = out_path or columnar_path(csv_path, fmt)
+    return write_columnar(pd.read_csv(csv_path), out_path, csv_path=csv_path, fmt=fmt)
+
+
+def _read_table(path, columns=None):
+    if path.endswith(".parquet"):
+        return pa_parquet.read_table(path, columns=columns, memory_map=True)
+    return pa_feather.read_table(path, columns=columns, memory_map=True)
+
+
+def _to_pandas(table):
+    """
+    Arrow -> pandas without a second copy of the data: split_blocks keeps one block per column, so
+    numeric columns without nulls stay read-only views of the mapped file (edit a shallow copy, which
+    copies on write), and self_destruct releases each Arrow column as soon as it is converted.
+    """
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def iter_frames(path, batch_rows):
+    """Consecutive frames of up to batch_rows rows from a columnar file, sliced from one memory map."""
+    table = _read_table(path)
+    for start in range(0, table.num_rows, batch_rows):
+        # slices share the parent's buffers, so there is nothing to self-destruct here
+        yield table.slice(start, batch_rows).to_pandas(split_blocks=True)
+
+
+def is_fresh(path, csv_path):
+    """True if the columnar file exists and was built from the CSV as it is now (or the CSV is gone)."""
+    if pa is None or not os.path.exists(path):
+        return False
+    source = source_stat(csv_path)
+    if source is None:
+        return True
+    if path.endswith(".parquet"):
+        metadata = pa_parquet.read_schema(path, memory_map=True).metadata or {}
+    else:
+        metadata = _read_table(path, columns=[]).schema.metadata or {}
+    return metadata.get(_SOURCE_KEY, b"").decode() == source
+
+
+def ensure_columnar(csv_path, fmt=DEFAULT_FORMAT):
+    """Path of csv_path's columnar copy, (re)built when missing or stale; None without pyarrow or on failure."""
+    if pa is None:
+        return None
+    path = columnar_path(csv_path, fmt)
+    try:
+        if not is_fresh(path, csv_path) and os.path.exists(csv_path):
+            convert_csv_to_columnar(csv_path, path, fmt)
+    except Exception:
+        return None
+    return path if os.path.exists(path) else None
+
+
+def load_frame(csv_path, columns=None, fmt=DEFAULT_FORMAT, convert_if_missing=True):
+    """
+    Load the processed data, preferring the memory-mapped columnar copy:
+    - read only `columns` (projection) when given;
+    - (re)build the columnar copy from the CSV when it is missing or stale;
+    - fall back to pd.read_csv when pyarrow is unavailable or conversion fails.
+    Numeric columns come back as zero-copy views of the map (see _to_pandas).
+    """
+    if convert_if_missing:
+        path = ensure_columnar(csv_path, fmt)
+    else:
+        path = columnar_path(csv_path, fmt)
+    if pa is not None and path is not None and os.path.exists(path):
+        try:
+            return _to_pandas(_read_table(path, columns=columns))
+        except Exception:
+            pass
+    return pd.read_csv(csv_path, usecols=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the processed CSV to a typed columnar file")
+    parser.add_argument("csv_path", nargs="?", default="data/final_data.csv")
+    parser.add_argument("--format", choices=sorted(SUFFIXES), default=DEFAULT_FORMAT)
+    args = parser.parse_args()
+    out = convert_csv_to_columnar(args.csv_path, fmt=args.format)
+    print(f"Wrote {out} ({os.path.getsize(out):,} bytes) from {args.csv_path} ({os.path.getsize(args.csv_path):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+# compact_forest.py
+# Compact inference format for the RandomForest pipelines:
+#   python compact_forest.py export models/regressor_pipeline.pkl models/regressor_compact
+#   python compact_forest.py export models/classifier_pipeline.pkl models/classifier_compact \
+#       --validation data/final_data.csv --target Good_Investment --max-score-drop 0.005
+#   python compact_forest.py verify models/regressor_pipeline.pkl models/regressor_compact
+import os
+import sys
+import json
+import pickle
+import argparse
+import weakref
+import subprocess
+
+import numpy as np
+
+from forest_eval import forest_values
+from model_registry import COMPACT_META_FILE as META_FILE, is_compact_dir
+
+FORMAT_VERSION = 1
+PREPROCESSOR_FILE = "preprocessor.pkl"
+ARRAY_NAMES = ("children_left", "children_right", "feature", "threshold", "value", "tree_offsets")
+# flattened copies of in-memory sklearn forests, see compile_forest()
+_compiled_forests = weakref.WeakKeyDictionary()
+# never prune below this many trees
+DEFAULT_MIN_TREES = 10
+
+
+def _float32_floor(values):
+    """
+    Round float64 thresholds down to float32. sklearn compares float32(X) <= float64 threshold;
+    for float32 x that is the same as x <= the largest float32 not above the threshold, so the
+    compact trees take exactly the same branches as the originals.
+    """
+    t32 = values.astype(np.float32)
+    too_high = t32.astype(np.float64) > values
+    t32[too_high] = np.nextafter(t32[too_high], np.float32(-np.inf))
+    return t32
+
+
+class CompactTree:
+    """View of one tree inside a CompactForest; quacks like a fitted sklearn tree for predict()."""
+
+    def __init__(self, forest, index):
+        self._forest = forest
+        self._index = index
+
+    def predict(self, X, check_input=True):
+        return self._forest.tree_predictions(X, trees=[self._index])[0]
+
+
+class CompactForest:
+    """
+    All trees of a RandomForest flattened into contiguous arrays:
+    children_left/children_right (int32, global node ids, -1 at leaves), feature (uint16 when it fits),
+    threshold (float32), value (float32; leaf mean for regressors, class fractions for classifiers)
+    and tree_offsets (int64, n_trees + 1). Arrays are saved as .npy so they can be memory-mapped.
+    """
+
+    def __init__(self, arrays, meta):
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.kind = meta["kind"]
+        self.n_features_in_ = meta["n_features"]
+        if self.kind == "classifier":
+            self.classes_ = np.asarray(meta["classes"])
+        if meta.get("feature_importances") is not None:
+            self.feature_importances_ = np.asarray(meta["feature_importances"])
+        self.estimators_ = [CompactTree(self, i) for i in range(self.n_trees)]
+
+    @property
+    def n_trees(self):
+        return len(self.tree_offsets) - 1
+
+    @property
+    def n_nodes(self):
+        return int(self.tree_offsets[-1])
+
+    # -------------------------
+    # Build / persist
+    # -------------------------
+    @classmethod
+    def from_sklearn(cls, forest, trees=None):
+        """Flatten a fitted RandomForestRegressor/Classifier (optionally only the given tree indices)."""
+        estimators = forest.estimators_ if trees is None else [forest.estimators_[i] for i in trees]
+        is_classifier = hasattr(forest, "classes_")
+        feature_dtype = np.uint16 if forest.n_features_in_ <= np.iinfo(np.uint16).max else np.int32
+        lefts, rights, feats, thrs, vals, offsets = [], [], [], [], [], [0]
+        for est in estimators:
+            tree = est.tree_
+            base = offsets[-1]
+            leaf = tree.children_left < 0
+            lefts.append(np.where(leaf, -1, tree.children_left + base).astype(np.int32))
+            rights.append(np.where(leaf, -1, tree.children_right + base).astype(np.int32))
+            feats.append(np.where(leaf, 0, tree.feature).astype(feature_dtype))
+            thrs.append(_float32_floor(tree.threshold))
+            if is_classifier:
+                v = tree.value[:, 0, :].astype(np.float64)
+                v = v / np.maximum(v.sum(axis=1, keepdims=True), 1e-12)
+            else:
+                v = tree.value[:, 0, :1]
+            vals.append(v.astype(np.float32))
+            offsets.append(base + tree.node_count)
+        arrays = {
+            "children_left": np.concatenate(lefts),
+            "children_right": np.concatenate(rights),
+            "feature": np.concatenate(feats),
+            "threshold": np.concatenate(thrs),
+            "value": np.concatenate(vals),
+            "tree_offsets": np.asarray(offsets, dtype=np.int64),
+        }
+        importances = getattr(forest, "feature_importances_", None)
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "kind": "classifier" if is_classifier else "regressor",
+            "n_features": int(forest.n_features_in_),
+            "classes": forest.classes_.tolist() if is_classifier else None,
+            "feature_importances": None if importances is None else np.asarray(importances).tolist(),
+            "source_trees": len(forest.estimators_),
+        }
+        return cls(arrays, meta)
+
+    def save(self, out_dir):
+        os.makedirs(out_dir, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(out_dir, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(out_dir, META_FILE), "w") as f:
+            json.dump(self.meta, f)
+
+    @classmethod
+    def load(cls, in_dir, mmap=True):
+        with open(os.path.join(in_dir, META_FILE)) as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact format version: {meta.get('format_version')}")
+        mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(in_dir, f"{name}.npy"), mmap_mode=mode) for name in ARRAY_NAMES}
+        return cls(arrays, meta)
+
+    # -------------------------
+    # Inference
+    # -------------------------
+    def tree_predictions(self, X, trees=None):
+        """(n_trees, n_rows) per-tree predictions (regressor) or positive-class fractions (classifier)."""
+        col = 1 if self.kind == "classifier" and self.value.shape[1] > 1 else 0
+        return forest_values(self, X, trees=trees, reduce=None, column=col)
+
+    def _mean_value(self, X):
+        return forest_values(self, X, reduce="mean")
+
+    def predict(self, X, check_input=True):
+        mean = self._mean_value(X)
+        if self.kind == "classifier":
+            return self.classes_.take(np.argmax(mean, axis=1))
+        return mean[:, 0]
+
+    def predict_proba(self, X):
+        if self.kind != "classifier":
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._mean_value(X)
+
+
+def compile_forest(forest):
+    """CompactForest for a fitted sklearn forest, flattened once per model object and cached."""
+    if isinstance(forest, CompactForest):
+        return forest
+    try:
+        return _compiled_forests[forest]
+    except KeyError:
+        pass
+    compiled = CompactForest.from_sklearn(forest)
+    _compiled_forests[forest] = compiled
+    return compiled
+
+
+class CompactPipeline:
+    """
+    A pickled preprocessor plus a CompactForest, exposing the parts of the sklearn Pipeline API
+    the app relies on (named_steps, model[:-1], predict, predict_proba, feature_names_in_).
+    """
+
+    def __init__(self, preprocessor, forest):
+        self.preprocessor = preprocessor
+        self.forest = forest
+        self.steps = [("preprocessor", preprocessor), ("model", forest)] if preprocessor is not None else [("model", forest)]
+        self.named_steps = dict(self.steps)
+        names = getattr(preprocessor, "feature_names_in_", None)
+        if names is not None:
+            self.feature_names_in_ = np.asarray(names, dtype=object)
+
+    def __getitem__(self, ind):
+        if isinstance(ind, slice) and ind == slice(None, -1, None) and self.preprocessor is not None:
+            return self.preprocessor
+        raise IndexError("CompactPipeline only supports [:-1] (the preprocessor)")
+
+    def __len__(self):
+        return len(self.steps)
+
+    def _encode(self, X):
+        return X if self.preprocessor is None else self.preprocessor.transform(X)
+
+    def predict(self, X):
+        return self.forest.predict(self._encode(X))
+
+    def predict_proba(self, X):
+        return self.forest.predict_proba(self._encode(X))
+
+    def save(self, out_dir):
+        self.forest.save(out_dir)
+        if self.preprocessor is not None:
+            with open(os.path.join(out_dir, PREPROCESSOR_FILE), "wb") as f:
+                pickle.dump(self.preprocessor, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, in_dir, mmap=True):
+        preprocessor = None
+        path = os.path.join(in_dir, PREPROCESSOR_FILE)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                preprocessor = pickle.load(f)
+        return cls(preprocessor, CompactForest.load(in_dir, mmap=mmap))
+
+
+# -------------------------
+# Export with an optional accuracy budget
+# -------------------------
+def prediction_score(kind, y_true, pred):
+    """R^2 for regressors, accuracy for classifiers (numpy only, no sklearn metrics import)."""
+    y_true = np.asarray(y_true)
+    if kind == "classifier":
+        return float(np.mean(pred == y_true))
+    ss_res = float(np.sum((y_true - pred) ** 2))
+    ss_tot = float(np.sum((y_true - y_true.mean()) ** 2))
+    return 1.0 - ss_res / ss_tot if ss_tot > 0 else 0.0
+
+
+def select_trees(forest, X_val, y_val, max_score_drop, min_trees=DEFAULT_MIN_TREES):
+    """
+    Smallest set of trees (at least min_trees, so per-tree uncertainty stays meaningful) whose
+    ensemble scores within max_score_drop of the full forest on the validation data.
+    Trees are ranked by their own validation score and added best-first.
+    Returns (tree_indices, full_score, kept_score).
+    """
+    compact = CompactForest.from_sklearn(forest)
+    kind = compact.kind
+    per_tree = compact.tree_predictions(X_val)  # (trees, rows); positive-class fraction for classifiers
+    classes = getattr(compact, "classes_", None)
+
+    def to_pred(mean_scores):
+        if kind == "classifier":
+            return np.where(mean_scores >= 0.5, classes[-1], classes[0]) if len(classes) == 2 else None
+        return mean_scores
+
+    if kind == "classifier" and len(classes) != 2:
+        raise ValueError("Tree selection by accuracy budget supports binary classifiers only")
+    full_score = prediction_score(kind, y_val, to_pred(per_tree.mean(axis=0)))
+    order = np.argsort([-prediction_score(kind, y_val, to_pred(p)) for p in per_tree], kind="stable")
+    running = np.zeros(per_tree.shape[1])
+    for k, t in enumerate(order, start=1):
+        running += per_tree[t]
+        score = prediction_score(kind, y_val, to_pred(running / k))
+        if k >= min_trees and score >= full_score - max_score_drop:
+            return sorted(order[:k].tolist()), full_score, score
+    return list(range(len(order))), full_score, full_score
+
+
+def export_pipeline(model, out_dir, X_val_df=None, y_val=None, max_score_drop=None,
+                    min_trees=DEFAULT_MIN_TREES, log=print):
+    """Convert a fitted (Pipeline of) RandomForest into the compact directory format."""
+    from shared_inference import split_pipeline  # imported here: shared_inference imports this module
+
+    preprocessor, forest = split_pipeline(model)
+    if not hasattr(forest, "estimators_"):
+        raise ValueError(f"Final estimator {type(forest).__name__} is not a tree ensemble")
+    trees = None
+    if max_score_drop is not None and X_val_df is not None and y_val is not None:
+        X_val = X_val_df if preprocessor is None else preprocessor.transform(X_val_df)
+        trees, full_score, kept_score = select_trees(forest, X_val, y_val, max_score_drop, min_trees)
+        log(f"Keeping {len(trees)}/{len(forest.estimators_)} trees "
+            f"(validation score {kept_score:.4f} vs {full_score:.4f} for the full forest)")
+    compact = CompactPipeline(preprocessor, CompactForest.from_sklearn(forest, trees=trees))
+    compact.save(out_dir)
+    return compact
+
+
+_COLD_START_SCRIPT = """
+import sys, time, json, resource
+sys.path.insert(0, sys.argv[3])
+t0 = time.perf_counter()
+if sys.argv[1] == "compact":
+    from compact_forest import CompactPipeline
+    CompactPipeline.load(sys.argv[2])
+else:
+    from model_registry import try_load_model
+    try_load_model(sys.argv[2])
+print(json.dumps({"seconds": time.perf_counter() - t0,
+                  "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def cold_start(kind, path):
+    """Load time and peak RSS of loading a model in a fresh interpreter (imports included)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = subprocess.run([sys.executable, "-c", _COLD_START_SCRIPT, kind, path, here],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def main():
+    from model_registry import try_load_model
+
+    parser = argparse.ArgumentParser(description="Export RandomForest pipelines to a compact, mmap-able format")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    exp = sub.add_parser("export")
+    exp.add_argument("model_path")
+    exp.add_argument("out_dir")
+    exp.add_argument("--validation", help="CSV with features and target, used for --max-score-drop")
+    exp.add_argument("--target", help="target column in the validation CSV")
+    exp.add_argument("--max-score-drop", type=float, help="allowed drop in R^2 / accuracy when dropping trees")
+    exp.add_argument("--min-trees", type=int, default=DEFAULT_MIN_TREES, help="keep at least this many trees")
+    exp.add_argument("--max-rows", type=int, default=20_000, help="validation rows used for tree selection")
+    ver = sub.add_parser("verify")
+    ver.add_argument("model_path")
+    ver.add_argument("compact_dir")
+    ver.add_argument("--data", default="data/final_data.csv")
+    ver.add_argument("--rows", type=int, default=5_000)
+    args = parser.parse_args()
+
+    if args.cmd == "export":
+        model, err = try_load_model(args.model_path)
+        if model is None:
+            sys.exit(err)
+        X_val = y_val = None
+        if args.max_score_drop is not None:
+            if not (args.validation and args.target):
+                sys.exit("--max-score-drop needs --validation and --target")
+            import pandas as pd
+            val = pd.read_csv(args.validation, nrows=args.max_rows)
+            y_val = val[args.target].to_numpy()
+            X_val = val.drop(columns=[c for c in ("Good_Investment", "Future_Price_5Yrs") if c in val.columns])
+        export_pipeline(model, args.out_dir, X_val, y_val, args.max_score_drop, args.min_trees)
+        print(f"Wrote {args.out_dir} ({_dir_size(args.out_dir):,} bytes; pickle was {os.path.getsize(args.model_path):,} bytes)")
+        return
+
+    import pandas as pd
+    from scoring import align_inputs_to_features, infer_feature_list_from_models
+
+    for label, kind, path in (("pickle", "pickle", args.model_path), ("compact", "compact", args.compact_dir)):
+        stats = cold_start(kind, path)
+        print(f"cold start {label:>7}: {stats['seconds']:8.3f}s  peak RSS {stats['max_rss_mb']:10.1f} MB")
+    compact = CompactPipeline.load(args.compact_dir)
+    model, err = try_load_model(args.model_path)
+    if model is None:
+        sys.exit(err)
+    df = pd.read_csv(args.data, nrows=args.rows)
+    X = align_inputs_to_features(df, infer_feature_list_from_models(df, model, None), df)
+    ref, got = model.predict(X), compact.predict(X)
+    if compact.forest.kind == "classifier":
+        print(f"label agreement: {np.mean(ref == got):.6f}")
+        diff = np.abs(model.predict_proba(X) - compact.predict_proba(X)).max()
+        print(f"max |proba diff|: {diff:.3e}")
+    else:
+        print(f"max |prediction diff|: {np.abs(ref - got).max():.3e}")
+
+
+if __name__ == "__main__":
+    main()
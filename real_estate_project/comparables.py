@@ -0,0 +1,282 @@
+# comparables.py
+# Nearest-neighbour index of historical properties for "comparables", persisted next to the CSV.
+#   python comparables.py build [data/final_data.csv]
+#   python comparables.py bench [data/final_data.csv] [--k 10] [--queries 1000]
+import os
+import time
+import pickle
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from columnar_store import source_stat
+
+FORMAT_VERSION = 2
+SUFFIX = ".comparables.pkl"
+# physical attributes the single form asks for; price columns are what comparables are for
+DEFAULT_FEATURES = ("BHK", "Size_in_SqFt", "Year_Built", "Floor_No", "Total_Floors",
+                    "Nearby_Schools", "Nearby_Hospitals", "Parking_Space")
+PARTITION_COLUMNS = ("City", "Locality")
+TARGET_COLUMNS = ("Future_Price_5Yrs", "Good_Investment")
+PAYLOAD_COLUMNS = ("ID", "City", "Locality", "Property_Type", "Price_in_Lakhs")
+DEFAULT_K = 5
+LEAF_SIZE = 40
+
+
+def index_path(csv_path):
+    return os.path.splitext(csv_path)[0] + SUFFIX
+
+
+def normalize_key(value):
+    """Case- and whitespace-insensitive form of a City/Locality value ("  New  Delhi" -> "new delhi")."""
+    return " ".join(str(value).split()).casefold()
+
+
+def partition_keys(df, columns):
+    """
+    Partition key of every row as normalized strings ("" when missing), factorized per column so
+    only distinct values are converted. Returns (labels per column, group id per row, key per group).
+    """
+    labels, group = [], np.zeros(len(df), dtype=np.int64)
+    for c in columns:
+        if c in df.columns:
+            codes, uniques = pd.factorize(df[c])
+            names = np.array([normalize_key(u) for u in uniques] + [""], dtype=object)
+        else:
+            codes, names = np.full(len(df), -1), np.array([""], dtype=object)
+        codes = np.where(codes < 0, len(names) - 1, codes)
+        labels.append(names[codes])
+        group = group * len(names) + codes
+    _, first, inverse = np.unique(group, return_index=True, return_inverse=True)
+    keys = [tuple(col[i] for col in labels) for i in first]
+    return labels, inverse.reshape(-1), keys
+
+
+class ComparablesIndex:
+    """
+    KD-trees over the standardized numeric features of processed_df: one per (City, Locality),
+    one per City and one over every row. City/Locality are matched case- and whitespace-insensitively.
+
+    Rows are stored sorted by (City, Locality), so each tree covers a contiguous slice of `payload`
+    (ID, location, price columns and the targets). A query uses its own locality's tree when that
+    holds at least k properties, else its city's tree, else the global tree: always one tree query,
+    also for a blank or unknown location. query() takes any number of rows and groups them by
+    partition, so a batch costs one tree query per partition instead of one per row.
+    """
+
+    def __init__(self, features, mean, scale, partitions, cities, everything, payload, partition_by=PARTITION_COLUMNS):
+        self.features = list(features)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.partitions = partitions  # {(city, locality): (KDTree, start)}
+        self.cities = cities  # {city: (KDTree, start)}
+        self.everything = everything  # (KDTree, 0)
+        self.payload = payload
+        self.partition_by = tuple(partition_by)
+
+    @property
+    def n_rows(self):
+        return len(self.payload)
+
+    # -------------------------
+    # Build / persist
+    # -------------------------
+    @classmethod
+    def build(cls, df, features=DEFAULT_FEATURES, partition_by=PARTITION_COLUMNS, leaf_size=LEAF_SIZE):
+        from sklearn.neighbors import KDTree
+
+        features = [f for f in features if f in df.columns]
+        if not features:
+            raise ValueError("None of the comparable features are in the data")
+        values = df[features].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+        mean = np.nanmean(values, axis=0)
+        scale = np.nanstd(values, axis=0)
+        scale[~(scale > 0)] = 1.0
+        scaled = (values - mean) / scale
+        np.nan_to_num(scaled, copy=False)  # missing values sit at the mean
+
+        labels, group, keys = partition_keys(df, partition_by)
+        order = np.lexsort(labels[::-1])
+        payload_cols = [c for c in (*PAYLOAD_COLUMNS, *features, *TARGET_COLUMNS) if c in df.columns]
+        payload = df.iloc[order][list(dict.fromkeys(payload_cols))].reset_index(drop=True)
+        scaled, group = scaled[order], group[order]
+
+        spans, city_spans = {}, {}
+        bounds = np.flatnonzero(np.diff(group)) + 1
+        for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(group)]):
+            key = keys[group[start]]
+            # keys that only differed before normalizing share a partition; they are adjacent after sorting
+            for d, k in ((spans, key), (city_spans, key[0])):
+                first = d.get(k, (start, stop))[0]
+                d[k] = (int(first), int(stop))
+
+        def tree(span):
+            return KDTree(scaled[span[0]:span[1]], leaf_size=leaf_size), span[0]
+
+        partitions = {key: tree(span) for key, span in spans.items()}
+        cities = {city: tree(span) for city, span in city_spans.items()}
+        return cls(features, mean, scale, partitions, cities, tree((0, len(scaled))), payload, partition_by)
+
+    def save(self, path, csv_path=None):
+        """Pickle the index (trees included) with the source CSV's (mtime, size); temp file + rename."""
+        state = {"format_version": FORMAT_VERSION, "source": source_stat(csv_path) if csv_path else None,
+                 "index": self}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path, csv_path=None):
+        """The persisted index, or None when it is missing, from another format or built from another CSV."""
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except Exception:
+            return None
+        if state.get("format_version") != FORMAT_VERSION:
+            return None
+        source = source_stat(csv_path) if csv_path else None
+        if source is not None and state.get("source") != source:
+            return None
+        return state["index"]
+
+    # -------------------------
+    # Query
+    # -------------------------
+    def _scaled(self, df):
+        values = np.empty((len(df), len(self.features)), dtype=np.float64)
+        for j, f in enumerate(self.features):
+            if f in df.columns:
+                values[:, j] = pd.to_numeric(df[f], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                values[:, j] = np.nan
+        scaled = (values - self.mean) / self.scale
+        return np.nan_to_num(scaled, copy=False)  # features the query lacks do not move it
+
+    def _candidates(self, key, k):
+        """((KDTree, start) to search, match level) for one normalized query key."""
+        part = self.partitions.get(key)
+        if part is not None and part[0].data.shape[0] >= k:
+            return part, "locality"
+        city = self.cities.get(key[0])
+        if city is not None and city[0].data.shape[0] >= k:
+            return city, "city"
+        return self.everything, "all"
+
+    def query(self, df, k=DEFAULT_K):
+        """
+        Top-k comparables for every row of df (raw or aligned; only the features and City/Locality
+        are read). Returns a long frame: query (row position in df), rank, distance, match_level and
+        the payload columns of the comparable (ID, location, prices, Future_Price_5Yrs, Good_Investment).
+        """
+        k = int(min(k, self.n_rows))
+        n = len(df)
+        scaled = self._scaled(df)
+        _, group, keys = partition_keys(df, self.partition_by)
+        dist = np.full((n, k), np.inf)
+        idx = np.zeros((n, k), dtype=np.int64)
+        level = np.empty(n, dtype=object)
+
+        order = np.argsort(group, kind="stable")
+        bounds = np.flatnonzero(np.diff(group[order])) + 1
+        for rows in np.split(order, bounds) if n else []:
+            (tree, start), level[rows] = self._candidates(keys[group[rows[0]]], k)
+            d, i = tree.query(scaled[rows], k=k)
+            dist[rows], idx[rows] = d, i + start
+
+        found = self.payload.iloc[idx.ravel()].reset_index(drop=True)
+        head = pd.DataFrame({
+            "query": np.repeat(np.arange(n), k),
+            "rank": np.tile(np.arange(1, k + 1), n),
+            "distance": dist.ravel(),
+            "match_level": np.repeat(level, k),
+        })
+        return pd.concat([head, found], axis=1)
+
+    def summarize(self, df, k=DEFAULT_K):
+        """Per-row summary of the top-k comparables: median 5-year price and share of good investments."""
+        found = self.query(df, k)
+        summary = pd.DataFrame(index=pd.RangeIndex(len(df)))
+        grouped = found.groupby("query")
+        if "Future_Price_5Yrs" in found:
+            summary["Comparables_Median_Future_Price"] = grouped["Future_Price_5Yrs"].median()
+        if "Good_Investment" in found:
+            summary["Comparables_Good_Share"] = grouped["Good_Investment"].mean()
+        summary["Comparables_Mean_Distance"] = grouped["distance"].mean()
+        summary.index = df.index
+        return summary
+
+
+def load_or_build(csv_path, df=None, persist=True):
+    """
+    The persisted index for csv_path when it is fresh; otherwise built from df (or the CSV) and
+    saved next to it. A read-only data directory only costs the rebuild on the next start.
+    """
+    path = index_path(csv_path)
+    index = ComparablesIndex.load(path, csv_path)
+    if index is not None:
+        return index
+    if df is None:
+        from columnar_store import load_frame
+        df = load_frame(csv_path)
+    index = ComparablesIndex.build(df)
+    if persist:
+        try:
+            index.save(path, csv_path)
+        except OSError:
+            pass
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparable-properties nearest-neighbour index")
+    parser.add_argument("command", choices=["build", "bench"])
+    parser.add_argument("csv_path", nargs="?", default="data/final_data.csv")
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument("--queries", type=int, default=1000, help="rows in the batch lookup (bench)")
+    args = parser.parse_args()
+
+    from columnar_store import load_frame
+    df = load_frame(args.csv_path)
+    if args.command == "build":
+        t0 = time.perf_counter()
+        index = ComparablesIndex.build(df)
+        path = index.save(index_path(args.csv_path), args.csv_path)
+        print(f"Built {len(index.partitions)} partitions ({len(index.cities)} cities) over {index.n_rows:,} rows in "
+              f"{time.perf_counter() - t0:.2f}s -> {path} ({os.path.getsize(path):,} bytes)")
+        return
+
+    t0 = time.perf_counter()
+    index = load_or_build(args.csv_path, df)
+    print(f"index ready in {time.perf_counter() - t0:.2f}s ({len(index.partitions)} partitions, {index.n_rows:,} rows)")
+    sample = df.sample(min(args.queries, len(df)), random_state=0)
+    single = sample.head(1)
+    best = min(_timed(lambda: index.query(single, args.k)) for _ in range(20))
+    print(f"single query:     {best * 1e3:8.2f} ms")
+    blank = single.assign(**{c: "" for c in index.partition_by if c in single.columns})  # the form's default
+    best = min(_timed(lambda: index.query(blank, args.k)) for _ in range(20))
+    print(f"blank location:   {best * 1e3:8.2f} ms (global tree)")
+    seconds = min(_timed(lambda: index.query(sample, args.k)) for _ in range(3))
+    print(f"batch of {len(sample):,}: {seconds * 1e3:8.2f} ms ({seconds / len(sample) * 1e6:.1f} us/row)")
+
+    # brute force over the same partition for the single row, as a correctness and speed reference
+    scaled_all = index._scaled(index.payload)
+    q = index._scaled(single)[0]
+    t0 = time.perf_counter()
+    brute = np.sort(np.sqrt(((scaled_all - q) ** 2).sum(axis=1)))[:args.k]
+    brute_seconds = time.perf_counter() - t0
+    print(f"brute-force scan: {brute_seconds * 1e3:8.2f} ms over all rows "
+          f"(nearest {brute[0]:.3f} vs index {index.query(single, args.k)['distance'].iloc[0]:.3f}, same partition only)")
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+# feature_importance.py
+# Impurity and permutation importance of the pipelines, reported per original input column.
+#   python feature_importance.py [--model regressor|classifier] [--rows 2000] [--repeats 10]
+import os
+import copy
+import time
+import argparse
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from shared_inference import split_pipeline, align_for_raw_estimator
+from compact_forest import compile_forest, prediction_score
+from forest_eval import dense_float32, resolve_engine
+
+TARGETS = {"regressor": "Future_Price_5Yrs", "classifier": "Good_Investment"}
+DEFAULT_SAMPLE_ROWS = 2000
+DEFAULT_MAX_REPEATS = 10
+MIN_REPEATS = 3
+# stop repeating a column once the mean drop is known to within this share of itself (2 standard errors)...
+REL_TOL = 0.1
+# ...or to within this absolute score, for columns whose importance is ~0
+ABS_TOL = 1e-3
+UNMAPPED = "(unmapped)"
+
+
+# -------------------------
+# Encoded outputs -> original columns
+# -------------------------
+def _column_transformer(preproc):
+    if hasattr(preproc, "transformers_"):
+        return preproc
+    for step in reversed(list(getattr(preproc, "named_steps", {}).values())):
+        if hasattr(step, "transformers_"):
+            return step
+    return None
+
+
+def encoded_feature_names(model, feature_list=None):
+    """Names of the columns the final estimator sees (get_feature_names_out when available)."""
+    preproc, final = split_pipeline(model)
+    if preproc is not None:
+        try:
+            return [str(n) for n in preproc.get_feature_names_out()]
+        except Exception:
+            pass
+    names = getattr(final, "feature_names_in_", None)
+    if names is None and preproc is None:
+        names = feature_list
+    return [str(n) for n in names] if names is not None else None
+
+
+def output_columns(model, output_names, input_names):
+    """
+    Original input column of every encoded output column. ColumnTransformer outputs are named
+    "<transformer>__<column>[_<category>]", so the prefix narrows the candidates to that
+    transformer's columns and the longest column the rest starts with wins (City_Pune -> City).
+    """
+    preproc, _ = split_pipeline(model)
+    input_names = [str(c) for c in input_names]
+    by_transformer = {}
+    ct = _column_transformer(preproc) if preproc is not None else None
+    if ct is not None:
+        for name, _, cols in ct.transformers_:
+            if isinstance(cols, slice) or np.ndim(cols) == 0:
+                continue
+            cols = list(cols)
+            if cols and all(isinstance(c, (int, np.integer)) for c in cols):
+                cols = [input_names[i] for i in cols if i < len(input_names)]
+            by_transformer[name] = [str(c) for c in cols]
+
+    mapped = []
+    for out in output_names:
+        prefix, sep, rest = out.partition("__")
+        if sep and prefix in by_transformer:
+            candidates = by_transformer[prefix]
+        else:
+            candidates, rest = input_names, out
+        matches = [c for c in candidates if rest == c or rest.startswith(c + "_")]
+        mapped.append(max(matches, key=len) if matches else UNMAPPED)
+    return mapped
+
+
+# -------------------------
+# Impurity importance
+# -------------------------
+def impurity_importance(model, feature_list=None):
+    """
+    feature_importances_ of the final estimator, summed per original column. Returns
+    (by_column, by_output) frames sorted by importance, or None when the estimator has none.
+    """
+    preproc, final = split_pipeline(model)
+    importances = getattr(final, "feature_importances_", None)
+    if importances is None:
+        return None
+    importances = np.asarray(importances, dtype=np.float64)
+    names = encoded_feature_names(model, feature_list)
+    if names is None or len(names) != len(importances):
+        names = [f"x{i}" for i in range(len(importances))]
+    input_names = getattr(model, "feature_names_in_", None)
+    if input_names is None:
+        input_names = feature_list or []
+    by_output = pd.DataFrame({
+        "feature": names,
+        "column": output_columns(model, names, list(input_names)),
+        "importance": importances,
+    }).sort_values("importance", ascending=False, ignore_index=True)
+    by_column = (by_output.groupby("column", sort=False)["importance"].agg(["sum", "size"])
+                 .rename(columns={"sum": "importance", "size": "n_outputs"})
+                 .sort_values("importance", ascending=False).reset_index())
+    return by_column, by_output
+
+
+# -------------------------
+# Permutation importance
+# -------------------------
+def importance_sample(processed_df, target, n_rows=DEFAULT_SAMPLE_ROWS, seed=0):
+    """Rows of processed_df with a known target, sampled reproducibly."""
+    df = processed_df[processed_df[target].notna()]
+    return df.sample(min(int(n_rows), len(df)), random_state=seed) if len(df) > n_rows else df
+
+
+def _encode(model, X_df, engine):
+    preproc, final = split_pipeline(model)
+    if resolve_engine(engine, len(X_df)) == "numpy" and hasattr(final, "estimators_"):
+        final = compile_forest(final)
+    if preproc is None:
+        X_df = align_for_raw_estimator(final, X_df)
+        return final, dense_float32(X_df.apply(pd.to_numeric, errors="coerce")), [str(c) for c in X_df.columns]
+    return final, dense_float32(preproc.transform(X_df)), None
+
+
+def _column_importance(final, kind, X, y, cols, base_score, seed, max_repeats, min_repeats, buffers):
+    """
+    Mean / std of the score drop when the column's outputs are shuffled together, with early stopping.
+    buffers is a threading.local: each worker thread keeps one copy of X and permutes only the
+    current column's outputs in it, restoring them afterwards, so memory is one copy per thread.
+    """
+    if getattr(final, "n_jobs", None) not in (None, 1):
+        # the columns already run in parallel: a forest with n_jobs=-1 would start one joblib pool per column
+        final = copy.copy(final)
+        final.n_jobs = 1
+    X_perm = getattr(buffers, "X", None)
+    if X_perm is None:
+        X_perm = buffers.X = X.copy()
+    rng = np.random.default_rng(seed)
+    drops = []
+    for _ in range(max_repeats):
+        perm = rng.permutation(X.shape[0])
+        try:
+            X_perm[:, cols] = X[np.ix_(perm, cols)]  # one row order for every one-hot output of the column
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", UserWarning)  # raw estimators fitted on named frames
+                drops.append(base_score - prediction_score(kind, y, final.predict(X_perm)))
+        finally:
+            X_perm[:, cols] = X[:, cols]
+        if len(drops) >= min_repeats:
+            sem = np.std(drops, ddof=1) / np.sqrt(len(drops))
+            if 2 * sem <= max(REL_TOL * abs(np.mean(drops)), ABS_TOL):
+                break
+    return float(np.mean(drops)), float(np.std(drops)), len(drops)
+
+
+def permutation_importance(model, X_df, y, feature_list=None, max_repeats=DEFAULT_MAX_REPEATS,
+                           min_repeats=MIN_REPEATS, n_jobs=None, seed=0, engine="sklearn"):
+    """
+    Drop in score (R^2 for regressors, accuracy for classifiers) when one original column is shuffled.
+
+    X_df is encoded once; shuffling a column permutes the rows of all its encoded outputs together,
+    which equals shuffling the raw column and encoding again. Columns run in parallel on threads
+    (tree prediction releases the GIL), each thread permuting in its own copy of the encoded
+    sample, and each column repeats until its mean drop is stable, at most max_repeats times.
+    Returns (frame sorted by importance, stats).
+    """
+    t0 = time.perf_counter()
+    final, X, raw_names = _encode(model, X_df, engine)
+    kind = "classifier" if hasattr(final, "classes_") else "regressor"
+    y = np.asarray(y)
+    base_score = prediction_score(kind, y, final.predict(X))
+    names = raw_names or encoded_feature_names(model, feature_list)
+    if names is None or len(names) != X.shape[1]:
+        raise ValueError("Cannot name the encoded columns, so they cannot be mapped to input columns")
+    columns = output_columns(model, names, list(X_df.columns)) if raw_names is None else names
+    groups = {}
+    for j, column in enumerate(columns):
+        groups.setdefault(column, []).append(j)
+
+    workers = max(1, min(int(n_jobs or os.cpu_count() or 1), len(groups)))
+    buffers = threading.local()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="perm-importance") as pool:
+        futures = {
+            column: pool.submit(_column_importance, final, kind, X, y, np.asarray(cols), base_score,
+                                [seed, k], max_repeats, min_repeats, buffers)
+            for k, (column, cols) in enumerate(groups.items())
+        }
+        rows = [(column, *future.result()) for column, future in futures.items()]
+    result = pd.DataFrame(rows, columns=["column", "importance", "std", "repeats"])
+    result = result.sort_values("importance", ascending=False, ignore_index=True)
+    stats = {
+        "rows": len(X_df),
+        "metric": "accuracy" if kind == "classifier" else "R^2",
+        "base_score": base_score,
+        "predictions": int(result["repeats"].sum()) + 1,
+        "max_predictions": len(groups) * max_repeats + 1,
+        "workers": workers,
+        "seconds": time.perf_counter() - t0,
+    }
+    return result, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Impurity and permutation importance per input column")
+    parser.add_argument("--model", choices=list(TARGETS), default="regressor")
+    parser.add_argument("--rows", type=int, default=DEFAULT_SAMPLE_ROWS)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_MAX_REPEATS, help="maximum shuffles per column")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--engine", default="sklearn")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    from scoring_core import ScoringCore
+    core = ScoringCore().load()
+    model = core.reg_model if args.model == "regressor" else core.clf_model
+    if model is None:
+        raise SystemExit(f"The {args.model} did not load")
+
+    impurity = impurity_importance(model, core.feature_list)
+    if impurity is not None:
+        print(f"Impurity importance ({args.model}), summed per input column:")
+        print(impurity[0].head(args.top).to_string(index=False))
+
+    if core.processed_df is None or TARGETS[args.model] not in core.processed_df.columns:
+        raise SystemExit(f"No processed data with {TARGETS[args.model]}; skipping permutation importance")
+    sample = importance_sample(core.processed_df, TARGETS[args.model], args.rows)
+    perm, stats = permutation_importance(model, core.align(sample), sample[TARGETS[args.model]], core.feature_list,
+                                         max_repeats=args.repeats, n_jobs=args.workers, engine=args.engine)
+    print(f"\nPermutation importance on {stats['rows']:,} rows (base {stats['metric']} {stats['base_score']:.3f}): "
+          f"{stats['predictions']} of at most {stats['max_predictions']} predictions, "
+          f"{stats['workers']} workers, {stats['seconds']:.2f}s")
+    print(perm.head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
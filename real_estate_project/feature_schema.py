@@ -0,0 +1,118 @@
+# feature_schema.py
+import numpy as np
+import pandas as pd
+
+# user-friendly column names (lowercased, stripped) -> names the models were trained on
+RENAME_RULES = {
+    "sqft": "Size_in_SqFt",
+    "size": "Size_in_SqFt",
+    "size_in_sqft": "Size_in_SqFt",
+    "bhk": "BHK",
+    "year": "Year_Built",
+    "year_built": "Year_Built",
+    "floor": "Floor_No",
+    "floor_no": "Floor_No",
+    "total_floors": "Total_Floors",
+    "totalfloor": "Total_Floors",
+    "age": "Age_of_Property",
+    "age_of_property": "Age_of_Property",
+    "id": "ID",
+}
+
+
+class FeatureSchema:
+    """
+    Everything align_inputs_to_features needs, computed once from final_data.csv / feature_names_in_:
+    the ordered feature list, which features are numeric, their default (median) values and the
+    rename rules. align() is then a rename, one float64 block for the numeric features with a
+    broadcast default fill, and a single frame construction -- no scans over the training data.
+    """
+
+    def __init__(self, feature_list, numeric_cols=(), defaults=None, rename_rules=None):
+        self.feature_list = list(feature_list)
+        numeric = set(numeric_cols)
+        self.numeric_cols = [c for c in self.feature_list if c in numeric]
+        self.categorical_cols = [c for c in self.feature_list if c not in numeric]
+        self.defaults = dict(defaults or {})
+        self.rename_rules = dict(RENAME_RULES if rename_rules is None else rename_rules)
+        # training data known: numeric dtypes are fixed, so no per-column type sniffing is needed
+        self.has_training_dtypes = bool(numeric_cols) or defaults is not None
+        self._numeric_defaults = np.array([self.default_for(c) for c in self.numeric_cols], dtype=np.float64)
+
+    @classmethod
+    def from_processed(cls, feature_list, processed_df=None):
+        """Build the schema with a single median() pass over the numeric feature columns."""
+        if processed_df is None:
+            return cls(feature_list)
+        numeric_cols = [
+            c for c in processed_df.select_dtypes(include=[np.number]).columns if c in set(feature_list)
+        ]
+        defaults = {c: "" for c in feature_list if c not in numeric_cols}
+        if numeric_cols:
+            medians = processed_df[numeric_cols].median()
+            defaults.update({c: (0.0 if pd.isna(v) else float(v)) for c, v in medians.items()})
+        return cls(feature_list, numeric_cols, defaults)
+
+    def default_for(self, col):
+        return self.defaults.get(col, 0.0 if col in self.numeric_cols else "")
+
+    def _rename_map(self, columns):
+        rename_map = {}
+        for c in columns:
+            target = self.rename_rules.get(str(c).strip().lower())
+            if target is not None and target != c:
+                rename_map[c] = target
+        return rename_map
+
+    def align(self, input_df: pd.DataFrame):
+        """
+        Align input_df to the schema:
+        - Rename common user-friendly names to expected names
+        - Add missing columns with their defaults
+        - Reorder columns to match feature_list
+        - Coerce numeric features to float64 (unparseable values -> default)
+        The input frame is never modified.
+        """
+        rename_map = self._rename_map(input_df.columns)
+        df = input_df.rename(columns=rename_map) if rename_map else input_df
+        if df.columns.has_duplicates:
+            df = df.loc[:, ~df.columns.duplicated()]
+
+        n_rows = len(df)
+        present = set(df.columns)
+        missing = [c for c in self.feature_list if c not in present]
+        data = {}
+
+        if self.numeric_cols:
+            # one float64 block for all numeric features, then a single broadcast fill of NaNs
+            block = np.empty((n_rows, len(self.numeric_cols)), dtype=np.float64)
+            for j, c in enumerate(self.numeric_cols):
+                if c not in present:
+                    block[:, j] = np.nan
+                    continue
+                s = df[c]
+                if not pd.api.types.is_numeric_dtype(s):
+                    s = pd.to_numeric(s, errors="coerce")
+                block[:, j] = s.to_numpy(dtype=np.float64, na_value=np.nan)
+            np.copyto(block, self._numeric_defaults, where=np.isnan(block))
+            for j, c in enumerate(self.numeric_cols):
+                data[c] = block[:, j]
+
+        for c in self.categorical_cols:
+            if c in present:
+                data[c] = df[c]
+            else:
+                data[c] = np.full(n_rows, self.default_for(c), dtype=object)
+
+        df = pd.DataFrame(data, index=df.index, columns=self.feature_list)
+
+        if not self.has_training_dtypes:
+            # no training data to say which columns are numeric: keep the old best-effort parse
+            for c in self.categorical_cols:
+                if c in missing or pd.api.types.is_numeric_dtype(df[c]):
+                    continue
+                try:
+                    df[c] = pd.to_numeric(df[c])
+                except (ValueError, TypeError):
+                    pass
+        return df
@@ -1,28 +1,42 @@
 # src/fix_parking.py
-import pandas as pd
-import numpy as np
 import os
 
+import pandas as pd
+
+from columnar_store import convert_csv_to_columnar, columnar_path, ensure_columnar, load_frame
+from repair_pipeline import RepairPipeline, ReplaceInf, Fill
+
 IN_PATH = "data/final_data.csv"
-OUT_PATH = IN_PATH  # overwrite in place (or change to final_data_fixed.csv to keep original)
+OUT_PATH = IN_PATH  # replaced atomically (or change to final_data_fixed.csv to keep original)
+
+RULES = [
+    # Replace infinities, just in case
+    ReplaceInf(),
+    # Fill with 0 (no parking) — safer than leaving all-NaN for imputer
+    Fill("Parking_Space", 0),
+]
 
 if not os.path.exists(IN_PATH):
     raise FileNotFoundError(IN_PATH + " not found.")
 
-df = pd.read_csv(IN_PATH)
+# Check Parking_Space exists (the header only; the rules skip columns a file does not have)
+has_parking = "Parking_Space" in pd.read_csv(IN_PATH, nrows=0).columns
+if not has_parking:
+    print("Column Parking_Space not present — nothing to do.")
 
-# Replace infinities, just in case
-df = df.replace([np.inf, -np.inf], np.nan)
+# Read from the columnar copy (rebuilt first if the CSV changed); falls back to the CSV without pyarrow.
+# Partitions unchanged since the last run are reused from data/final_data.csv.parts/
+ensure_columnar(IN_PATH)
+report = RepairPipeline(RULES).run(IN_PATH, OUT_PATH)
+if report["changed"]:
+    print("Saved cleaned data to:", OUT_PATH)
 
-# Check Parking_Space exists
-if "Parking_Space" in df.columns:
-    # Fill with 0 (no parking) — safer than leaving all-NaN for imputer
-    df["Parking_Space"] = df["Parking_Space"].fillna(0)
-    print("Filled Parking_Space NaNs with 0.")
-else:
-    print("Column Parking_Space not present — nothing to do.")
+# Refresh the columnar copy so the app does not re-parse the CSV
+if report["changed"]:
+    try:
+        print("Saved columnar copy to:", convert_csv_to_columnar(OUT_PATH, columnar_path(OUT_PATH)))
+    except ImportError as e:
+        print("Columnar copy skipped:", e)
 
-# Save
-df.to_csv(OUT_PATH, index=False)
-print("Saved cleaned data to:", OUT_PATH)
-print("Sample values for Parking_Space:", df["Parking_Space"].head(5).tolist())
+if has_parking:
+    print("Sample values for Parking_Space:", load_frame(OUT_PATH, columns=["Parking_Space"])["Parking_Space"].head(5).tolist())
@@ -0,0 +1,128 @@
+# forest_eval.py
+import sys
+import weakref
+
+import numpy as np
+
+from model_registry import SCORING_ENGINES
+
+# scratch budget for the (trees x rows) traversal state of one block
+DEFAULT_MEMORY_BUDGET_BYTES = 256 * 1024 * 1024
+# int32 node id, int64 row offset and a few temporaries per (tree, row) pair
+_BYTES_PER_PAIR = 48
+# (tree, row) pairs per block that keep the traversal state cache-resident
+CACHE_PAIRS = 1 << 17
+# "auto" engine: batches up to this many rows use the NumPy evaluator, larger ones sklearn's C loop
+NUMPY_ENGINE_MAX_ROWS = 1024
+
+# traversal layout per CompactForest, built on first use
+_layouts = weakref.WeakKeyDictionary()
+
+
+def resolve_engine(engine, n_rows):
+    """Map "auto" to "numpy" for small batches (per-call overhead dominates) and "sklearn" otherwise."""
+    if engine == "auto":
+        return "numpy" if n_rows <= NUMPY_ENGINE_MAX_ROWS else "sklearn"
+    return engine
+
+
+def dense_float32(X):
+    """The dtype/layout the traversal indexes into (sparse one-hot blocks are densified)."""
+    sp = sys.modules.get("scipy.sparse")
+    if sp is not None and sp.issparse(X):
+        X = X.toarray()
+    return np.ascontiguousarray(np.asarray(X), dtype=np.float32)
+
+
+def block_rows_for(n_trees, n_rows, memory_budget_bytes=DEFAULT_MEMORY_BUDGET_BYTES, n_features=0):
+    per_row = n_trees * _BYTES_PER_PAIR + 4 * n_features
+    budget_rows = memory_budget_bytes // max(1, per_row)
+    return int(max(1, min(n_rows, budget_rows, CACHE_PAIRS // max(1, n_trees))))
+
+
+def traversal_layout(forest):
+    """
+    Branch-free arrays for forest_leaves(), derived from a CompactForest once and cached:
+    - child: (2 * n_nodes,) next node for (node, go_right); leaves point to themselves;
+    - feature / threshold: leaves test feature 0 against +inf; both of their children are themselves;
+    - depth: the deepest tree's depth, i.e. how many steps every pair needs.
+    """
+    try:
+        return _layouts[forest]
+    except (KeyError, TypeError):
+        pass
+    left = np.asarray(forest.children_left, dtype=np.int64)
+    right = np.asarray(forest.children_right, dtype=np.int64)
+    leaf = left < 0
+    ids = np.arange(left.size, dtype=np.int64)
+    index_dtype = np.int32 if left.size < np.iinfo(np.int32).max // 2 else np.int64
+    child = np.stack([np.where(leaf, ids, left), np.where(leaf, ids, right)], axis=1).ravel().astype(index_dtype)
+    feature = np.where(leaf, 0, np.asarray(forest.feature)).astype(np.int64)
+    threshold = np.where(leaf, np.inf, np.asarray(forest.threshold)).astype(np.float32)
+
+    depth, frontier = 0, np.asarray(forest.tree_offsets[:-1], dtype=np.int64)
+    while frontier.size:
+        internal = frontier[~leaf[frontier]]
+        if not internal.size:
+            break
+        frontier = np.concatenate([left[internal], right[internal]])
+        depth += 1
+
+    layout = {"child": child, "feature": feature, "threshold": threshold, "depth": depth}
+    try:
+        _layouts[forest] = layout
+    except TypeError:
+        pass
+    return layout
+
+
+def forest_leaves(layout, roots, X_block):
+    """
+    Leaf node id reached by every (tree, row) pair, shape (n_trees, n_rows).
+
+    All trees are walked together over flat arrays: each step gathers the split feature and
+    threshold of every pair, compares, and moves it to a child. Leaves loop to themselves, so
+    the loop is a fixed `depth` steps of a handful of NumPy calls with no per-step compaction,
+    instead of one Python-level predict() per tree.
+    """
+    n_trees, (n_rows, n_features) = len(roots), X_block.shape
+    child, feature, threshold = layout["child"], layout["feature"], layout["threshold"]
+    node = np.repeat(np.asarray(roots, dtype=child.dtype), n_rows)
+    row_offset = np.tile(np.arange(n_rows, dtype=np.int64) * n_features, n_trees)
+    X_flat = X_block.reshape(-1)
+    for _ in range(layout["depth"]):
+        # written as not(x <= t) so NaN goes right, as in the previous per-tree traversal
+        go_right = ~(X_flat[row_offset + feature[node]] <= threshold[node])
+        node = child[2 * node + go_right]
+    return node.reshape(n_trees, n_rows)
+
+
+def forest_values(forest, X, trees=None, memory_budget_bytes=DEFAULT_MEMORY_BUDGET_BYTES, reduce="mean", column=None):
+    """
+    Evaluate a CompactForest-like object (flat arrays + tree_offsets) on X in row blocks.
+    reduce="mean": (n_rows, n_values) average leaf value over the trees (predict / predict_proba);
+    reduce=None: (n_trees, n_rows) leaf values of `column` per tree (for uncertainty).
+    """
+    layout = traversal_layout(forest)
+    tree_ids = np.arange(forest.n_trees) if trees is None else np.asarray(trees)
+    roots = np.asarray(forest.tree_offsets)[tree_ids]
+    n_rows = X.shape[0]
+    values = np.asarray(forest.value)
+    if reduce == "mean":
+        out = np.zeros((n_rows, values.shape[1]), dtype=np.float64)
+    else:
+        out = np.empty((len(tree_ids), n_rows), dtype=np.float64)
+    step = block_rows_for(len(tree_ids), n_rows, memory_budget_bytes, X.shape[1])
+    for start in range(0, n_rows, step):
+        stop = min(n_rows, start + step)
+        leaves = forest_leaves(layout, roots, dense_float32(X[start:stop]))
+        if reduce == "mean":
+            # sum leaf values tree by tree to avoid a (trees x rows x values) temporary
+            acc = out[start:stop]
+            for t in range(len(tree_ids)):
+                acc += values[leaves[t]]
+        else:
+            out[:, start:stop] = values[leaves, 0 if column is None else column]
+    if reduce == "mean":
+        out /= len(tree_ids)
+    return out
@@ -0,0 +1,192 @@
+# frame_encoding.py
+import numpy as np
+import pandas as pd
+
+from columnar_store import CATEGORY_MAX_RATIO
+
+AMENITIES_COLUMN = "Amenities"
+AMENITY_BITS_COLUMN = "Amenities_Bits"
+# columns added by encode() that are not model inputs
+DERIVED_COLUMNS = (AMENITY_BITS_COLUMN,)
+# identifiers keep their dtype (they are echoed back in outputs and used as join keys)
+KEEP_DTYPE_COLUMNS = ("ID",)
+INT_DTYPES = (np.int8, np.uint8, np.int16, np.uint16, np.int32, np.uint32, np.int64)
+BIT_DTYPES = (np.uint8, np.uint16, np.uint32, np.uint64)
+
+
+def split_amenities(value):
+    """"Gym, Pool" -> ["Gym", "Pool"]; missing or empty -> []."""
+    if not isinstance(value, str):
+        return []
+    return [a.strip() for a in value.split(",") if a.strip()]
+
+
+def smallest_int_dtype(lo, hi):
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _float32_lossless(values):
+    values = np.asarray(values, dtype=np.float64)
+    return bool(np.array_equal(values.astype(np.float32).astype(np.float64), values, equal_nan=True))
+
+
+class FrameEncoding:
+    """
+    Compact in-memory representation of processed_df-shaped frames, derived once from the data:
+    - string columns -> pandas categoricals over a fixed, sorted category list, so every frame
+      encoded with the same FrameEncoding shares one dictionary and the same codes;
+    - integer columns -> the smallest integer dtype holding the training range;
+    - float columns -> float32 only where every value round-trips exactly (model inputs unchanged);
+    - Amenities -> additionally a packed bitset (Amenities_Bits), one bit per amenity.
+
+    encode() only narrows a column when the frame's values fit, so uploads with unseen categories
+    or out-of-range numbers are still encoded losslessly (unseen categories are appended).
+    """
+
+    def __init__(self, categories=None, int_dtypes=None, float32_cols=(), amenities=()):
+        self.categories = {c: list(v) for c, v in (categories or {}).items()}
+        self.int_dtypes = {c: np.dtype(d) for c, d in (int_dtypes or {}).items()}
+        self.float32_cols = list(float32_cols)
+        self.amenities = list(amenities)
+        self._known = {c: set(v) for c, v in self.categories.items()}
+        self._bit_of = {a: i for i, a in enumerate(self.amenities)}
+        self.bits_dtype = next((np.dtype(d) for d in BIT_DTYPES if np.iinfo(d).bits >= len(self.amenities)), None)
+
+    @classmethod
+    def from_frame(cls, df, max_ratio=CATEGORY_MAX_RATIO):
+        """One pass over df: category lists, integer ranges, float32-safe columns, amenity vocabulary."""
+        n_rows = max(1, len(df))
+        categories, int_dtypes, float32_cols = {}, {}, []
+        for c in df.columns:
+            if c in KEEP_DTYPE_COLUMNS or c in DERIVED_COLUMNS:
+                continue
+            s = df[c]
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                categories[c] = sorted(s.cat.categories, key=str)
+            elif pd.api.types.is_bool_dtype(s):
+                continue
+            elif pd.api.types.is_integer_dtype(s):
+                if len(s):
+                    int_dtypes[c] = smallest_int_dtype(int(s.min()), int(s.max()))
+            elif pd.api.types.is_float_dtype(s):
+                if s.dtype != np.float32 and _float32_lossless(s):
+                    float32_cols.append(c)
+            elif pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s):
+                uniques = pd.unique(s.dropna())
+                if len(uniques) <= max_ratio * n_rows:
+                    categories[c] = sorted(uniques, key=str)
+        amenities = ()
+        if AMENITIES_COLUMN in categories:
+            amenities = sorted({a for v in categories[AMENITIES_COLUMN] for a in split_amenities(v)})
+            if len(amenities) > np.iinfo(BIT_DTYPES[-1]).bits:
+                amenities = ()  # free text rather than a fixed list: no bitset
+        return cls(categories, int_dtypes, float32_cols, amenities)
+
+    # -------------------------
+    # Encoding
+    # -------------------------
+    def _categorical(self, s, categories):
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            if list(s.cat.categories) == categories:
+                return s  # already on the shared dictionary: no copy
+            present = s.cat.categories
+        else:
+            present = pd.unique(s.dropna())
+        known = self._known[s.name]
+        extra = sorted((v for v in present if v not in known), key=str)
+        if extra:
+            categories = categories + extra
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            return s.cat.set_categories(categories)
+        return pd.Series(pd.Categorical(s, categories=categories), index=s.index, name=s.name)
+
+    def _narrow_int(self, s, dtype):
+        if s.dtype == dtype or not len(s):
+            return s
+        if pd.api.types.is_integer_dtype(s):
+            lo, hi = int(s.min()), int(s.max())
+        elif pd.api.types.is_float_dtype(s) and s.notna().all() and np.array_equal(s, np.floor(s)):
+            lo, hi = s.min(), s.max()
+        else:
+            return s  # NaN, fractional or non-numeric values: leave it for alignment to coerce
+        info = np.iinfo(dtype)
+        return s.astype(dtype) if info.min <= lo and hi <= info.max else s
+
+    def encode(self, df, amenity_bits=True):
+        """
+        New frame with the compact dtypes; columns the encoding does not know are left as they are.
+        amenity_bits=False skips the derived Amenities_Bits column (e.g. for frames that are
+        written back out as CSV).
+        """
+        converted = {}
+        for c, categories in self.categories.items():
+            if c in df.columns:
+                s = self._categorical(df[c], categories)
+                if s is not df[c]:
+                    converted[c] = s
+        for c, dtype in self.int_dtypes.items():
+            if c in df.columns:
+                s = self._narrow_int(df[c], dtype)
+                if s is not df[c]:
+                    converted[c] = s
+        for c in self.float32_cols:
+            if c in df.columns and pd.api.types.is_float_dtype(df[c]) and df[c].dtype != np.float32:
+                if _float32_lossless(df[c]):
+                    converted[c] = df[c].astype(np.float32)
+        out = df.assign(**converted) if converted else df
+        if amenity_bits and self.amenities and AMENITIES_COLUMN in out.columns:
+            out = out.assign(**{AMENITY_BITS_COLUMN: self.amenity_bits(out[AMENITIES_COLUMN])})
+        return out
+
+    # -------------------------
+    # Amenities bitset
+    # -------------------------
+    def amenity_mask(self, names):
+        """Bit mask of the given amenity names (unknown names are ignored)."""
+        mask = 0
+        for name in names:
+            bit = self._bit_of.get(name)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def amenity_bits(self, amenities):
+        """Packed bitset per row of an Amenities column; each distinct string is parsed once."""
+        s = amenities if isinstance(amenities.dtype, pd.CategoricalDtype) else amenities.astype("category")
+        per_category = np.array([self.amenity_mask(split_amenities(v)) for v in s.cat.categories],
+                                dtype=self.bits_dtype)
+        codes = s.cat.codes.to_numpy()
+        bits = np.zeros(len(s), dtype=self.bits_dtype)
+        if per_category.size:
+            np.take(per_category, codes, out=bits, mode="clip")
+            bits[codes < 0] = 0
+        return pd.Series(bits, index=s.index, name=AMENITY_BITS_COLUMN)
+
+    def decode_amenities(self, bits):
+        """Amenity names set in one bitset value."""
+        return [a for i, a in enumerate(self.amenities) if int(bits) >> i & 1]
+
+
+# -------------------------
+# Memory report
+# -------------------------
+def memory_report(before, after):
+    """Per-column dtype and deep memory (bytes) before / after encoding, plus a total row."""
+    rows = []
+    for c in after.columns:
+        old = before[c] if c in before.columns else None
+        rows.append({
+            "column": c,
+            "dtype_before": str(old.dtype) if old is not None else "-",
+            "dtype_after": str(after[c].dtype),
+            "bytes_before": int(old.memory_usage(deep=True, index=False)) if old is not None else 0,
+            "bytes_after": int(after[c].memory_usage(deep=True, index=False)),
+        })
+    report = pd.DataFrame(rows)
+    total = {"column": "total", "dtype_before": "", "dtype_after": "",
+             "bytes_before": int(report["bytes_before"].sum()), "bytes_after": int(report["bytes_after"].sum())}
+    return pd.concat([report, pd.DataFrame([total])], ignore_index=True)
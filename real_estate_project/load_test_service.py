@@ -0,0 +1,149 @@
+# load_test_service.py
+# Load test for scoring_service.py: concurrent single-record requests through the micro-batched
+# endpoint vs. the naive per-request endpoint.
+#   python load_test_service.py --spawn [--requests 2000] [--concurrency 32] [--engine sklearn]
+#   python load_test_service.py --port 8765            (against a running service)
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+from scoring_service import DEFAULT_HOST, DEFAULT_PORT
+from synthetic_data import make_synthetic_properties
+
+PROCESSED_CSV = "data/final_data.csv"
+TARGETS = ["Good_Investment", "Future_Price_5Yrs"]
+ENDPOINTS = {"batched": "/score", "naive": "/score_naive"}
+
+
+def sample_records(n, seed=0):
+    if os.path.exists(PROCESSED_CSV):
+        df = pd.read_csv(PROCESSED_CSV, nrows=max(n, 1000))
+    else:
+        df = make_synthetic_properties(max(n, 1000), seed=seed)
+    df = df.drop(columns=[c for c in TARGETS if c in df.columns]).sample(n, replace=len(df) < n, random_state=seed)
+    # JSON has no NaN; missing fields are filled by the service's alignment
+    return [{k: v for k, v in row.items() if not (isinstance(v, float) and np.isnan(v))}
+            for row in json.loads(df.to_json(orient="records"))]
+
+
+async def request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    data = await reader.readexactly(length)
+    return status, json.loads(data)
+
+
+async def get_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return (await request(reader, writer, "GET", path))[1]
+    finally:
+        writer.close()
+
+
+async def run_mode(host, port, path, records, concurrency):
+    """Latencies (seconds) of len(records) requests sent by `concurrency` keep-alive clients."""
+    latencies, errors = [], 0
+    next_index = iter(range(len(records)))
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in next_index:
+                t0 = time.perf_counter()
+                status, _ = await request(reader, writer, "POST", path, records[i])
+                latencies.append(time.perf_counter() - t0)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return np.asarray(latencies), time.perf_counter() - t0, errors
+
+
+def wait_for_service(host, port, proc, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise SystemExit("scoring_service.py exited before it was ready")
+        try:
+            return asyncio.run(get_json(host, port, "/health"))
+        except OSError:
+            time.sleep(0.25)
+    raise SystemExit(f"service not reachable on {host}:{port} after {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test: micro-batched vs. naive per-request scoring")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--spawn", action="store_true", help="start scoring_service.py as a subprocess")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="passed to the spawned service")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="passed to the spawned service")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--modes", default="batched,naive")
+    parser.add_argument("--engine", default="sklearn",
+                        help="scoring engine of the spawned service (both endpoints use it); checked against a running one")
+    args = parser.parse_args()
+
+    proc = None
+    if args.spawn:
+        proc = subprocess.Popen([
+            sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scoring_service.py"),
+            "--host", args.host, "--port", str(args.port),
+            "--max-batch-size", str(args.max_batch_size), "--max-wait-ms", str(args.max_wait_ms),
+            "--engine", args.engine,
+        ])
+    try:
+        health = wait_for_service(args.host, args.port, proc)
+        print(f"Service ready (engine {health['engine']}, max batch {health['max_batch_size']}, "
+              f"max wait {health['max_wait_ms']:.1f} ms)")
+        if health["engine"] != args.engine:
+            print(f"Note: the running service scores both endpoints with {health['engine']}, not {args.engine}")
+        records = sample_records(args.requests)
+        asyncio.run(run_mode(args.host, args.port, ENDPOINTS["batched"], records[:50], 4))  # warm-up
+
+        print(f"\n{args.requests:,} requests, {args.concurrency} concurrent clients")
+        print(f"{'mode':<10}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'req/s':>10}{'errors':>8}")
+        for mode in [m for m in args.modes.split(",") if m]:
+            before = asyncio.run(get_json(args.host, args.port, "/health"))["batching"]
+            lat, elapsed, errors = asyncio.run(run_mode(args.host, args.port, ENDPOINTS[mode], records, args.concurrency))
+            p50, p99 = np.percentile(lat, [50, 99]) * 1e3
+            print(f"{mode:<10}{p50:>10.2f}{p99:>10.2f}{lat.mean() * 1e3:>10.2f}{len(lat) / elapsed:>10.0f}{errors:>8}")
+            if mode == "batched":
+                after = asyncio.run(get_json(args.host, args.port, "/health"))["batching"]
+                batches = after["batches"] - before["batches"]
+                if batches:
+                    print(f"{'':<10}mean batch size {(after['requests'] - before['requests']) / batches:.1f} "
+                          f"(max {after['max_batch']})")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# model_diagnostics.py
+# Load the app's model artifacts and report what it costs to serve them.
+#   python model_diagnostics.py [paths ...] [--json]
+#
+# Both models load in parallel, each in a fresh interpreter through model_registry's loader, so
+# load time and peak RSS are per model and not inflated by the other load. Per model: which
+# loader succeeded (compact / pickle / joblib / cloudpickle), load time, peak RSS, on-disk size,
+# in-memory tree arrays, tree count, mean/max depth and node count.
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+import numpy as np
+
+from model_registry import file_stat_key
+from startup import BackgroundLoader
+
+DEFAULT_PKL_PATHS = {"regressor": "models/regressor_pipeline.pkl", "classifier": "models/classifier_pipeline.pkl"}
+
+
+def default_paths():
+    """What the app would load: models/*_compact when exported, else the pickles."""
+    from scoring_core import default_model_path
+    return [default_model_path(p) for p in DEFAULT_PKL_PATHS.values()]
+
+
+def disk_bytes(path):
+    if not os.path.exists(path):
+        return None
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)
+                   if os.path.isfile(os.path.join(path, f)))
+    return os.path.getsize(path)
+
+
+def rss_mb(peak=True):
+    """Peak RSS of this process (ru_maxrss), or the current RSS when peak=False (Linux only)."""
+    import resource
+    if peak:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+# -------------------------
+# Tree statistics
+# -------------------------
+def _compact_tree_depths(forest):
+    """Depth of every tree of a CompactForest, walking all trees level by level."""
+    left = np.asarray(forest.children_left, dtype=np.int64)
+    right = np.asarray(forest.children_right, dtype=np.int64)
+    depths = np.zeros(forest.n_trees, dtype=np.int64)
+    frontier = np.asarray(forest.tree_offsets[:-1], dtype=np.int64)
+    owner = np.arange(forest.n_trees)
+    level = 0
+    while frontier.size:
+        internal = left[frontier] >= 0
+        frontier, owner = frontier[internal], owner[internal]
+        if not frontier.size:
+            break
+        level += 1
+        depths[owner] = level
+        frontier = np.concatenate([left[frontier], right[frontier]])
+        owner = np.concatenate([owner, owner])
+    return depths
+
+
+def forest_stats(model):
+    """Model type plus tree count, depth, node count and array bytes of its final forest (when it has one)."""
+    from shared_inference import split_pipeline
+
+    _, final = split_pipeline(model)
+    stats = {
+        "model_type": type(model).__name__,
+        "estimator_type": type(final).__name__,
+        "steps": list(model.named_steps) if hasattr(model, "named_steps") else None,
+        "n_features_in": getattr(model, "n_features_in_", None),
+    }
+    if hasattr(final, "tree_offsets"):
+        depths = _compact_tree_depths(final)
+        nodes = np.diff(np.asarray(final.tree_offsets))
+        leaves = int(np.count_nonzero(np.asarray(final.children_left) < 0))
+        tree_bytes = sum(getattr(final, name).nbytes for name in
+                         ("children_left", "children_right", "feature", "threshold", "value", "tree_offsets"))
+    elif getattr(final, "estimators_", None) is not None and hasattr(final.estimators_[0], "tree_"):
+        trees = [est.tree_ for est in final.estimators_]
+        depths = np.array([t.max_depth for t in trees])
+        nodes = np.array([t.node_count for t in trees])
+        leaves = int(sum(t.n_leaves for t in trees))
+        tree_bytes = 0
+        for t in trees:
+            state = t.__getstate__()
+            tree_bytes += state["nodes"].nbytes + state["values"].nbytes
+    else:
+        return stats
+    stats.update({
+        "n_trees": int(len(depths)),
+        "mean_depth": float(depths.mean()),
+        "max_depth": int(depths.max()),
+        "total_nodes": int(nodes.sum()),
+        "total_leaves": leaves,
+        "tree_bytes": int(tree_bytes),
+    })
+    return stats
+
+
+# -------------------------
+# One model (runs in a child process)
+# -------------------------
+def diagnose_here(path):
+    """Load `path` in this process and return its diagnostics record."""
+    import time
+    import sklearn  # noqa: F401  (import cost belongs to the baseline, not to the load)
+    from model_registry import load_model_with_method
+
+    record = {"path": path, "disk_bytes": disk_bytes(path), "baseline_rss_mb": rss_mb()}
+    t0 = time.perf_counter()
+    model, method, attempts = load_model_with_method(path)
+    record["load_seconds"] = time.perf_counter() - t0
+    record["peak_rss_mb"] = rss_mb()
+    record["resident_rss_mb"] = rss_mb(peak=False)
+    record["method"] = method
+    record["attempts"] = [{"method": name, "ok": err is None,
+                           "error": None if err is None else err.strip().splitlines()[-1]}
+                          for name, err in attempts]
+    if model is not None:
+        record.update(forest_stats(model))
+    return record
+
+
+def diagnose_in_child(path):
+    here = os.path.dirname(os.path.abspath(__file__))
+    # prepend, so packages the models unpickle from (found via the caller's PYTHONPATH) still import
+    pythonpath = os.pathsep.join(p for p in (here, os.environ.get("PYTHONPATH")) if p)
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", path],
+                          capture_output=True, text=True, env={**os.environ, "PYTHONPATH": pythonpath})
+    if proc.returncode != 0:
+        error = (proc.stderr.strip().splitlines() or ["exited without output"])[-1]
+        return {"path": path, "method": None, "attempts": [{"method": "process", "ok": False, "error": error}]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def diagnose(paths):
+    """Diagnostics record per path; all paths load at once, one child process each."""
+    loader = BackgroundLoader(max_workers=max(1, len(paths)))
+    futures = [loader.submit(path, file_stat_key(path), diagnose_in_child, path) for path in paths]
+    return [f.result() for f in futures]
+
+
+# -------------------------
+# Report
+# -------------------------
+def print_report(records):
+    for r in records:
+        print(r["path"])
+        tried = ", ".join(f"{a['method']} {'ok' if a['ok'] else 'failed'}" for a in r["attempts"])
+        print(f"  loader          {r['method'] or 'FAILED'}  ({tried})")
+        for a in r["attempts"]:
+            if not a["ok"]:
+                print(f"    {a['method']}: {a['error']}")
+        if r["method"] is None:
+            print()
+            continue
+        print(f"  load time       {r['load_seconds']:.2f} s")
+        print(f"  peak RSS        {r['peak_rss_mb']:.0f} MB "
+              f"(+{r['peak_rss_mb'] - r['baseline_rss_mb']:.0f} MB over a {r['baseline_rss_mb']:.0f} MB baseline)")
+        if r["resident_rss_mb"] is not None:
+            print(f"  resident after  {r['resident_rss_mb']:.0f} MB")
+        print(f"  on disk         {r['disk_bytes'] / 2**20:.1f} MB")
+        print(f"  type            {r['model_type']} -> {r['estimator_type']}"
+              + (f"  steps {r['steps']}" if r["steps"] else ""))
+        if "n_trees" in r:
+            print(f"  trees           {r['n_trees']}  depth mean {r['mean_depth']:.1f} / max {r['max_depth']}")
+            print(f"  nodes           {r['total_nodes']:,} ({r['total_leaves']:,} leaves, "
+                  f"{r['tree_bytes'] / 2**20:.1f} MB of tree arrays)")
+        print()
+    loaded = [r for r in records if r["method"] is not None]
+    if loaded:
+        baseline = max(r["baseline_rss_mb"] for r in loaded)
+        extra = sum(r["peak_rss_mb"] - r["baseline_rss_mb"] for r in loaded)
+        print(f"Estimated peak for one process loading all of them: ~{baseline + extra:.0f} MB "
+              f"(baseline {baseline:.0f} MB + {extra:.0f} MB of loads)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load model artifacts and report load cost and forest size")
+    parser.add_argument("paths", nargs="*", help="model files or compact dirs (default: what the app loads)")
+    parser.add_argument("--json", action="store_true", help="print the records as JSON")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        print(json.dumps(diagnose_here(args.child)))
+        return
+    records = diagnose(args.paths or default_paths())
+    if args.json:
+        print(json.dumps(records, indent=2))
+    else:
+        print_report(records)
+    if any(r["method"] is None for r in records):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# model_registry.py
+import os
+import pickle
+import hashlib
+import importlib
+import threading
+import traceback
+
+
+def _optional_module(name):
+    """Import an optional loader (joblib, cloudpickle) on first need; None when not installed."""
+    try:
+        return importlib.import_module(name)
+    except Exception:
+        return None
+
+
+# -------------------------
+# Artifact formats (numpy-free, so the app can pick paths and engines before numpy is imported)
+# -------------------------
+# scoring engines accepted by scoring.predict_with_model / shared_inference.score_shared; sklearn
+# first (the default): numpy/auto keep a flattened copy of each pickled forest and agree with
+# sklearn only to float32 precision, so they are opt-in
+SCORING_ENGINES = ("sklearn", "auto", "numpy")
+# marker file of a compact export (see compact_forest.py)
+COMPACT_META_FILE = "meta.json"
+
+
+def is_compact_dir(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, COMPACT_META_FILE))
+
+
+# -------------------------
+# Robust loader
+# -------------------------
+LOAD_METHODS = ("compact", "pickle", "joblib", "cloudpickle")
+
+
+def load_model_with_method(path):
+    """
+    Try to load model using pickle, then joblib, then cloudpickle.
+    joblib and cloudpickle are only imported when plain pickle fails.
+    Returns (model_or_None, method_or_None, attempts) where method is the loader that succeeded
+    (one of LOAD_METHODS) and attempts is [(method, error_traceback_or_None)] in the order tried.
+    """
+    if not os.path.exists(path):
+        return None, None, [("open", f"File not found: {path}")]
+    # 0) compact array-backed export (see compact_forest.py), memory-mapped
+    if os.path.isdir(path):
+        try:
+            from compact_forest import CompactPipeline
+            if not is_compact_dir(path):
+                return None, None, [("compact", f"Not a compact model directory: {path}")]
+            return CompactPipeline.load(path, mmap=True), "compact", [("compact", None)]
+        except Exception:
+            return None, None, [("compact", f"compact load error:\n{traceback.format_exc()}")]
+    attempts = []
+    # 1) pickle
+    try:
+        with open(path, "rb") as f:
+            model = pickle.load(f)
+        return model, "pickle", attempts + [("pickle", None)]
+    except Exception:
+        attempts.append(("pickle", traceback.format_exc()))
+
+    # 2) joblib
+    joblib = _optional_module("joblib")
+    if joblib is not None:
+        try:
+            model = joblib.load(path)
+            return model, "joblib", attempts + [("joblib", None)]
+        except Exception:
+            attempts.append(("joblib", traceback.format_exc()))
+    else:
+        attempts.append(("joblib", "joblib not installed"))
+
+    # 3) cloudpickle
+    cloudpickle = _optional_module("cloudpickle")
+    if cloudpickle is not None:
+        try:
+            with open(path, "rb") as f:
+                model = cloudpickle.load(f)
+            return model, "cloudpickle", attempts + [("cloudpickle", None)]
+        except Exception:
+            attempts.append(("cloudpickle", traceback.format_exc()))
+    else:
+        attempts.append(("cloudpickle", "cloudpickle not installed"))
+    return None, None, attempts
+
+
+def try_load_model(path):
+    """Returns (model_or_None, error_traceback_or_None); see load_model_with_method()."""
+    model, method, attempts = load_model_with_method(path)
+    if model is not None:
+        return model, None
+    if len(attempts) == 1:
+        return None, attempts[0][1]
+    return None, "\n\n".join(f"{name} error:\n{err}" for name, err in attempts)
+
+
+# -------------------------
+# File fingerprints
+# -------------------------
+def _dir_files(path):
+    return sorted(os.path.join(path, name) for name in os.listdir(path) if os.path.isfile(os.path.join(path, name)))
+
+
+def file_stat_key(path):
+    """Cheap (mtime_ns, size) key, or None if the file is missing. Directories use their newest file and total size."""
+    try:
+        if os.path.isdir(path):
+            stats = [os.stat(p) for p in _dir_files(path)]
+            return (max((s.st_mtime_ns for s in stats), default=0), sum(s.st_size for s in stats))
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def file_content_hash(path, chunk_size=1 << 20):
+    """sha256 of the file contents (every file, in name order, for a directory), read in chunks."""
+    h = hashlib.sha256()
+    paths = _dir_files(path) if os.path.isdir(path) else [path]
+    for p in paths:
+        h.update(os.path.basename(p).encode())
+        with open(p, "rb") as f:
+            for block in iter(lambda: f.read(chunk_size), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+# -------------------------
+# Process-wide registry
+# -------------------------
+class ModelRegistry:
+    """
+    Loads each model artifact once per process and hands the same object to every rerun/session.
+
+    Entries are keyed on the absolute path and remember the file's (mtime, size) and content hash.
+    A cheap stat runs on every get(); the file is only re-hashed when mtime/size changed, and only
+    re-loaded when the hash changed too (a `touch` does not force a multi-second unpickle).
+    _entries is only read or written under _lock; a get() that was loading while invalidate() ran
+    returns what it loaded but does not cache it.
+    """
+
+    def __init__(self, loader=try_load_model):
+        self._loader = loader
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._path_locks = {}
+        # bumped by invalidate(): all paths / one path
+        self._generation = 0
+        self._path_generations = {}
+
+    def _path_lock(self, key):
+        with self._lock:
+            lock = self._path_locks.get(key)
+            if lock is None:
+                lock = self._path_locks[key] = threading.Lock()
+            return lock
+
+    def _generation_of(self, key):
+        return self._generation, self._path_generations.get(key, 0)
+
+    def _store(self, key, generation, entry):
+        """Cache entry, unless invalidate() ran since get() read the old one (that would resurrect it)."""
+        with self._lock:
+            if self._generation_of(key) == generation:
+                self._entries[key] = entry
+
+    def get(self, path):
+        """Return (model_or_None, error_or_None), loading or reloading only when the file changed."""
+        key = os.path.abspath(path)
+        # one lock per path: concurrent sessions wait for a single load instead of each unpickling
+        with self._path_lock(key):
+            stat_key = file_stat_key(key)
+            with self._lock:
+                if stat_key is None:
+                    self._entries.pop(key, None)
+                    return None, f"File not found: {path}"
+                entry = self._entries.get(key)
+                generation = self._generation_of(key)
+            if entry is not None and entry["stat"] == stat_key:
+                return entry["model"], entry["error"]
+
+            content_hash = file_content_hash(key)
+            if entry is not None and entry["hash"] == content_hash and entry["model"] is not None:
+                self._store(key, generation, {**entry, "stat": stat_key})
+                return entry["model"], entry["error"]
+
+            model, err = self._loader(key)
+            self._store(key, generation, {
+                "stat": stat_key,
+                "hash": content_hash,
+                "model": model,
+                "error": err,
+            })
+            return model, err
+
+    def fingerprint(self, path):
+        """(path, mtime_ns, size, sha256) of the currently loaded artifact, or None if not loaded."""
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return (key,) + tuple(entry["stat"]) + (entry["hash"],)
+
+    def invalidate(self, path=None):
+        """Drop one cached artifact (or all of them) so the next get() reloads from disk."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._generation += 1
+            else:
+                key = os.path.abspath(path)
+                self._entries.pop(key, None)
+                self._path_generations[key] = self._path_generations.get(key, 0) + 1
@@ -0,0 +1,222 @@
+# parallel_batch.py
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import multiprocessing as mp
+
+import numpy as np
+
+from shared_inference import score_shared, split_pipeline
+from uncertainty import DEFAULT_QUANTILES
+from model_registry import try_load_model, file_stat_key, is_compact_dir
+
+DEFAULT_SHARD_ROWS = 20_000
+# parallel scoring is opt-in: pool startup costs seconds and only pays off with several free cores
+# and large batches; measure with bench_parallel.py on the deployment hardware before raising it
+DEFAULT_WORKERS = 1
+# compact exports of pickled forests, made once per (model file, mtime, size) for the workers to map
+SHARED_MODEL_DIR = os.path.join(tempfile.gettempdir(), "realestate-shared-models")
+
+# Loaded once per worker process by _init_worker
+_worker_models = {"clf": None, "reg": None}
+
+
+def start_method():
+    """forkserver where available, else spawn: workers never fork the multi-threaded app process."""
+    return "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+
+
+def default_workers():
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+# -------------------------
+# Shared model files
+# -------------------------
+def shared_model_path(path, model=None, cache_dir=SHARED_MODEL_DIR):
+    """
+    A memory-mappable compact export of the model at path, for worker processes: path itself when
+    it is already a compact export, else an export of `model` (or of the loaded file) cached under
+    cache_dir. Workers that np.load the same .npy files with mmap_mode share their pages, so the
+    forest is in memory once however many workers run. Falls back to path (one unpickled copy per
+    worker) when the model is not a forest the compact format supports.
+    """
+    if is_compact_dir(path):
+        return path
+    from compact_forest import export_pipeline
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    key = hashlib.sha256(f"{os.path.abspath(path)}:{file_stat_key(path)}".encode()).hexdigest()[:16]
+    out_dir = os.path.join(cache_dir, f"{stem}-{key}")
+    if is_compact_dir(out_dir):
+        return out_dir
+    if model is None:
+        model, _ = try_load_model(path)
+    tmp_dir = f"{out_dir}.tmp-{os.getpid()}"
+    try:
+        export_pipeline(model, tmp_dir, log=lambda *a: None)
+        os.replace(tmp_dir, out_dir)
+    except OSError:
+        if not is_compact_dir(out_dir):  # another process may have finished the same export first
+            return path
+    except Exception:
+        return path
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return out_dir
+
+
+# -------------------------
+# Worker side
+# -------------------------
+def _init_worker(model_paths):
+    # one core per worker: no nested joblib / BLAS thread pools competing with the other workers
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except Exception:
+        pass
+    for name, path in model_paths.items():
+        model, _ = try_load_model(path)  # compact exports are memory-mapped: the pages are shared
+        if model is not None:
+            _, final = split_pipeline(model)
+            if hasattr(final, "n_jobs"):
+                final.n_jobs = 1
+        _worker_models[name] = model
+
+
+def _score_shard(args):
+    X_shard, use_clf, use_reg, with_uncertainty, quantiles, engine = args
+    clf, reg = _worker_models["clf"] if use_clf else None, _worker_models["reg"] if use_reg else None
+    if (use_clf and clf is None) or (use_reg and reg is None):
+        raise RuntimeError("A worker could not load its models; see the model paths given to ParallelScorer")
+    scored = score_shared(X_shard, clf, reg, with_uncertainty=with_uncertainty, quantiles=quantiles,
+                          engine=engine, n_jobs=1)
+    scored.pop("X_trans", None)  # large and unused by callers; not worth pickling back
+    return scored
+
+
+# -------------------------
+# Reassembly
+# -------------------------
+def _concat(parts, key):
+    values = [p[key] for p in parts]
+    return None if values[0] is None else np.concatenate(values)
+
+
+def merge_scored(parts, quantiles):
+    """Concatenate score_shared() results of consecutive shards (in row order) into one result."""
+    bands = None
+    if parts[0]["bands"] is not None:
+        bands = {"mean": np.concatenate([p["bands"]["mean"] for p in parts]),
+                 "std": np.concatenate([p["bands"]["std"] for p in parts])}
+        if "quantiles" in parts[0]["bands"]:
+            bands["quantiles"] = {q: np.concatenate([p["bands"]["quantiles"][q] for p in parts]) for q in quantiles}
+    timings = {}
+    for p in parts:
+        for name, seconds in p["timings"].items():
+            timings[f"workers: {name}"] = timings.get(f"workers: {name}", 0.0) + seconds
+    return {
+        "clf_pred": _concat(parts, "clf_pred"),
+        "clf_proba": _concat(parts, "clf_proba"),
+        "reg_pred": _concat(parts, "reg_pred"),
+        "bands": bands,
+        "X_trans": None,
+        "shared": parts[0]["shared"],
+        "n_transforms": sum(p["n_transforms"] for p in parts),
+        "timings": timings,
+        "saved_seconds": sum(p["saved_seconds"] for p in parts),
+    }
+
+
+# -------------------------
+# Executor
+# -------------------------
+class ParallelScorer:
+    """
+    Drop-in for score_shared() that splits large aligned frames into shards of `shard_rows` and
+    scores them on `workers` processes, reassembling results in row order.
+
+    Workers are started with forkserver (spawn where it is unavailable), not forked from the app
+    process with its server and loader threads. They memory-map compact exports of the models
+    ({"clf": path, "reg": path}, the artifacts the caller passes in; pickled forests are exported
+    once, see shared_model_path), so N workers share one copy of the forest arrays through the page
+    cache instead of unpickling N copies. Workers therefore evaluate the trees with the numpy
+    traversal, which matches sklearn to float32 precision (~1e-5 on prices).
+
+    The pool is started once per (paths, file stats, workers); starting it takes seconds, so the
+    first sharded batch pays for it and later ones reuse it. Only pool setup is serialized:
+    concurrent batches share the pool. workers=1 (the default: parallel scoring is opt-in), frames
+    of one shard, or no model_paths are scored in-process.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, shard_rows=DEFAULT_SHARD_ROWS, model_paths=None):
+        self.workers = max(1, int(workers))
+        self.shard_rows = int(shard_rows)
+        self.model_paths = dict(model_paths or {})
+        self._pool = None
+        self._pool_key = None
+        self._lock = threading.Lock()
+
+    def configure(self, workers=None, shard_rows=None, model_paths=None):
+        """Change settings; new workers or model files start a new pool on the next call."""
+        with self._lock:
+            if workers is not None:
+                self.workers = max(1, int(workers))
+            if shard_rows is not None:
+                self.shard_rows = max(1, int(shard_rows))
+            if model_paths is not None:
+                self.model_paths = dict(model_paths)
+        return self
+
+    def _ensure_pool(self, model_paths, models, workers):
+        key = (tuple(sorted((n, p, file_stat_key(p)) for n, p in model_paths.items())), workers)
+        with self._lock:
+            if self._pool is not None and self._pool_key == key:
+                return self._pool
+            old = self._pool
+            shared_paths = {n: shared_model_path(p, models.get(n)) for n, p in model_paths.items()}
+            self._pool = mp.get_context(start_method()).Pool(workers, initializer=_init_worker,
+                                                             initargs=(shared_paths,))
+            self._pool_key = key
+        if old is not None:
+            # batches still running on the old pool finish there; its workers exit afterwards
+            old.close()
+            threading.Thread(target=old.join, daemon=True).start()
+        return self._pool
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool.join()
+            self._pool = self._pool_key = None
+
+    def __call__(self, X_df, clf_model=None, reg_model=None, with_uncertainty=True, quantiles=DEFAULT_QUANTILES,
+                 engine="sklearn"):
+        n_rows = len(X_df)
+        with self._lock:
+            workers, shard_rows = self.workers, self.shard_rows
+            model_paths = {n: self.model_paths[n] for n, m in (("clf", clf_model), ("reg", reg_model))
+                           if m is not None and n in self.model_paths}
+        has_paths = len(model_paths) == (clf_model is not None) + (reg_model is not None)
+        if workers <= 1 or n_rows <= shard_rows or not has_paths:
+            return score_shared(X_df, clf_model, reg_model, with_uncertainty=with_uncertainty,
+                                quantiles=quantiles, engine=engine)
+        t0 = time.perf_counter()
+        pool = self._ensure_pool(model_paths, {"clf": clf_model, "reg": reg_model}, workers)
+        quantiles = tuple(quantiles or ())
+        shards = [(X_df.iloc[start:start + shard_rows], clf_model is not None, reg_model is not None,
+                   with_uncertainty, quantiles, engine)
+                  for start in range(0, n_rows, shard_rows)]
+        parts = pool.map(_score_shard, shards, chunksize=1)
+        result = merge_scored(parts, quantiles)
+        result["timings"] = {f"parallel ({workers} workers, {len(shards)} shards)": time.perf_counter() - t0,
+                             **result["timings"]}
+        return result
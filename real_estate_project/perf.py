@@ -0,0 +1,236 @@
+# perf.py
+# Timing spans, optional cProfile / tracemalloc capture and JSON-lines performance logs.
+#   python perf.py summarize [logs/perf.jsonl]
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import logging
+import argparse
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+DEFAULT_LOG_PATH = os.path.join("logs", "perf.jsonl")
+PROFILE_TOP_N = 25
+TRACEMALLOC_TOP_N = 10
+
+# tracemalloc is process-wide: concurrent captures share one session of it, started by the first and
+# stopped by the last (never stopped when something else, e.g. python -X tracemalloc, started it)
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+
+def _acquire_tracemalloc():
+    """Start tracemalloc if needed; returns True when this capture is its only user."""
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+        return _tracemalloc_users == 1
+
+
+def _release_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+
+# -------------------------
+# Spans
+# -------------------------
+class Trace:
+    """
+    Wall-clock spans for one request (a single prediction or a batch run).
+
+    with trace.span("align"): ...  records {"name", "ms", "depth"}; spans may nest.
+    trace.add("transform", seconds, depth=1) records a duration measured elsewhere
+    (e.g. the per-stage timings returned by score_shared).
+    """
+
+    def __init__(self, name, **meta):
+        self.name = name
+        self.meta = meta
+        self.spans = []
+        self.profile_text = None
+        self.memory = None
+        self._depth = 0
+
+    @contextmanager
+    def span(self, name):
+        entry = {"name": name, "ms": None, "depth": self._depth}
+        self.spans.append(entry)
+        self._depth += 1
+        t0 = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry["ms"] = (time.perf_counter() - t0) * 1e3
+            self._depth -= 1
+
+    def add(self, name, seconds, depth=None):
+        self.spans.append({"name": name, "ms": seconds * 1e3, "depth": self._depth if depth is None else depth})
+
+    def add_timings(self, timings, depth=None):
+        for name, seconds in timings.items():
+            self.add(name, seconds, depth)
+
+    @property
+    def total_ms(self):
+        return sum(s["ms"] for s in self.spans if s["depth"] == 0 and s["ms"] is not None)
+
+    @contextmanager
+    def capture(self, profile=False, trace_memory=False):
+        """
+        Optionally run the block under cProfile and/or tracemalloc and keep the top entries.
+        Both are process-wide, so concurrent sessions show up in each other's captures (and the
+        peak is only reset when no other capture is tracing memory).
+        """
+        profiler = cProfile.Profile() if profile else None
+        before = None
+        if trace_memory:
+            if _acquire_tracemalloc():
+                tracemalloc.reset_peak()
+            if tracemalloc.is_tracing():
+                before = tracemalloc.take_snapshot()
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:  # another session is being profiled (one profiler per process)
+                profiler = None
+                self.profile_text = "cProfile is busy in another session; try again."
+        try:
+            yield self
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+                self.profile_text = out.getvalue()
+            if trace_memory:
+                # skipped when tracing was stopped outside the refcount meanwhile
+                if before is not None and tracemalloc.is_tracing():
+                    current, peak = tracemalloc.get_traced_memory()
+                    top = tracemalloc.take_snapshot().compare_to(before, "lineno")[:TRACEMALLOC_TOP_N]
+                    self.memory = {
+                        "current_mb": current / 2**20,
+                        "peak_mb": peak / 2**20,
+                        "top": [{"where": str(s.traceback[0]), "size_diff_kb": s.size_diff / 1024, "count_diff": s.count_diff}
+                                for s in top],
+                    }
+                _release_tracemalloc()
+
+    def to_record(self):
+        record = {
+            "event": "perf",
+            "trace": self.name,
+            "ts": time.time(),
+            "total_ms": self.total_ms,
+            "spans": self.spans,
+            **self.meta,
+        }
+        if self.memory is not None:
+            record["memory"] = {k: v for k, v in self.memory.items() if k != "top"}
+        if self.profile_text is not None:
+            record["profiled"] = True
+        return record
+
+
+# -------------------------
+# JSON-lines log
+# -------------------------
+_loggers = {}
+_loggers_lock = threading.Lock()
+
+
+def get_perf_logger(path=DEFAULT_LOG_PATH):
+    """A logging.Logger that appends one JSON object per line to `path` (shared per path)."""
+    path = os.path.abspath(path)
+    with _loggers_lock:
+        logger = _loggers.get(path)
+        if logger is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            logger = logging.getLogger(f"real_estate.perf.{len(_loggers)}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = logging.FileHandler(path, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            _loggers[path] = logger
+        return logger
+
+
+def new_session_id():
+    return uuid.uuid4().hex[:12]
+
+
+def log_trace(trace, path=DEFAULT_LOG_PATH, **extra):
+    """Append trace.to_record() (plus extra fields such as session id) as one JSON line."""
+    try:
+        get_perf_logger(path).info(json.dumps({**trace.to_record(), **extra}, default=str))
+    except OSError:
+        pass  # a read-only deployment must not break predictions
+
+
+# -------------------------
+# Aggregation
+# -------------------------
+def _percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    k = (len(values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def summarize(path=DEFAULT_LOG_PATH):
+    """{(trace, span): {"count", "mean_ms", "p50_ms", "p95_ms"}} over every record in the log."""
+    samples = {}
+    sessions = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            sessions.add(record.get("session"))
+            samples.setdefault((record["trace"], "total"), []).append(record["total_ms"])
+            for span in record.get("spans", []):
+                if span.get("ms") is not None:
+                    samples.setdefault((record["trace"], span["name"]), []).append(span["ms"])
+    summary = {
+        key: {"count": len(v), "mean_ms": sum(v) / len(v), "p50_ms": _percentile(v, 0.5), "p95_ms": _percentile(v, 0.95)}
+        for key, v in samples.items()
+    }
+    return summary, len(sessions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Performance log tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("summarize", help="per-stage latency across all logged sessions")
+    p.add_argument("path", nargs="?", default=DEFAULT_LOG_PATH)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        sys.exit(f"No log at {args.path}")
+    summary, n_sessions = summarize(args.path)
+    print(f"{n_sessions} session(s) in {args.path}\n")
+    print(f"{'trace':<10}{'stage':<32}{'count':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for (trace, stage), s in sorted(summary.items()):
+        print(f"{trace:<10}{stage:<32}{s['count']:>7}{s['mean_ms']:>10.2f}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
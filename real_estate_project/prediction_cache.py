@@ -0,0 +1,183 @@
+# prediction_cache.py
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from shared_inference import score_shared
+from uncertainty import DEFAULT_QUANTILES
+
+# identifiers that say which listing a row is, not what it is worth: rows differing only here
+# share one cache entry (and one scoring pass in a batch)
+NON_PREDICTIVE_COLUMNS = ("ID",)
+DEFAULT_MAX_ENTRIES = 50_000
+DEFAULT_TTL_SECONDS = 60 * 60
+# two independent 64-bit row hashes -> 128-bit keys (hash_key must be 16 characters)
+_HASH_KEYS = ("realestate-cache", "prediction-rows!")
+
+
+def row_keys(X_df, exclude=NON_PREDICTIVE_COLUMNS):
+    """(n_rows, 2) uint64 content hash of every aligned feature row, ignoring `exclude` columns."""
+    cols = [c for c in X_df.columns if c not in exclude]
+    X = X_df[cols]
+    return np.stack(
+        [pd.util.hash_pandas_object(X, index=False, hash_key=k).to_numpy() for k in _HASH_KEYS], axis=1
+    )
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU + TTL map from (scoring options, row hash) to one row of predictions.
+
+    All entries belong to one model fingerprint; check_fingerprint() drops them as soon as a
+    different regressor/classifier artifact is in use, so stale predictions are never served.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_entries = int(max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, value, nbytes)
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._bytes = 0
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidations": 0}
+
+    def check_fingerprint(self, fingerprint):
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                if self._entries:
+                    self.counters["invalidations"] += 1
+                self._entries.clear()
+                self._bytes = 0
+                self._fingerprint = fingerprint
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_many(self, keys):
+        """Cached value (or None) per key; hits move to the most-recently-used end."""
+        now = time.monotonic()
+        out = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] < now:
+                    self._drop(key)
+                    self.counters["expired"] += 1
+                    entry = None
+                if entry is None:
+                    self.counters["misses"] += 1
+                    out.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.counters["hits"] += 1
+                    out.append(entry[1])
+        return out
+
+    def put_many(self, keys, values):
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else float("inf")
+        with self._lock:
+            for key, value in zip(keys, values):
+                if key in self._entries:
+                    self._drop(key)
+                nbytes = sys.getsizeof(key) + sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value)
+                self._entries[key] = (expires_at, value, nbytes)
+                self._bytes += nbytes
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.counters["evictions"] += 1
+
+    def _drop(self, key):
+        self._bytes -= self._entries.pop(key)[2]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+# -------------------------
+# Cached scoring
+# -------------------------
+def _rows_from_scored(scored, n_rows, quantiles):
+    """Split a score_shared() result into per-row tuples (clf_pred, clf_proba, reg_pred, std, q...)."""
+    bands = scored["bands"]
+    columns = [scored["clf_pred"], scored["clf_proba"], scored["reg_pred"],
+               bands["std"] if bands is not None else None]
+    columns += [bands["quantiles"][q] if bands is not None and "quantiles" in bands else None for q in quantiles]
+    columns = [list(c) if c is not None else [None] * n_rows for c in columns]
+    return list(zip(*columns))
+
+
+def score_shared_cached(X_df, clf_model=None, reg_model=None, cache=None, fingerprint=None,
+                        with_uncertainty=True, quantiles=DEFAULT_QUANTILES, engine="sklearn",
+                        exclude=NON_PREDICTIVE_COLUMNS, scorer=None):
+    """
+    score_shared() behind a PredictionCache, returning the same dict plus "cache" counts.
+
+    Rows are keyed on their aligned feature values (minus `exclude`); duplicate rows in X_df are
+    scored once, cached rows not at all, and results are fanned back out to every input row.
+    `fingerprint` identifies the loaded models (e.g. ModelRegistry.fingerprint of both paths).
+    `scorer` replaces score_shared for the rows that do need scoring (e.g. a ParallelScorer).
+    Entries are keyed on the scoring options too (models used, uncertainty, quantiles, engine).
+    """
+    score = scorer or score_shared
+    if cache is None:
+        return score(X_df, clf_model, reg_model, with_uncertainty=with_uncertainty,
+                     quantiles=quantiles, engine=engine)
+    t0 = time.perf_counter()
+    quantiles = tuple(quantiles or ())
+    cache.check_fingerprint(fingerprint)
+    hashes = row_keys(X_df, exclude)
+    unique, first, inverse = np.unique(hashes, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    # the engines agree only to float32 precision, so their predictions are cached apart
+    options = (clf_model is not None, reg_model is not None, bool(with_uncertainty), quantiles, engine)
+    keys = [(options, int(a), int(b)) for a, b in unique]
+    values = cache.get_many(keys)
+    timings = {"cache lookup": time.perf_counter() - t0}
+
+    missing = [i for i, v in enumerate(values) if v is None]
+    scored = None
+    if missing:
+        scored = score(X_df.iloc[first[missing]], clf_model, reg_model, with_uncertainty=with_uncertainty,
+                       quantiles=quantiles, engine=engine)
+        new_rows = _rows_from_scored(scored, len(missing), quantiles)
+        cache.put_many([keys[i] for i in missing], new_rows)
+        for i, row in zip(missing, new_rows):
+            values[i] = row
+        timings.update(scored["timings"])
+
+    # fan the unique rows back out to every input row
+    columns = []
+    for j in range(4 + len(quantiles)):
+        col = [v[j] for v in values]
+        columns.append(None if col and col[0] is None else np.asarray(col)[inverse])
+
+    bands = None
+    if reg_model is not None and with_uncertainty and columns[3] is not None:
+        bands = {"mean": columns[2], "std": columns[3]}
+        if quantiles and columns[4] is not None:
+            bands["quantiles"] = {q: columns[4 + k] for k, q in enumerate(quantiles)}
+    return {
+        "clf_pred": columns[0] if clf_model is not None else None,
+        "clf_proba": columns[1] if clf_model is not None else None,
+        "reg_pred": columns[2] if reg_model is not None else None,
+        "bands": bands,
+        "X_trans": scored["X_trans"] if scored is not None else None,
+        "shared": scored["shared"] if scored is not None else False,
+        "n_transforms": scored["n_transforms"] if scored is not None else 0,
+        "timings": timings,
+        "saved_seconds": scored["saved_seconds"] if scored is not None else 0.0,
+        "cache": {"rows": len(X_df), "unique": len(keys), "hits": len(keys) - len(missing), "misses": len(missing)},
+    }
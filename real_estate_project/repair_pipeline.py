@@ -0,0 +1,431 @@
+# repair_pipeline.py
+import io
+import os
+import re
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from columnar_store import columnar_path, is_fresh, iter_frames
+
+DEFAULT_PARTITION_ROWS = 200_000
+MANIFEST_VERSION = 1
+
+
+# -------------------------
+# Declarative per-column rules
+# -------------------------
+class RepairRule:
+    """A chunk-local repair step. Subclasses set `kind` and implement apply(df) -> df."""
+
+    kind = "rule"
+    row_local = True  # False for rules that need to see rows across partitions
+
+    def __init__(self, column=None, **params):
+        self.column = column
+        self.params = params
+
+    def spec(self):
+        return {"kind": self.kind, "column": self.column, **{k: repr(v) for k, v in sorted(self.params.items())}}
+
+    def applies_to(self, df):
+        return self.column is None or self.column in df.columns
+
+    def apply(self, df):
+        raise NotImplementedError
+
+    def __repr__(self):
+        args = ", ".join(f"{k}={v!r}" for k, v in self.params.items())
+        return f"{type(self).__name__}({self.column!r}{', ' + args if args else ''})"
+
+
+class ReplaceInf(RepairRule):
+    """Replace +/-inf with NaN in one column, or in every numeric column when column is None."""
+
+    kind = "replace_inf"
+
+    def apply(self, df):
+        cols = [self.column] if self.column is not None else df.select_dtypes(include=[np.number]).columns
+        for c in cols:
+            if pd.api.types.is_float_dtype(df[c]):
+                df[c] = df[c].replace([np.inf, -np.inf], np.nan)
+        return df
+
+
+class Fill(RepairRule):
+    """Fill NaNs in a column with a constant."""
+
+    kind = "fill"
+
+    def __init__(self, column, value):
+        super().__init__(column, value=value)
+
+    def apply(self, df):
+        df[self.column] = df[self.column].fillna(self.params["value"])
+        return df
+
+
+class Clip(RepairRule):
+    """Clip a numeric column to [lower, upper] (either bound may be None)."""
+
+    kind = "clip"
+
+    def __init__(self, column, lower=None, upper=None):
+        super().__init__(column, lower=lower, upper=upper)
+
+    def apply(self, df):
+        df[self.column] = pd.to_numeric(df[self.column], errors="coerce").clip(self.params["lower"], self.params["upper"])
+        return df
+
+
+class Cast(RepairRule):
+    """Cast a column to a dtype (e.g. "int64", "float32", "string")."""
+
+    kind = "cast"
+
+    def __init__(self, column, dtype):
+        super().__init__(column, dtype=dtype)
+
+    def apply(self, df):
+        df[self.column] = df[self.column].astype(self.params["dtype"])
+        return df
+
+
+class Dedupe(RepairRule):
+    """Drop rows whose `subset` columns (all columns by default) already appeared earlier in the file."""
+
+    kind = "dedupe"
+    row_local = False
+
+    def __init__(self, subset=None):
+        super().__init__(None, subset=tuple(subset) if subset else None)
+
+    def row_hashes(self, df):
+        subset = self.params["subset"]
+        return pd.util.hash_pandas_object(df[list(subset)] if subset else df, index=False).to_numpy()
+
+
+# -------------------------
+# Pipeline
+# -------------------------
+def sha256_hex(data):
+    """Hex SHA-256 of bytes (content ids for partitions and batch jobs)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def write_atomic(path, write_fn, mode="wb"):
+    """write_fn(f) into a temp file next to path, then rename it into place."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, mode) as f:
+            write_fn(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+_INT_TEXT = re.compile(r"[+-]?\d+")
+
+
+def pinned_dtypes(header, body):
+    """
+    read_csv dtypes for every partition, inferred once from the first one. Integer columns become
+    nullable Int64 (also when the first partition has gaps), so a value is written as 1 in every
+    partition rather than 1 in some and 1.0 in others.
+    """
+    df = pd.read_csv(io.BytesIO(header + body))
+    floats = [c for c in df.columns if pd.api.types.is_float_dtype(df[c])]
+    text = pd.read_csv(io.BytesIO(header + body), usecols=floats, dtype=str) if floats else None
+    dtypes = {}
+    for c, dtype in df.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype):
+            dtypes[c] = "boolean"
+        elif pd.api.types.is_integer_dtype(dtype):
+            dtypes[c] = "Int64"
+        elif pd.api.types.is_float_dtype(dtype):
+            values = text[c].dropna()
+            dtypes[c] = "Int64" if len(values) and values.str.fullmatch(_INT_TEXT).all() else "float64"
+        else:
+            dtypes[c] = "object"
+    return dtypes
+
+
+# a column that does not parse as its pinned dtype is widened one step and the run restarts
+_WIDER = {"boolean": "object", "Int64": "float64", "float64": "object"}
+
+
+class _DtypesWidened(Exception):
+    def __init__(self, dtypes):
+        super().__init__("partition dtypes widened")
+        self.dtypes = dtypes
+        self.written = set()
+
+
+def read_partition(header, body, dtypes):
+    """One partition parsed with the pinned dtypes; raises _DtypesWidened when a column does not fit."""
+    data = header + body
+    try:
+        return pd.read_csv(io.BytesIO(data), dtype=dtypes)
+    except (ValueError, TypeError, OverflowError):
+        pass
+    # rare: re-parse column by column to find the ones that do not fit
+    widened = dict(dtypes)
+    for c, dtype in dtypes.items():
+        if dtype == "object":
+            continue
+        try:
+            pd.read_csv(io.BytesIO(data), usecols=[c], dtype={c: dtype})
+        except (ValueError, TypeError, OverflowError):
+            widened[c] = _WIDER[dtype]
+    if widened == dtypes:  # nothing to widen: a genuine parse error
+        return pd.read_csv(io.BytesIO(data), dtype=dtypes)
+    raise _DtypesWidened(widened)
+
+
+def plain_frame(df):
+    """Categorical columns (as the columnar store dictionary-encodes strings) back to their values."""
+    cats = {c: df[c].astype(df[c].cat.categories.dtype) for c in df.columns
+            if isinstance(df[c].dtype, pd.CategoricalDtype)}
+    return df.assign(**cats) if cats else df
+
+
+def frame_digest(df):
+    """
+    Content id of a frame that does not depend on how it was typed: numbers compare as float64
+    (1 == 1.0 == Int64 1) and everything else by value, with missing values equal.
+    """
+    normalized = {}
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_numeric_dtype(s) and not isinstance(s.dtype, pd.CategoricalDtype):
+            normalized[c] = s.astype("float64")
+        else:
+            normalized[c] = s.astype(object).where(s.notna(), None)
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(normalized, index=df.index), index=False).to_numpy()
+    return sha256_hex(json.dumps([str(c) for c in df.columns]).encode() + hashes.tobytes())
+
+
+def iter_csv_partitions(path, partition_rows):
+    """
+    Yield (header_bytes, body_bytes, n_rows) per partition of raw CSV lines, without parsing.
+    A record whose quoted field spans several lines is kept whole (quote parity check).
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        buf, n_rows, pending = [], 0, b""
+        for line in f:
+            if pending:
+                line = pending + line
+            if line.count(b'"') % 2:
+                pending = line
+                continue
+            pending = b""
+            buf.append(line)
+            n_rows += 1
+            if n_rows >= partition_rows:
+                yield header, b"".join(buf), n_rows
+                buf, n_rows = [], 0
+        if pending:
+            buf.append(pending)
+            n_rows += 1
+        if buf:
+            yield header, b"".join(buf), n_rows
+
+
+class RepairPipeline:
+    """
+    Applies declarative rules to a CSV in fixed-size partitions with bounded memory.
+
+    Every partition is parsed with the same dtypes, inferred from the first one (see pinned_dtypes);
+    a later partition that does not fit widens the column and the pass restarts. When the input has a
+    fresh columnar copy (columnar_store), partitions are sliced from its memory map instead; they are
+    already typed and are identified by frame_digest rather than their CSV bytes.
+    Each partition's raw bytes are hashed together with the rule specs; partitions whose hash is
+    unchanged since the last run (recorded in <out>.manifest.json) reuse their repaired part file
+    from <out>.parts/ instead of being parsed again. The repaired part's hash is recorded too, so
+    when repairing in place (the input is the previous output) untouched partitions still match.
+    Dedupe can shift rows between partitions of the output, so in place it only reuses the
+    partitions before the first dropped row. Cross-partition rules (Dedupe) run while the
+    parts are streamed into the output, which is written to a temp file and renamed into place.
+    Re-running on the pipeline's own output (e.g. repairing in place) is detected from the manifest
+    and does nothing.
+    """
+
+    def __init__(self, rules, partition_rows=DEFAULT_PARTITION_ROWS):
+        self.rules = list(rules)
+        self.partition_rows = int(partition_rows)
+        self.row_rules = [r for r in self.rules if r.row_local]
+        self.dedupe_rules = [r for r in self.rules if isinstance(r, Dedupe)]
+
+    def rules_hash(self):
+        return sha256_hex(json.dumps([r.spec() for r in self.rules], sort_keys=True).encode())
+
+    @staticmethod
+    def manifest_path(out_path):
+        return out_path + ".manifest.json"
+
+    @staticmethod
+    def parts_dir(out_path):
+        return out_path + ".parts"
+
+    def _load_manifest(self, out_path):
+        try:
+            with open(self.manifest_path(out_path)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("rules_hash") != self.rules_hash():
+            return None
+        return manifest
+
+    def repair_frame(self, df):
+        """Apply the row-local rules to one in-memory frame (columns missing from df are skipped)."""
+        for rule in self.row_rules:
+            if rule.applies_to(df):
+                df = rule.apply(df)
+        return df
+
+    def run(self, in_path, out_path, log=print, columnar=True):
+        rules_hash = self.rules_hash()
+        manifest = self._load_manifest(out_path)
+        source = columnar_path(in_path) if columnar and is_fresh(columnar_path(in_path), in_path) else None
+        in_hash = _file_hash(in_path if os.path.exists(in_path) or source is None else source)
+        if manifest is not None and os.path.exists(out_path) and in_hash in (
+            manifest.get("input_hash"), manifest.get("output_hash")
+        ):
+            log("Input unchanged since last repair — nothing to do.")
+            return {"partitions": 0, "repaired": 0, "skipped": 0, "rows": manifest.get("rows", 0), "changed": False}
+
+        old_parts = {p["index"]: p for p in (manifest or {}).get("partitions", [])}
+        parts_dir = self.parts_dir(out_path)
+        os.makedirs(parts_dir, exist_ok=True)
+
+        if source is not None:
+            log(f"Reading partitions from the columnar copy {source}")
+            dtypes = None  # typed by the store
+        else:
+            first = next(iter_csv_partitions(in_path, self.partition_rows), None)
+            dtypes = pinned_dtypes(*first[:2]) if first is not None else {}
+        while True:
+            try:
+                partitions, repaired, skipped, rows = self._repair_partitions(
+                    in_path, source, parts_dir, old_parts, rules_hash, dtypes
+                )
+                break
+            except _DtypesWidened as e:
+                log(f"Widened column dtypes to {e.dtypes}; restarting.")
+                dtypes = e.dtypes
+                # part files rewritten in the aborted pass no longer match their manifest entries
+                old_parts = {i: p for i, p in old_parts.items() if i not in e.written}
+
+        # drop part files left over from a longer previous input
+        keep = {p["part"] for p in partitions}
+        for name in os.listdir(parts_dir):
+            if name.startswith("part-") and name not in keep:
+                os.remove(os.path.join(parts_dir, name))
+
+        out_rows = self._assemble(in_path, parts_dir, partitions, out_path)
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "rules": [r.spec() for r in self.rules],
+            "rules_hash": rules_hash,
+            "input": os.path.abspath(in_path),
+            "source": os.path.abspath(source or in_path),
+            "input_hash": in_hash,
+            "output_hash": _file_hash(out_path),
+            "rows": out_rows,
+            "dtypes": dtypes,
+            "partitions": partitions,
+        }
+        write_atomic(self.manifest_path(out_path), lambda f: json.dump(manifest, f, indent=2), mode="w")
+        log(f"Repaired {repaired} partition(s), reused {skipped}; wrote {out_rows:,} rows to {out_path}")
+        return {"partitions": len(partitions), "repaired": repaired, "skipped": skipped, "rows": out_rows, "changed": True}
+
+    def _iter_partitions(self, in_path, source, dtypes):
+        """Yield (content id bytes, load() -> frame, n_rows) per partition of the CSV or its columnar copy."""
+        if source is not None:
+            for df in iter_frames(source, self.partition_rows):
+                df = plain_frame(df)
+                yield frame_digest(df).encode(), (lambda df=df: df), len(df)
+            return
+        for header, body, n_rows in iter_csv_partitions(in_path, self.partition_rows):
+            yield header + body, (lambda header=header, body=body: read_partition(header, body, dtypes)), n_rows
+
+    def _repair_partitions(self, in_path, source, parts_dir, old_parts, rules_hash, dtypes):
+        """Repair (or reuse) each partition's part file; returns (partitions, repaired, skipped, rows)."""
+        salt = (rules_hash + json.dumps(dtypes, sort_keys=True)).encode()
+        partitions, repaired, skipped, rows, written = [], 0, 0, 0, set()
+        for index, (content, load, n_rows) in enumerate(self._iter_partitions(in_path, source, dtypes)):
+            part_hash = sha256_hex(salt + content)
+            part_path = os.path.join(parts_dir, f"part-{index:05d}.csv")
+            old = old_parts.get(index)
+            if (old is not None and part_hash in (old["hash"], old.get("out_hash"))
+                    and os.path.exists(part_path)):
+                out_hash = old.get("out_hash")
+                skipped += 1
+            else:
+                try:
+                    df = load()
+                except _DtypesWidened as e:
+                    e.written = written
+                    raise
+                df = self.repair_frame(df)
+                text = df.to_csv(index=False).encode("utf-8")
+                write_atomic(part_path, lambda f: f.write(text))
+                written.add(index)
+                # what this partition hashes to when the output (or its columnar copy) is the next run's input
+                out_hash = sha256_hex(salt + (frame_digest(df).encode() if source is not None else text))
+                repaired += 1
+            partitions.append({"index": index, "hash": part_hash, "out_hash": out_hash, "rows": n_rows,
+                               "part": os.path.basename(part_path)})
+            rows += n_rows
+        return partitions, repaired, skipped, rows
+
+    def _assemble(self, in_path, parts_dir, partitions, out_path):
+        """Stream the part files into out_path (atomically), applying cross-partition rules."""
+        state = {"rows": 0}
+
+        def write(f):
+            if not partitions:
+                with open(in_path, "rb") as src:
+                    f.write(src.readline())
+                return
+            seen = [np.empty(0, dtype=np.uint64) for _ in self.dedupe_rules]
+            for i, p in enumerate(partitions):
+                part_path = os.path.join(parts_dir, p["part"])
+                if not self.dedupe_rules:
+                    with open(part_path, "rb") as part:
+                        header = part.readline()
+                        if i == 0:
+                            f.write(header)
+                        for block in iter(lambda: part.read(1 << 20), b""):
+                            f.write(block)
+                    state["rows"] += p["rows"]
+                    continue
+                # parts are compared as the text they were written as (dtypes are pinned per run)
+                df = pd.read_csv(part_path, dtype=str, keep_default_na=False)
+                keep = np.ones(len(df), dtype=bool)
+                for j, rule in enumerate(self.dedupe_rules):
+                    hashes = rule.row_hashes(df)
+                    _, first = np.unique(hashes, return_index=True)
+                    unique_in_part = np.zeros(len(df), dtype=bool)
+                    unique_in_part[first] = True
+                    keep &= unique_in_part & ~np.isin(hashes, seen[j])
+                    seen[j] = np.union1d(seen[j], hashes)
+                df = df[keep]
+                f.write(df.to_csv(index=False, header=(i == 0)).encode("utf-8"))
+                state["rows"] += len(df)
+
+        write_atomic(out_path, write)
+        return state["rows"]
@@ -0,0 +1,161 @@
+# scoring.py
+import pandas as pd
+
+from feature_schema import FeatureSchema
+from shared_inference import split_pipeline, align_for_raw_estimator
+from compact_forest import compile_forest
+from frame_encoding import DERIVED_COLUMNS
+from forest_eval import SCORING_ENGINES, resolve_engine
+from uncertainty import DEFAULT_QUANTILES, DEFAULT_MEMORY_BUDGET_BYTES, tree_prediction_stats
+
+# -------------------------
+# Infer feature list
+# -------------------------
+def infer_feature_list_from_models(processed_df, reg_model, clf_model):
+    """
+    Priority:
+      1) model.feature_names_in_ on reg_model or clf_model
+      2) processed_df columns excluding known target columns and derived columns (Amenities_Bits)
+    """
+    for m in (reg_model, clf_model):
+        if m is not None and hasattr(m, "feature_names_in_"):
+            try:
+                return list(getattr(m, "feature_names_in_"))
+            except Exception:
+                pass
+    if processed_df is not None:
+        cols = list(processed_df.columns)
+        for t in ["Good_Investment", "Future_Price_5Yrs", *DERIVED_COLUMNS]:
+            if t in cols:
+                cols.remove(t)
+        return cols
+    return None
+
+
+# -------------------------
+# Utilities
+# -------------------------
+def align_inputs_to_features(input_df: pd.DataFrame, feature_list: list, processed_df=None, schema=None):
+    """
+    Align input_df to required feature_list:
+    - Rename common user-friendly names to expected names
+    - Add missing columns with sensible defaults
+    - Reorder columns to match feature_list
+    Pass a prebuilt FeatureSchema to skip recomputing dtypes/medians from processed_df on every call.
+    """
+    if schema is None:
+        schema = FeatureSchema.from_processed(feature_list, processed_df)
+    return schema.align(input_df)
+
+def _numpy_engine_parts(model, X_df):
+    """(compiled forest, encoded X) for engine="numpy", or None when the model is not a tree ensemble."""
+    preproc, final = split_pipeline(model)
+    if not hasattr(final, "estimators_") or not hasattr(final, "n_features_in_"):
+        return None
+    X = align_for_raw_estimator(final, X_df) if preproc is None else preproc.transform(X_df)
+    return compile_forest(final), X
+
+def predict_with_model(model, X_df, engine="sklearn"):
+    """
+    Accept either a sklearn Pipeline (with preprocessor) or a raw estimator.
+    engine="numpy" evaluates RandomForests with the vectorized flat-array traversal
+    (forest_eval.py) instead of sklearn's per-tree dispatch; other models ignore it.
+    engine="auto" picks numpy for small batches and sklearn for large ones.
+    Returns numpy array of predictions.
+    """
+    if model is None:
+        raise ValueError("Model is None")
+
+    if resolve_engine(engine, len(X_df)) == "numpy":
+        parts = _numpy_engine_parts(model, X_df)
+        if parts is not None:
+            forest, X = parts
+            return forest.predict(X)
+
+    # Pipeline case
+    if hasattr(model, "named_steps"):
+        return model.predict(X_df)
+
+    # Raw estimator with feature_names_in_
+    if hasattr(model, "feature_names_in_"):
+        return model.predict(align_for_raw_estimator(model, X_df))
+
+    # Fallback
+    return model.predict(X_df)
+
+def predict_proba_if_available(model, X_df, engine="sklearn"):
+    """Return probability of positive class if available, else None"""
+    if model is None:
+        return None
+    try:
+        if resolve_engine(engine, len(X_df)) == "numpy":
+            parts = _numpy_engine_parts(model, X_df)
+            if parts is not None and parts[0].kind == "classifier":
+                forest, X = parts
+                proba = forest.predict_proba(X)
+                return [float(p[1]) if len(p) > 1 else 0.0 for p in proba]
+        # pipeline may expose predict_proba
+        if hasattr(model, "predict_proba"):
+            proba = model.predict_proba(X_df)
+            return [float(p[1]) if len(p) > 1 else 0.0 for p in proba]
+        if hasattr(model, "named_steps"):
+            final = list(model.named_steps.values())[-1]
+            if hasattr(final, "predict_proba"):
+                try:
+                    X_trans = model.transform(X_df)
+                except Exception:
+                    try:
+                        X_trans = list(model.named_steps.values())[0].transform(X_df)
+                    except Exception:
+                        X_trans = X_df
+                proba = final.predict_proba(X_trans)
+                return [float(p[1]) if len(p) > 1 else 0.0 for p in proba]
+    except Exception:
+        return None
+    return None
+
+def regressor_prediction_bands(model, X_df, quantiles=DEFAULT_QUANTILES, n_jobs=None,
+                               memory_budget_bytes=DEFAULT_MEMORY_BUDGET_BYTES, engine="sklearn"):
+    """
+    If final regressor is RandomForest, return {"mean", "std", "quantiles"} across tree predictions
+    (see uncertainty.tree_prediction_stats), else None. Pass quantiles=None for mean/std only.
+    engine="numpy" evaluates all trees in one flat-array pass (as score_shared does).
+    """
+    try:
+        if model is None:
+            return None
+        if hasattr(model, "named_steps"):
+            final = list(model.named_steps.values())[-1]
+            if not hasattr(final, "estimators_"):
+                return None
+            try:
+                X_trans = model.transform(X_df)
+            except Exception:
+                try:
+                    X_trans = list(model.named_steps.values())[0].transform(X_df)
+                except Exception:
+                    X_trans = X_df
+        elif hasattr(model, "estimators_"):
+            final = model
+            expected = getattr(model, "feature_names_in_", None)
+            X_trans = X_df.copy()
+            if expected is not None:
+                for c in expected:
+                    if c not in X_trans.columns:
+                        X_trans[c] = 0
+                X_trans = X_trans[expected]
+        else:
+            return None
+        tree_matrix = None
+        if resolve_engine(engine, len(X_df)) == "numpy":
+            final = compile_forest(final)
+            tree_matrix = final.tree_predictions
+        return tree_prediction_stats(final.estimators_, X_trans, quantiles=quantiles, n_jobs=n_jobs,
+                                     memory_budget_bytes=memory_budget_bytes, tree_matrix=tree_matrix)
+    except Exception:
+        return None
+
+def regressor_uncertainty_if_rf(model, X_df):
+    """If final regressor is RandomForest, estimate std across tree predictions."""
+    bands = regressor_prediction_bands(model, X_df, quantiles=None)
+    return None if bands is None else bands["std"]
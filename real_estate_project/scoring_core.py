@@ -0,0 +1,131 @@
+# scoring_core.py
+# Headless scoring: the same models, alignment and scoring path as the Streamlit app, without the UI.
+import pandas as pd
+
+from model_registry import ModelRegistry, try_load_model
+from compact_forest import is_compact_dir
+from scoring import (
+    infer_feature_list_from_models,
+    align_inputs_to_features,
+    predict_with_model,
+    predict_proba_if_available,
+    regressor_prediction_bands,
+)
+from prediction_cache import score_shared_cached
+from batch_stream import add_scored_columns
+
+DEFAULT_REG_PATH = "models/regressor_pipeline.pkl"
+DEFAULT_CLF_PATH = "models/classifier_pipeline.pkl"
+DEFAULT_CSV_PATH = "data/final_data.csv"
+
+
+def default_model_path(pkl_path):
+    """models/x_compact when a compact export exists (as the app does), else the pickle."""
+    compact = pkl_path.replace("_pipeline.pkl", "_compact")
+    return compact if compact != pkl_path and is_compact_dir(compact) else pkl_path
+
+
+def _plain(value):
+    # numpy scalars -> Python numbers so results serialise as JSON
+    return value.item() if hasattr(value, "item") else value
+
+
+class ScoringCore:
+    """
+    Loads the regressor, classifier and processed data once and scores raw property records.
+
+    score_frame() is the batched path (one alignment, one shared encode and one forest pass per
+    call); score_naive() is the per-record path the app used before (separate predict / proba /
+    uncertainty calls), kept for comparison.
+    """
+
+    def __init__(self, reg_path=None, clf_path=None, csv_path=DEFAULT_CSV_PATH, engine="sklearn",
+                 with_uncertainty=True, registry=None, cache=None):
+        self.reg_path = reg_path or default_model_path(DEFAULT_REG_PATH)
+        self.clf_path = clf_path or default_model_path(DEFAULT_CLF_PATH)
+        self.csv_path = csv_path
+        self.engine = engine
+        self.with_uncertainty = with_uncertainty
+        self.registry = registry or ModelRegistry(loader=try_load_model)
+        self.cache = cache  # optional PredictionCache shared by every score_frame() call
+        self.reg_model = self.clf_model = None
+        self.reg_err = self.clf_err = None
+        self.processed_df = None
+        self.encoding = None
+        self.feature_list = None
+        self.schema = None
+
+    def load(self):
+        """Load models and data; returns self. Models that fail to load are left as None (see *_err)."""
+        from columnar_store import load_frame
+        from feature_schema import FeatureSchema
+        from frame_encoding import FrameEncoding
+
+        self.reg_model, self.reg_err = self.registry.get(self.reg_path)
+        self.clf_model, self.clf_err = self.registry.get(self.clf_path)
+        try:
+            df = load_frame(self.csv_path)
+            self.encoding = FrameEncoding.from_frame(df)
+            self.processed_df = self.encoding.encode(df)
+        except Exception:
+            self.processed_df = None
+        self.feature_list = infer_feature_list_from_models(self.processed_df, self.reg_model, self.clf_model)
+        if self.feature_list is None:
+            raise ValueError("Cannot infer feature list: no processed CSV and no feature_names_in_ on the models")
+        self.schema = FeatureSchema.from_processed(self.feature_list, self.processed_df)
+        return self
+
+    @property
+    def ready(self):
+        return self.schema is not None and (self.reg_model is not None or self.clf_model is not None)
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "regressor": self.reg_path if self.reg_model is not None else None,
+            "classifier": self.clf_path if self.clf_model is not None else None,
+            "regressor_error": str(self.reg_err).splitlines()[-1] if self.reg_err else None,
+            "classifier_error": str(self.clf_err).splitlines()[-1] if self.clf_err else None,
+            "n_features": len(self.feature_list or []),
+            "engine": self.engine,
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    def align(self, df):
+        return align_inputs_to_features(df, self.feature_list, self.processed_df, schema=self.schema)
+
+    def score_frame(self, df, with_uncertainty=None, engine=None):
+        """DataFrame of prediction columns (index aligned with df) for every row of df."""
+        with_uncertainty = self.with_uncertainty if with_uncertainty is None else with_uncertainty
+        fingerprint = (self.registry.fingerprint(self.reg_path), self.registry.fingerprint(self.clf_path))
+        scored = score_shared_cached(self.align(df), clf_model=self.clf_model, reg_model=self.reg_model,
+                                     cache=self.cache, fingerprint=fingerprint,
+                                     with_uncertainty=with_uncertainty, engine=engine or self.engine)
+        return add_scored_columns(pd.DataFrame(index=df.index), scored)
+
+    def score_records(self, records, with_uncertainty=None, engine=None):
+        """List of {prediction column: value} dicts, one per input record (dict of raw fields)."""
+        if not records:
+            return []
+        out = self.score_frame(pd.DataFrame.from_records(records), with_uncertainty, engine)
+        return [{k: _plain(v) for k, v in row.items()} for row in out.to_dict("records")]
+
+    def score_naive(self, record, with_uncertainty=None, engine=None):
+        """One record through separate predict / predict_proba / uncertainty calls (on the same engine as score_frame)."""
+        with_uncertainty = self.with_uncertainty if with_uncertainty is None else with_uncertainty
+        engine = engine or self.engine
+        X = self.align(pd.DataFrame([record]))
+        result = {}
+        if self.clf_model is not None:
+            result["Good_Investment_Pred"] = _plain(predict_with_model(self.clf_model, X, engine=engine)[0])
+            proba = predict_proba_if_available(self.clf_model, X, engine=engine)
+            if proba is not None:
+                result["Good_Investment_Prob"] = float(proba[0])
+        if self.reg_model is not None:
+            result["Future_Price_5Yrs_Pred"] = float(predict_with_model(self.reg_model, X, engine=engine)[0])
+            bands = regressor_prediction_bands(self.reg_model, X, engine=engine) if with_uncertainty else None
+            if bands is not None:
+                result["Future_Price_5Yrs_Std"] = float(bands["std"][0])
+                result["Future_Price_5Yrs_P10"] = float(bands["quantiles"][0.1][0])
+                result["Future_Price_5Yrs_P90"] = float(bands["quantiles"][0.9][0])
+        return result
@@ -0,0 +1,284 @@
+# scoring_service.py
+# Local HTTP scoring service (stdlib asyncio, no web framework).
+#   python scoring_service.py [--port 8765] [--max-batch-size 64] [--max-wait-ms 5]
+#
+#   POST /score         one JSON record -> one result (coalesced into micro-batches)
+#   POST /score_batch   JSON list of records -> list of results (scored as one batch)
+#   POST /score_naive   one JSON record -> one result (per-request path, for comparison)
+#   GET  /health        model/data status and batching counters
+import json
+import math
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+# -------------------------
+# Micro-batching
+# -------------------------
+class MicroBatcher:
+    """
+    Coalesces concurrent single-record requests into one batched call.
+
+    The first queued record opens a batch; the batch is flushed when it reaches max_batch_size or
+    max_wait_ms after that first record, whichever comes first. score_batch(records) -> results
+    runs on a worker thread so the event loop keeps accepting requests while a batch is scored;
+    the next batch fills up in the meantime. When a batch raises, its records are scored one by
+    one, so a malformed record fails only its own request.
+    """
+
+    def __init__(self, score_batch, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 executor=None):
+        self.score_batch = score_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1e3
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="scoring")
+        self.queue = None
+        self._task = None
+        self.stats = {"requests": 0, "batches": 0, "max_batch": 0, "isolated_batches": 0, "failed_records": 0}
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, record):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((record, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                # take whatever is already queued without waiting
+                while len(batch) < self.max_batch_size and not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _score_isolated(self, records):
+        """
+        score_batch(records); if the batch raises, each record is scored alone and the records
+        that still fail get their exception in place of a result.
+        """
+        try:
+            return self.score_batch(records)
+        except Exception as e:
+            if len(records) == 1:
+                return [e]
+        self.stats["isolated_batches"] += 1
+        results = []
+        for record in records:
+            try:
+                results.append(self.score_batch([record])[0])
+            except Exception as e:
+                results.append(e)
+        return results
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            records = [record for record, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self._score_isolated, records)
+            except Exception as e:  # the executor itself failed
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    self.stats["failed_records"] += 1
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+
+
+# -------------------------
+# Minimal HTTP/1.1 (keep-alive, Content-Length bodies)
+# -------------------------
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+async def read_request(reader):
+    """(method, path, headers, body) or None when the client closed the connection."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, _ = request_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_BYTES:
+        raise ValueError(f"body of {length} bytes exceeds {MAX_BODY_BYTES}")
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+def json_safe(value):
+    """NaN and +-inf -> None, recursively: json.dumps would emit NaN / Infinity, which is not JSON."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(v) for v in value]
+    return value
+
+
+def encode_response(status, payload, keep_alive=True):
+    body = json.dumps(json_safe(payload), allow_nan=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+# -------------------------
+# Service
+# -------------------------
+class ScoringService:
+    """Routes HTTP requests to a ScoringCore, single records through a MicroBatcher."""
+
+    def __init__(self, core, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.core = core
+        # one scoring thread shared by batched and naive requests, so both paths compete for
+        # the same CPU the way they would in one process
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scoring")
+        self.batcher = MicroBatcher(core.score_records, max_batch_size, max_wait_ms, executor=self.executor)
+
+    async def handle(self, method, path, body):
+        loop = asyncio.get_running_loop()
+        if method == "GET" and path == "/health":
+            return 200, {**self.core.status(), "batching": dict(self.batcher.stats),
+                         "max_batch_size": self.batcher.max_batch_size,
+                         "max_wait_ms": self.batcher.max_wait * 1e3}
+        if method != "POST" or path not in ("/score", "/score_batch", "/score_naive"):
+            return 404, {"error": f"no route for {method} {path}"}
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError as e:
+            return 400, {"error": f"invalid JSON: {e}"}
+        if path == "/score_batch":
+            if not isinstance(payload, list):
+                return 400, {"error": "expected a JSON list of records"}
+            return 200, await loop.run_in_executor(self.executor, self.core.score_records, payload)
+        if not isinstance(payload, dict):
+            return 400, {"error": "expected a JSON object (one record)"}
+        if path == "/score_naive":
+            return 200, await loop.run_in_executor(self.executor, self.core.score_naive, payload)
+        return 200, await self.batcher.submit(payload)
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError) as e:
+                    writer.write(encode_response(413 if "exceeds" in str(e) else 400, {"error": str(e)}, False))
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+                try:
+                    status, payload = await self.handle(method, path.split("?", 1)[0], body)
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+                writer.write(encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready_callback=None):
+        self.batcher.start()
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        if ready_callback is not None:
+            ready_callback(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless HTTP scoring service with micro-batching")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="how long the first record of a batch waits for others")
+    parser.add_argument("--engine", default="sklearn",
+                        help="scoring engine for both /score and /score_naive: sklearn, auto or numpy")
+    parser.add_argument("--no-uncertainty", action="store_true", help="skip per-tree std / P10-P90 bands")
+    parser.add_argument("--cache-entries", type=int, default=0,
+                        help="size of the prediction cache (0 disables it, e.g. for load tests)")
+    parser.add_argument("--reg-path", default=None)
+    parser.add_argument("--clf-path", default=None)
+    parser.add_argument("--csv-path", default="data/final_data.csv")
+    args = parser.parse_args()
+
+    from scoring_core import ScoringCore
+    from prediction_cache import PredictionCache
+
+    t0 = time.perf_counter()
+    cache = PredictionCache(max_entries=args.cache_entries) if args.cache_entries > 0 else None
+    core = ScoringCore(args.reg_path, args.clf_path, args.csv_path, engine=args.engine,
+                       with_uncertainty=not args.no_uncertainty, cache=cache).load()
+    status = core.status()
+    if not status["ready"]:
+        raise SystemExit(f"Models not available: {status}")
+    print(f"Loaded models in {time.perf_counter() - t0:.2f}s "
+          f"(regressor: {status['regressor']}, classifier: {status['classifier']})")
+
+    service = ScoringService(core, args.max_batch_size, args.max_wait_ms)
+
+    def ready(server):
+        print(f"Serving on http://{args.host}:{args.port} "
+              f"(max batch {args.max_batch_size}, max wait {args.max_wait_ms} ms)", flush=True)
+
+    try:
+        asyncio.run(service.serve(args.host, args.port, ready_callback=ready))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
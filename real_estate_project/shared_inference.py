@@ -0,0 +1,166 @@
+# shared_inference.py
+import time
+import pickle
+import hashlib
+import weakref
+
+import numpy as np
+
+from uncertainty import DEFAULT_QUANTILES, tree_prediction_stats
+from compact_forest import compile_forest
+from forest_eval import resolve_engine
+
+# preprocessor signature per fitted pipeline, so equivalence is checked once per loaded model
+_signature_cache = weakref.WeakKeyDictionary()
+
+
+def split_pipeline(model):
+    """
+    Return (preprocessor_or_None, final_estimator).
+    For a Pipeline the preprocessor is every step but the last (model[:-1]).
+    """
+    if model is None:
+        return None, None
+    if hasattr(model, "named_steps"):
+        steps = list(model.named_steps.values())
+        if len(steps) == 1:
+            return None, steps[-1]
+        return model[:-1], steps[-1]
+    return None, model
+
+
+def preprocessor_signature(model):
+    """Content hash of the fitted preprocessing steps of a fitted pipeline (None for raw estimators)."""
+    try:
+        return _signature_cache[model]
+    except (KeyError, TypeError):
+        pass
+    preproc, _ = split_pipeline(model)
+    sig = None
+    if preproc is not None:
+        try:
+            # joblib.hash is content-based (raw pickle bytes differ between equal objects
+            # because of memoisation), so prefer it when installed; imported here because
+            # this first runs after the models are loaded, and sklearn has imported it by then
+            try:
+                import joblib
+            except Exception:
+                joblib = None
+            if joblib is not None:
+                sig = joblib.hash(preproc)
+            else:
+                sig = hashlib.sha256(pickle.dumps(preproc, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+        except Exception:
+            sig = None
+    try:
+        _signature_cache[model] = sig
+    except TypeError:
+        pass
+    return sig
+
+
+def preprocessors_equivalent(model_a, model_b):
+    """True when both pipelines would encode the same frame identically."""
+    if model_a is None or model_b is None:
+        return False
+    pre_a, _ = split_pipeline(model_a)
+    pre_b, _ = split_pipeline(model_b)
+    if pre_a is None or pre_b is None:
+        return False
+    sig_a = preprocessor_signature(model_a)
+    return sig_a is not None and sig_a == preprocessor_signature(model_b)
+
+
+def align_for_raw_estimator(model, X_df):
+    # same fallback as predict_with_model for estimators saved without a pipeline
+    expected = getattr(model, "feature_names_in_", None)
+    if expected is None:
+        return X_df
+    X_aligned = X_df.copy()
+    for c in expected:
+        if c not in X_aligned.columns:
+            X_aligned[c] = 0
+    return X_aligned[list(expected)]
+
+
+def _positive_proba(proba):
+    proba = np.asarray(proba)
+    if proba.ndim == 2 and proba.shape[1] > 1:
+        return proba[:, 1].astype(float)
+    return np.zeros(len(proba), dtype=float)
+
+
+def score_shared(X_df, clf_model=None, reg_model=None, with_uncertainty=True, quantiles=DEFAULT_QUANTILES,
+                 engine="sklearn", n_jobs=None):
+    """
+    Score an aligned frame with both pipelines, encoding it as few times as possible.
+
+    The naive path runs the preprocessor once per call (clf predict, clf predict_proba,
+    reg predict, reg uncertainty). Here each distinct preprocessor runs once -- once in total
+    when classifier and regressor share an equivalent preprocessor -- and the matrix is reused:
+    - classifier labels are derived from predict_proba (what RandomForest.predict does anyway);
+    - with uncertainty, the regression prediction is the mean of the per-tree pass.
+
+    Returns a dict with clf_pred, clf_proba, reg_pred, bands (or None), X_trans, shared,
+    n_transforms, timings (seconds per stage) and saved_seconds (estimated vs. the naive path).
+    engine="numpy" evaluates the forests with the vectorized flat-array traversal (forest_eval.py);
+    engine="auto" uses it only for small batches. n_jobs caps the per-tree uncertainty threads.
+    """
+    engine = resolve_engine(engine, len(X_df))
+    timings = {}
+    result = {"clf_pred": None, "clf_proba": None, "reg_pred": None, "bands": None, "X_trans": None}
+    shared = preprocessors_equivalent(clf_model, reg_model)
+    transformed = {}
+
+    def encode(model, label):
+        preproc, estimator = split_pipeline(model)
+        final = estimator
+        if engine == "numpy" and hasattr(estimator, "estimators_"):
+            final = compile_forest(estimator)
+        if preproc is None:
+            return final, align_for_raw_estimator(estimator, X_df)
+        key = "shared" if shared else label
+        if key not in transformed:
+            t0 = time.perf_counter()
+            transformed[key] = preproc.transform(X_df)
+            timings[f"transform ({key})"] = time.perf_counter() - t0
+        return final, transformed[key]
+
+    naive_transforms = 0
+    if clf_model is not None:
+        final, X_clf = encode(clf_model, "classifier")
+        naive_transforms += 2
+        t0 = time.perf_counter()
+        if hasattr(final, "estimators_") and hasattr(final, "predict_proba"):
+            proba = final.predict_proba(X_clf)
+            result["clf_proba"] = _positive_proba(proba)
+            result["clf_pred"] = np.asarray(final.classes_).take(np.argmax(proba, axis=1))
+        else:
+            result["clf_pred"] = final.predict(X_clf)
+            if hasattr(final, "predict_proba"):
+                result["clf_proba"] = _positive_proba(final.predict_proba(X_clf))
+        timings["classifier"] = time.perf_counter() - t0
+        result["X_trans"] = X_clf
+
+    if reg_model is not None:
+        final, X_reg = encode(reg_model, "regressor")
+        naive_transforms += 1
+        t0 = time.perf_counter()
+        if with_uncertainty and hasattr(final, "estimators_"):
+            naive_transforms += 1
+            bands = tree_prediction_stats(final.estimators_, X_reg, quantiles=quantiles, n_jobs=n_jobs,
+                                          tree_matrix=getattr(final, "tree_predictions", None))
+            result["bands"] = bands
+            result["reg_pred"] = bands["mean"]
+        else:
+            result["reg_pred"] = final.predict(X_reg)
+        timings["regressor"] = time.perf_counter() - t0
+        result["X_trans"] = X_reg
+
+    transform_times = [v for k, v in timings.items() if k.startswith("transform")]
+    mean_transform = (sum(transform_times) / len(transform_times)) if transform_times else 0.0
+    result["shared"] = shared
+    result["n_transforms"] = len(transformed)
+    result["timings"] = timings
+    result["saved_seconds"] = max(0, naive_transforms - len(transformed)) * mean_transform if transformed else 0.0
+    return result
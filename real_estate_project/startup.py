@@ -0,0 +1,92 @@
+# startup.py
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+
+# -------------------------
+# Startup timing report
+# -------------------------
+class StartupReport:
+    """
+    Wall-clock seconds per startup phase (imports, each model load, data load, ...).
+    `cold` keeps the first measurement of a phase (the container-restart cost),
+    `last` the most recent one (cache hits on later reruns).
+    """
+
+    def __init__(self):
+        self.cold = {}
+        self.last = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.cold.setdefault(name, seconds)
+            self.last[name] = seconds
+
+    @contextmanager
+    def timed(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0)
+
+    def rows(self):
+        """[{"phase", "cold_ms", "last_ms"}] in the order phases were first recorded."""
+        with self._lock:
+            return [
+                {"phase": name, "cold_ms": self.cold[name] * 1e3, "last_ms": self.last[name] * 1e3}
+                for name in self.cold
+            ]
+
+
+# -------------------------
+# Background loads
+# -------------------------
+class BackgroundLoader:
+    """
+    Runs named loads (models, data) on a small thread pool so the UI can render while they run.
+
+    Each name keeps one future per key (e.g. the file's (mtime, size)): submitting the same name
+    and key again returns the running or finished future instead of loading twice, and a new key
+    starts a fresh load. Durations are recorded in the StartupReport under the load's name.
+    """
+
+    def __init__(self, report=None, max_workers=3):
+        self.report = report if report is not None else StartupReport()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="startup-load")
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _run(self, name, fn, args, kwargs):
+        with self.report.timed(name):
+            return fn(*args, **kwargs)
+
+    def submit(self, name, key, fn, *args, **kwargs):
+        with self._lock:
+            entry = self._futures.get(name)
+            if entry is not None and entry[0] == key:
+                return entry[1]
+            future = self._pool.submit(self._run, name, fn, args, kwargs)
+            self._futures[name] = (key, future)
+            return future
+
+    def pending(self):
+        """Names of loads that have not finished yet."""
+        with self._lock:
+            return [name for name, (_, future) in self._futures.items() if not future.done()]
+
+    def result(self, name, timeout=None):
+        with self._lock:
+            _, future = self._futures[name]
+        return future.result(timeout=timeout)
+
+    def forget(self, name=None):
+        """Drop one finished load (or all of them) so the next submit() loads again."""
+        with self._lock:
+            if name is None:
+                self._futures.clear()
+            else:
+                self._futures.pop(name, None)
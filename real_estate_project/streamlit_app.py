@@ -1,262 +1,111 @@
 # streamlit_app.py
-import streamlit as st
-import pandas as pd
-import numpy as np
 import os
-import traceback
-
-# Try multiple loaders for robustness
-import pickle
-try:
-    import joblib
-except Exception:
-    joblib = None
-try:
-    import cloudpickle
-except Exception:
-    cloudpickle = None
+import time
+from functools import partial
+_script_start = time.perf_counter()
+
+import streamlit as st
+
+# light imports only: numpy, pandas, sklearn and pyarrow are imported below, after the page shell is sent
+from startup import StartupReport, BackgroundLoader
+from model_registry import ModelRegistry, try_load_model, file_stat_key, is_compact_dir, SCORING_ENGINES
 
 st.set_page_config(page_title="Real Estate Investment Advisor", layout="wide")
+# st.experimental_rerun was removed in newer Streamlit; st.rerun exists from 1.27
+rerun = getattr(st, "rerun", None) or st.experimental_rerun
+st.title("Real Estate Investment Advisor — Classification & 5-year Price Forecast")
 
 # -------------------------
-# Robust loader
+# Model registry (one per process, shared across reruns and sessions)
 # -------------------------
-def try_load_model(path):
-    """
-    Try to load model using pickle, then joblib, then cloudpickle.
-    Returns (model_or_None, error_traceback_or_None)
-    """
-    if not os.path.exists(path):
-        return None, f"File not found: {path}"
-    # 1) pickle
-    try:
-        with open(path, "rb") as f:
-            model = pickle.load(f)
-        return model, None
-    except Exception:
-        err_pickle = traceback.format_exc()
+@st.cache_resource
+def get_model_registry():
+    return ModelRegistry(loader=try_load_model)
 
-    # 2) joblib
-    if joblib is not None:
-        try:
-            model = joblib.load(path)
-            return model, None
-        except Exception:
-            err_joblib = traceback.format_exc()
-    else:
-        err_joblib = "joblib not installed"
-
-    # 3) cloudpickle
-    if cloudpickle is not None:
-        try:
-            with open(path, "rb") as f:
-                model = cloudpickle.load(f)
-            return model, None
-        except Exception:
-            err_cloud = traceback.format_exc()
-    else:
-        err_cloud = "cloudpickle not installed"
-
-    combined = f"pickle error:\n{err_pickle}\n\njoblib error:\n{err_joblib}\n\ncloudpickle error:\n{err_cloud}"
-    return None, combined
+# -------------------------
+# Background loader (one per process): models and data load while the UI renders
+# -------------------------
+@st.cache_resource
+def get_background_loader():
+    return BackgroundLoader(StartupReport())
 
 # -------------------------
-# Load processed CSV (cached)
+# Load processed data (columnar copy preferred, CSV fallback) onto compact dtypes; runs on the loader thread
+# Returns (processed_df, FrameEncoding, memory report) or (None, None, None)
+# The frame is cached per process and shared by every session: treat it as read-only (each rerun
+# works on a copy-on-write view of it, see below)
 # -------------------------
-@st.cache_data
 def load_processed_data(path="data/final_data.csv"):
     try:
-        return pd.read_csv(path)
+        from columnar_store import load_frame
+        from frame_encoding import FrameEncoding, memory_report
+        df = load_frame(path)
+        encoding = FrameEncoding.from_frame(df)
+        encoded = encoding.encode(df)
+        return encoded, encoding, memory_report(df, encoded)
     except Exception:
-        return None
+        return None, None, None
 
 # -------------------------
-# Constants and model loading
+# Feature schema (dtypes, defaults, rename rules) built once per feature list / data file
 # -------------------------
-MODEL_REG_PATH = "models/regressor_pipeline.pkl"
-MODEL_CLF_PATH = "models/classifier_pipeline.pkl"
-PROCESSED_CSV = "data/final_data.csv"
-
-reg_pipeline, reg_err = try_load_model(MODEL_REG_PATH)
-clf_pipeline, clf_err = try_load_model(MODEL_CLF_PATH)
-processed_df = load_processed_data(PROCESSED_CSV)
+@st.cache_resource
+def get_feature_schema(feature_list, csv_path, csv_stat, _processed_df):
+    from feature_schema import FeatureSchema
+    return FeatureSchema.from_processed(list(feature_list), _processed_df)
 
 # -------------------------
-# Infer feature list
+# Comparable-properties index (persisted next to the CSV; rebuilt only when the CSV changes); runs on the loader thread
 # -------------------------
-def infer_feature_list_from_models(processed_df, reg_model, clf_model):
-    """
-    Priority:
-      1) model.feature_names_in_ on reg_model or clf_model
-      2) processed_df columns excluding known target columns
-    """
-    for m in (reg_model, clf_model):
-        if m is not None and hasattr(m, "feature_names_in_"):
-            try:
-                return list(getattr(m, "feature_names_in_"))
-            except Exception:
-                pass
-    if processed_df is not None:
-        cols = list(processed_df.columns)
-        for t in ["Good_Investment", "Future_Price_5Yrs"]:
-            if t in cols:
-                cols.remove(t)
-        return cols
-    return None
-
-feature_list = infer_feature_list_from_models(processed_df, reg_pipeline, clf_pipeline)
+def load_comparables_index(csv_path, processed_df):
+    from comparables import load_or_build
+    try:
+        return load_or_build(csv_path, processed_df)
+    except Exception:
+        return None
 
 # -------------------------
-# Utilities
+# Feature importance, computed once per loaded model (keyed by the artifact fingerprint)
 # -------------------------
-def align_inputs_to_features(input_df: pd.DataFrame, feature_list: list, processed_df=None):
-    """
-    Align input_df to required feature_list:
-    - Rename common user-friendly names to expected names
-    - Add missing columns with sensible defaults
-    - Reorder columns to match feature_list
-    """
-    df = input_df.copy()
-
-    # rename heuristics (case-insensitive)
-    rename_map = {}
-    for c in df.columns:
-        lc = c.strip().lower()
-        if lc in ("sqft", "size", "size_in_sqft"):
-            rename_map[c] = "Size_in_SqFt"
-        if lc == "bhk":
-            rename_map[c] = "BHK"
-        if lc in ("year", "year_built"):
-            rename_map[c] = "Year_Built"
-        if lc in ("floor", "floor_no"):
-            rename_map[c] = "Floor_No"
-        if lc in ("total_floors", "totalfloor"):
-            rename_map[c] = "Total_Floors"
-        if lc in ("age", "age_of_property"):
-            rename_map[c] = "Age_of_Property"
-        if lc == "id":
-            rename_map[c] = "ID"
-    if rename_map:
-        df = df.rename(columns=rename_map)
-
-    # Defaults: numeric -> median or 0, categorical -> empty string
-    defaults = {}
-    numeric_cols = []
-    if processed_df is not None:
-        numeric_cols = processed_df.select_dtypes(include=[np.number]).columns.tolist()
-
-    for col in feature_list:
-        if col not in df.columns:
-            if col in numeric_cols:
-                try:
-                    defaults[col] = float(processed_df[col].median())
-                except Exception:
-                    defaults[col] = 0.0
-            else:
-                defaults[col] = ""
-            df[col] = defaults[col]
+@st.cache_resource
+def get_impurity_importance(fingerprint, feature_list, _model):
+    from feature_importance import impurity_importance
+    return impurity_importance(_model, list(feature_list))
+
+@st.cache_resource(show_spinner=False)
+def get_permutation_importance(fingerprint, feature_list, csv_stat, n_rows, target, _model, _processed_df, _schema):
+    from feature_importance import importance_sample, permutation_importance
+    from scoring import align_inputs_to_features
+    sample = importance_sample(_processed_df, target, n_rows)
+    X_sample = align_inputs_to_features(sample, list(feature_list), _processed_df, schema=_schema)
+    return permutation_importance(_model, X_sample, sample[target], list(feature_list))
 
-    # Reorder to match requested feature_list
-    df = df[[c for c in feature_list]]
+# -------------------------
+# Prediction cache (one per process): row hash -> predictions, dropped when the models change
+# -------------------------
+@st.cache_resource
+def get_prediction_cache():
+    from prediction_cache import PredictionCache
+    return PredictionCache()
 
-    # Coerce numeric columns
-    for c in df.columns:
-        try:
-            if processed_df is not None and c in numeric_cols:
-                df[c] = pd.to_numeric(df[c], errors="coerce").fillna(defaults.get(c, 0))
-            else:
-                df[c] = pd.to_numeric(df[c], errors="ignore")
-        except Exception:
-            pass
-
-    return df
-
-def predict_with_model(model, X_df):
-    """
-    Accept either a sklearn Pipeline (with preprocessor) or a raw estimator.
-    Returns numpy array of predictions.
-    """
-    if model is None:
-        raise ValueError("Model is None")
-
-    # Pipeline case
-    if hasattr(model, "named_steps"):
-        return model.predict(X_df)
-
-    # Raw estimator with feature_names_in_
-    if hasattr(model, "feature_names_in_"):
-        expected = list(getattr(model, "feature_names_in_"))
-        X_aligned = X_df.copy()
-        for c in expected:
-            if c not in X_aligned.columns:
-                X_aligned[c] = 0
-        X_aligned = X_aligned[expected]
-        return model.predict(X_aligned)
-
-    # Fallback
-    return model.predict(X_df)
-
-def predict_proba_if_available(model, X_df):
-    """Return probability of positive class if available, else None"""
-    if model is None:
-        return None
-    try:
-        # pipeline may expose predict_proba
-        if hasattr(model, "predict_proba"):
-            proba = model.predict_proba(X_df)
-            return [float(p[1]) if len(p) > 1 else 0.0 for p in proba]
-        if hasattr(model, "named_steps"):
-            final = list(model.named_steps.values())[-1]
-            if hasattr(final, "predict_proba"):
-                try:
-                    X_trans = model.transform(X_df)
-                except Exception:
-                    try:
-                        X_trans = list(model.named_steps.values())[0].transform(X_df)
-                    except Exception:
-                        X_trans = X_df
-                proba = final.predict_proba(X_trans)
-                return [float(p[1]) if len(p) > 1 else 0.0 for p in proba]
-    except Exception:
-        return None
-    return None
+# -------------------------
+# Constants and background loads
+# -------------------------
+# compact exports (python compact_forest.py export ...) are preferred when present
+MODEL_REG_PATH = "models/regressor_compact" if is_compact_dir("models/regressor_compact") else "models/regressor_pipeline.pkl"
+MODEL_CLF_PATH = "models/classifier_compact" if is_compact_dir("models/classifier_compact") else "models/classifier_pipeline.pkl"
+PROCESSED_CSV = "data/final_data.csv"
 
-def regressor_uncertainty_if_rf(model, X_df):
-    """If final regressor is RandomForest, estimate std across tree predictions."""
-    try:
-        if model is None:
-            return None
-        if hasattr(model, "named_steps"):
-            final = list(model.named_steps.values())[-1]
-            try:
-                X_trans = model.transform(X_df)
-            except Exception:
-                try:
-                    X_trans = list(model.named_steps.values())[0].transform(X_df)
-                except Exception:
-                    X_trans = X_df
-            if hasattr(final, "estimators_"):
-                preds_trees = np.vstack([est.predict(X_trans) for est in final.estimators_])
-                stds = preds_trees.std(axis=0)
-                return stds
-        else:
-            if hasattr(model, "estimators_"):
-                expected = getattr(model, "feature_names_in_", None)
-                X_aligned = X_df.copy()
-                if expected is not None:
-                    for c in expected:
-                        if c not in X_aligned.columns:
-                            X_aligned[c] = 0
-                    X_aligned = X_aligned[expected]
-                preds_trees = np.vstack([est.predict(X_aligned) for est in model.estimators_])
-                stds = preds_trees.std(axis=0)
-                return stds
-    except Exception:
-        return None
-    return None
+model_registry = get_model_registry()
+background = get_background_loader()
+startup_report = background.report
+# keyed on (mtime, size): reruns reuse the finished load, a changed file starts a new one
+background.submit("regression model", file_stat_key(MODEL_REG_PATH), model_registry.get, MODEL_REG_PATH)
+background.submit("classification model", file_stat_key(MODEL_CLF_PATH), model_registry.get, MODEL_CLF_PATH)
+background.submit("processed data", file_stat_key(PROCESSED_CSV), load_processed_data, PROCESSED_CSV)
 
 # -------------------------
-# Sidebar: status & reload
+# Sidebar: status & reload (status is filled in once the loads finish)
 # -------------------------
 with st.sidebar:
     st.header("Configuration & Status")
@@ -265,31 +114,129 @@ with st.sidebar:
     st.write(f"- Classification: `{MODEL_CLF_PATH}`")
     st.write(f"- Processed CSV: `{PROCESSED_CSV}`")
     st.markdown("---")
-    st.write("Loaded status:")
-    st.write(f"Regression model: {'✅' if reg_pipeline is not None else '❌'}")
-    st.write(f"Classification model: {'✅' if clf_pipeline is not None else '❌'}")
-    st.write(f"Processed CSV: {'✅' if processed_df is not None else '❌'}")
-    if reg_err:
-        st.text("Regression load error (short):")
-        try:
-            st.code(str(reg_err).splitlines()[-1])
-        except Exception:
-            st.code(str(reg_err))
-    if clf_err:
-        st.text("Classification load error (short):")
-        try:
-            st.code(str(clf_err).splitlines()[-1])
-        except Exception:
-            st.code(str(clf_err))
+    status_box = st.container()
+    st.markdown("---")
+    scoring_engine = st.selectbox(
+        "Scoring engine", SCORING_ENGINES, index=0, key="scoring_engine",
+        help="sklearn (default) is the reference. numpy evaluates all trees of a forest together over a "
+             "flattened copy of it (extra memory; equal to sklearn to float32 precision); auto uses numpy "
+             "for batches of up to 1,024 rows",
+    )
+    profile_cprofile = st.checkbox("Profile predictions (cProfile)", value=False, key="perf_cprofile")
+    profile_memory = st.checkbox("Track allocations (tracemalloc)", value=False, key="perf_tracemalloc")
     st.markdown("---")
+    cache_box = st.container()
+    startup_box = st.container()
     if st.button("Reload / restart app", key="reload_btn"):
-        st.experimental_rerun()
+        model_registry.invalidate()
+        background.forget()
+        get_feature_schema.clear()
+        get_impurity_importance.clear()
+        get_permutation_importance.clear()
+        get_prediction_cache().clear()
+        rerun()
+
+startup_report.record("UI shell sent", time.perf_counter() - _script_start)
 
 # -------------------------
-# Main UI
+# Heavy imports (cached by Python after the first run)
 # -------------------------
-st.title("Real Estate Investment Advisor — Classification & 5-year Price Forecast")
+_import_start = time.perf_counter()
+import pandas as pd
+
+# copy-on-write is always on from pandas 3; turn it on for older pandas so that a session's
+# shallow copy of the shared processed_df never writes through to it
+if int(pd.__version__.split(".")[0]) < 3:
+    try:
+        pd.set_option("mode.copy_on_write", True)
+    except Exception:
+        pass
+
+from scoring import (
+    infer_feature_list_from_models,
+    align_inputs_to_features,
+    predict_with_model,
+    predict_proba_if_available,
+    regressor_prediction_bands,
+)
+from prediction_cache import score_shared_cached
+from perf import Trace, log_trace, new_session_id
+from batch_stream import DEFAULT_CHUNK_ROWS, add_scored_columns, stream_batch_predictions
+from parallel_batch import ParallelScorer, DEFAULT_SHARD_ROWS, DEFAULT_WORKERS, default_workers
+from frame_encoding import DERIVED_COLUMNS
+from whatif import SWEEP_FEATURES, DEFAULT_POINTS, sweep_values, run_sweep
+from comparables import DEFAULT_K as COMPARABLES_K
+from feature_importance import TARGETS as IMPORTANCE_TARGETS, DEFAULT_SAMPLE_ROWS as DEFAULT_IMPORTANCE_ROWS
+from batch_jobs import BatchJobQueue, make_chunk_scorer, RUNNING, QUEUED, DONE, FAILED, RESUMABLE
+startup_report.record("imports (pandas, scoring)", time.perf_counter() - _import_start)
+
+@st.cache_resource
+def get_parallel_scorer():
+    """One worker pool per server process, started on the first batch large enough to shard."""
+    return ParallelScorer()
+
+@st.cache_resource
+def get_batch_job_queue():
+    """One job thread per server process; each session lists only the jobs it submitted or opened by id."""
+    return BatchJobQueue()
+
+# results above this are not offered as an in-browser download (it holds the whole file in memory)
+MAX_INLINE_DOWNLOAD_BYTES = 200 * 1024 * 1024
+
+def _deferred_downloads():
+    # st.download_button(data=callable) reads the data only when clicked (newer Streamlit)
+    try:
+        from streamlit.runtime.media_file_manager import MediaFileManager
+    except ImportError:
+        return False
+    return hasattr(MediaFileManager, "add_deferred")
+
+def download_file_button(label, path, file_name, key):
+    """Download button for a file on disk, without reading it on every rerun when Streamlit allows."""
+    size = os.path.getsize(path)
+    if size > MAX_INLINE_DOWNLOAD_BYTES:
+        st.info(f"The result ({size / 1e6:,.0f} MB) is too large to download in the browser; "
+                f"it is on the server at {os.path.abspath(path)}")
+        return
+    if _deferred_downloads():
+        data = partial(open, path, "rb")
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+    st.download_button(label, data=data, file_name=file_name, mime="text/csv", key=key)
+
+# -------------------------
+# Performance panel
+# -------------------------
+# one id per browser session, so the JSON perf log can be aggregated per session
+perf_session = st.session_state.setdefault("perf_session", new_session_id())
+
+def render_performance_panel(trace, scored=None):
+    """Per-stage spans of one prediction run, plus cProfile / tracemalloc output when captured."""
+    with st.expander("Performance", expanded=False):
+        spans_df = pd.DataFrame(
+            {"stage": ["· " * s["depth"] + s["name"] for s in trace.spans], "ms": [s["ms"] for s in trace.spans]}
+        )
+        st.table(spans_df.round(2))
+        st.write(f"Total: {trace.total_ms:.1f} ms")
+        if scored is not None:
+            mode = "shared by classifier and regressor" if scored["shared"] else "per model"
+            st.write(f"Preprocessor runs: {scored['n_transforms']} ({mode})")
+            st.write(f"Estimated time saved vs. encoding per call: {scored['saved_seconds'] * 1e3:.1f} ms")
+            if "cache" in scored:
+                c = scored["cache"]
+                st.write(f"Prediction cache: {c['rows']:,} rows, {c['unique']:,} unique, "
+                         f"{c['hits']:,} cached, {c['misses']:,} scored")
+        if trace.memory is not None:
+            st.write(f"tracemalloc: peak {trace.memory['peak_mb']:.1f} MB, "
+                     f"still allocated {trace.memory['current_mb']:.1f} MB")
+            st.table(pd.DataFrame(trace.memory["top"]).round(1))
+        if trace.profile_text is not None:
+            st.code(trace.profile_text)
 
+# -------------------------
+# Main UI
+# -------------------------
 col1, col2 = st.columns([1, 2])
 
 with col1:
@@ -315,44 +262,131 @@ with col1:
     Owner_Type = st.selectbox("Owner Type", options=["Individual","Builder","Agent",""], index=0, key="s_owner")
     Availability_Status = st.selectbox("Availability Status", options=["Available","Under Construction","Sold",""], index=0, key="s_avail")
     ID = st.text_input("ID (optional)", value="", key="s_id")
+    input_dict = {
+        "State": State,
+        "City": City,
+        "Locality": Locality,
+        "Property_Type": Property_Type,
+        "BHK": BHK,
+        "Size_in_SqFt": Size_in_SqFt,
+        "Year_Built": Year_Built,
+        "Furnished_Status": Furnished_Status,
+        "Floor_No": Floor_No,
+        "Total_Floors": Total_Floors,
+        "Nearby_Schools": Nearby_Schools,
+        "Nearby_Hospitals": Nearby_Hospitals,
+        "Public_Transport_Accessibility": Public_Transport_Accessibility,
+        "Parking_Space": Parking_Space,
+        "Security": Security,
+        "Amenities": Amenities,
+        "Facing": Facing,
+        "Owner_Type": Owner_Type,
+        "Availability_Status": Availability_Status,
+        "ID": ID if ID != "" else 0
+    }
+
+    st.markdown("#### What-if sweep")
+    sweep_x = st.selectbox("Vary", options=list(SWEEP_FEATURES), index=0, key="sweep_x")
+    sweep_y = st.selectbox("and (optional, for a heatmap)", options=["(none)"] + [f for f in SWEEP_FEATURES if f != sweep_x], index=0, key="sweep_y")
+    sweep_points = st.slider("Points per feature", min_value=5, max_value=100, value=DEFAULT_POINTS, key="sweep_points")
+    run_sweep_clicked = st.button("Run what-if sweep", key="run_sweep")
+
+# -------------------------
+# Wait for the background loads (instant on reruns once loaded)
+# -------------------------
+pending = background.pending()
+loading_note = st.empty()
+if pending:
+    loading_note.info(f"Loading {', '.join(pending)} in the background…")
+reg_pipeline, reg_err = background.result("regression model")
+clf_pipeline, clf_err = background.result("classification model")
+processed_df, frame_encoding, processed_memory = background.result("processed data")
+if processed_df is not None:
+    processed_df = processed_df.copy(deep=False)  # this rerun's view; edits copy instead of reaching other sessions
+loading_note.empty()
+
+feature_list = infer_feature_list_from_models(processed_df, reg_pipeline, clf_pipeline)
+feature_schema = None
+if feature_list is not None:
+    with startup_report.timed("feature schema"):
+        feature_schema = get_feature_schema(tuple(feature_list), PROCESSED_CSV, file_stat_key(PROCESSED_CSV), processed_df)
+# the index needs the processed data, so it starts once that has loaded; the page does not wait for it
+comparables_index = None
+if processed_df is not None:
+    background.submit("comparables index", file_stat_key(PROCESSED_CSV), load_comparables_index, PROCESSED_CSV, processed_df)
+    if "comparables index" in background.pending():
+        st.caption("Building the comparable-properties index in the background; comparables appear on the next run.")
+    else:
+        comparables_index = background.result("comparables index")
+startup_report.record("ready (total)", time.perf_counter() - _script_start)
+
+prediction_cache = get_prediction_cache()
+# cached predictions are only valid for the exact artifacts loaded now
+model_fingerprint = (model_registry.fingerprint(MODEL_REG_PATH), model_registry.fingerprint(MODEL_CLF_PATH))
+
+with status_box:
+    st.write("Loaded status:")
+    st.write(f"Regression model: {'✅' if reg_pipeline is not None else '❌'}")
+    st.write(f"Classification model: {'✅' if clf_pipeline is not None else '❌'}")
+    st.write(f"Processed CSV: {'✅' if processed_df is not None else '❌'}")
+    if reg_err:
+        st.text("Regression load error (short):")
+        try:
+            st.code(str(reg_err).splitlines()[-1])
+        except Exception:
+            st.code(str(reg_err))
+    if clf_err:
+        st.text("Classification load error (short):")
+        try:
+            st.code(str(clf_err).splitlines()[-1])
+        except Exception:
+            st.code(str(clf_err))
+
+with startup_box:
+    with st.expander("Startup timing", expanded=False):
+        st.table(pd.DataFrame(startup_report.rows()).round(1))
+        st.caption("cold = first run in this process (container start); last = this rerun")
+    if processed_memory is not None:
+        with st.expander("Processed data memory", expanded=False):
+            total = processed_memory.iloc[-1]
+            st.write(f"{total['bytes_before'] / 2**20:,.1f} MB as loaded → {total['bytes_after'] / 2**20:,.1f} MB encoded")
+            st.table(processed_memory.assign(
+                kb_before=processed_memory["bytes_before"] / 1024, kb_after=processed_memory["bytes_after"] / 1024
+            )[["column", "dtype_before", "dtype_after", "kb_before", "kb_after"]].round(1))
 
 # Single predict
 if st.button("Predict (single)", key="predict_single"):
     if feature_list is None:
         st.error("Cannot infer feature list. Ensure data/final_data.csv exists or models contain feature_names_in_.")
     else:
-        input_dict = {
-            "State": State,
-            "City": City,
-            "Locality": Locality,
-            "Property_Type": Property_Type,
-            "BHK": BHK,
-            "Size_in_SqFt": Size_in_SqFt,
-            "Year_Built": Year_Built,
-            "Furnished_Status": Furnished_Status,
-            "Floor_No": Floor_No,
-            "Total_Floors": Total_Floors,
-            "Nearby_Schools": Nearby_Schools,
-            "Nearby_Hospitals": Nearby_Hospitals,
-            "Public_Transport_Accessibility": Public_Transport_Accessibility,
-            "Parking_Space": Parking_Space,
-            "Security": Security,
-            "Amenities": Amenities,
-            "Facing": Facing,
-            "Owner_Type": Owner_Type,
-            "Availability_Status": Availability_Status,
-            "ID": ID if ID != "" else 0
-        }
-        df_single_raw = pd.DataFrame([input_dict])
-        X_single = align_inputs_to_features(df_single_raw, feature_list, processed_df)
+        trace = Trace("single", session=perf_session, engine=scoring_engine)
+        with trace.capture(profile=profile_cprofile, trace_memory=profile_memory):
+            with trace.span("align_inputs_to_features"):
+                df_single_raw = pd.DataFrame([input_dict])
+                X_single = align_inputs_to_features(df_single_raw, feature_list, processed_df, schema=feature_schema)
+
+            # Encode once and share the matrix between classifier and regressor
+            scored = None
+            if clf_pipeline is not None or reg_pipeline is not None:
+                with trace.span("score"):
+                    try:
+                        scored = score_shared_cached(X_single, clf_model=clf_pipeline, reg_model=reg_pipeline,
+                                                     cache=prediction_cache, fingerprint=model_fingerprint, engine=scoring_engine)
+                    except Exception:
+                        scored = None  # fall back to scoring each model on its own below
+                if scored is not None:
+                    trace.add_timings(scored["timings"], depth=1)
 
         # Classification
         if clf_pipeline is None:
             st.warning("Classification model not available. Train and save models/classifier_pipeline.pkl")
         else:
             try:
-                clf_pred = predict_with_model(clf_pipeline, X_single)
-                proba = predict_proba_if_available(clf_pipeline, X_single)
+                if scored is not None:
+                    clf_pred, proba = scored["clf_pred"], scored["clf_proba"]
+                else:
+                    clf_pred = predict_with_model(clf_pipeline, X_single, engine=scoring_engine)
+                    proba = predict_proba_if_available(clf_pipeline, X_single, engine=scoring_engine)
                 st.markdown("#### Classification — Good Investment")
                 is_good = int(clf_pred[0])
                 st.write("Prediction:", "✅ Good Investment" if is_good == 1 else "❌ Not a Good Investment")
@@ -367,23 +401,133 @@ if st.button("Predict (single)", key="predict_single"):
             st.warning("Regression model not available. Train and save models/regressor_pipeline.pkl")
         else:
             try:
-                reg_pred = predict_with_model(reg_pipeline, X_single)
-                stds = regressor_uncertainty_if_rf(reg_pipeline, X_single)
+                if scored is not None:
+                    reg_pred, bands = scored["reg_pred"], scored["bands"]
+                else:
+                    reg_pred = predict_with_model(reg_pipeline, X_single, engine=scoring_engine)
+                    bands = regressor_prediction_bands(reg_pipeline, X_single)
                 st.markdown("#### Regression — Estimated Price after 5 years")
                 st.write(f"Predicted future price (same units used in training): {float(reg_pred[0]):.2f}")
-                if stds is not None:
-                    st.write(f"Model uncertainty (std across trees): ±{float(stds[0]):.2f}")
+                if bands is not None:
+                    st.write(f"Model uncertainty (std across trees): ±{float(bands['std'][0]):.2f}")
+                    st.write(f"Tree range P10–P90: {float(bands['quantiles'][0.1][0]):.2f} – {float(bands['quantiles'][0.9][0]):.2f}")
             except Exception as e:
                 st.error(f"Regression error: {e}")
                 st.exception(e)
 
+        # Comparables: most similar historical properties, same locality (or city) first
+        if comparables_index is not None:
+            try:
+                with trace.span("comparables"):
+                    comps = comparables_index.query(df_single_raw, k=COMPARABLES_K)
+                st.markdown("#### Comparable properties")
+                level = comps["match_level"].iloc[0]
+                st.caption({"locality": "Nearest matches in the same locality",
+                            "city": "Too few listings in this locality; nearest matches across the city",
+                            "all": "City not in the data; nearest matches across all cities"}[level])
+                st.dataframe(comps.drop(columns=["query", "match_level"]).round(2))
+            except Exception as e:
+                st.write("Could not look up comparables:", e)
+
+        render_performance_panel(trace, scored)
+        log_trace(trace)
+
+# -------------------------
+# What-if sweep: a grid of variants of the entered property, scored in one batched call
+# -------------------------
+def render_sweep(grid, features):
+    price, prob = "Future_Price_5Yrs_Pred", "Good_Investment_Prob"
+    if len(features) == 1:
+        chart_df = grid.set_index(features[0])
+        if price in grid:
+            st.write("Estimated price after 5 years (P10–P90 across trees)")
+            st.line_chart(chart_df[[c for c in (price, "Future_Price_5Yrs_P10", "Future_Price_5Yrs_P90") if c in grid]])
+        if prob in grid:
+            st.write("Probability of Good Investment")
+            st.line_chart(chart_df[[prob]])
+        return
+    import altair as alt
+    fx, fy = features
+    for col, title in ((price, "Estimated price after 5 years"), (prob, "Probability of Good Investment")):
+        if col not in grid:
+            continue
+        tooltip = [fx, fy, col] + (["Future_Price_5Yrs_Std"] if col == price and "Future_Price_5Yrs_Std" in grid else [])
+        chart = alt.Chart(grid, title=title).mark_rect().encode(
+            x=alt.X(f"{fx}:O"), y=alt.Y(f"{fy}:O", sort="descending"), color=alt.Color(f"{col}:Q"), tooltip=tooltip,
+        )
+        st.altair_chart(chart)
+
+if run_sweep_clicked:
+    if feature_list is None or (clf_pipeline is None and reg_pipeline is None):
+        st.error("Models or feature list not available; cannot run a sweep.")
+    else:
+        features = [sweep_x] + ([sweep_y] if sweep_y != "(none)" else [])
+        trace = Trace("sweep", session=perf_session, engine=scoring_engine, features=features)
+        try:
+            with trace.capture(profile=profile_cprofile, trace_memory=profile_memory):
+                with trace.span("align_inputs_to_features"):
+                    X_base = align_inputs_to_features(pd.DataFrame([input_dict]), feature_list, processed_df, schema=feature_schema)
+                axes = {f: sweep_values(f, X_base[f].iloc[0], processed_df, sweep_points) for f in features}
+                with trace.span("build grid + score"):
+                    grid, sweep_stats = run_sweep(X_base, axes, clf_pipeline, reg_pipeline, engine=scoring_engine)
+                trace.add("build grid", sweep_stats["build_seconds"], depth=1)
+                trace.add_timings(sweep_stats["timings"], depth=1)
+            trace.meta["rows"] = sweep_stats["points"]
+            st.markdown("#### What-if sweep")
+            st.caption(f"{sweep_stats['points']:,} variants scored in {sweep_stats['seconds'] * 1e3:,.0f} ms "
+                       f"(one batched call per model); other inputs held at the entered values")
+            render_sweep(grid, features)
+            render_performance_panel(trace)
+            log_trace(trace)
+        except Exception as e:
+            st.error(f"Sweep failed: {e}")
+            st.exception(e)
+
 with col2:
     st.subheader("Batch predictions (CSV)")
     uploaded_file = st.file_uploader("Upload CSV with raw properties (optional)", type=["csv"], key="batch_upload")
+    streaming_mode = st.checkbox("Streaming mode (large files: read, score and write in chunks)", value=False, key="batch_streaming")
+    batch_uncertainty = st.checkbox("Include regression uncertainty (±std, P10/P90 across trees)", value=False, key="batch_uncertainty")
+    batch_comparables = st.checkbox(f"Add comparables summary (top {COMPARABLES_K} similar properties per row)", value=False,
+                                    key="batch_comparables", disabled=streaming_mode or comparables_index is None)
+    background_job = st.checkbox("Run uploads as a background job (keeps running across reruns; resumable)", value=True, key="batch_background")
+    if streaming_mode or background_job:
+        chunk_rows = st.number_input("Rows per chunk", min_value=1000, max_value=1_000_000, value=DEFAULT_CHUNK_ROWS, step=1000, key="batch_chunk_rows")
+        # off by default: a large file would fill the shared cache (evicting the interactive entries)
+        # with rows that are rarely scored again
+        cache_chunks = st.checkbox("Cache chunk predictions (helps when the file repeats rows scored before)",
+                                   value=False, key="batch_cache_chunks")
+    else:
+        cache_chunks = False
+    chunk_cache = prediction_cache if cache_chunks else None
+    with st.expander("Parallel scoring (opt-in)", expanded=False):
+        parallel_workers = st.number_input("Worker processes", min_value=1, max_value=default_workers(), value=DEFAULT_WORKERS, step=1, key="batch_workers")
+        shard_rows = st.number_input("Rows per shard", min_value=1000, max_value=1_000_000, value=DEFAULT_SHARD_ROWS, step=1000, key="batch_shard_rows")
+        st.caption("Off with 1 worker (the default). With more, batches larger than one shard are split across "
+                   "worker processes that memory-map one shared compact export of each model. Starting the "
+                   "workers takes seconds, so it pays off only with free cores and large batches; measure with "
+                   "bench_parallel.py first.")
+    batch_scorer = get_parallel_scorer().configure(workers=parallel_workers, shard_rows=shard_rows,
+                                                   model_paths={"clf": MODEL_CLF_PATH, "reg": MODEL_REG_PATH})
+    batch_jobs = get_batch_job_queue()
+    # a job's id covers its input and this key, so a finished job is reused only with the same models and options
+    job_key = {"models": model_fingerprint, "features": feature_list, "uncertainty": batch_uncertainty, "engine": scoring_engine}
+    job_scorer = make_chunk_scorer(feature_list, processed_df, encoding=frame_encoding, clf_model=clf_pipeline,
+                                   reg_model=reg_pipeline, schema=feature_schema, with_uncertainty=batch_uncertainty,
+                                   engine=scoring_engine, cache=chunk_cache, fingerprint=model_fingerprint,
+                                   scorer=batch_scorer)
 
     if uploaded_file is not None:
         try:
-            df_batch = pd.read_csv(uploaded_file)
+            if streaming_mode:
+                # only the preview is read up front; the full file is scored chunk by chunk
+                df_batch = pd.read_csv(uploaded_file, nrows=200)
+                uploaded_file.seek(0)
+            else:
+                df_batch = pd.read_csv(uploaded_file)
+                if frame_encoding is not None:
+                    # same dictionaries / dtypes as processed_df (no bitset: it would end up in the output CSV)
+                    df_batch = frame_encoding.encode(df_batch, amenity_bits=False)
             st.success("Uploaded CSV loaded")
         except Exception as e:
             st.error(f"Failed to read uploaded CSV: {e}")
@@ -391,7 +535,7 @@ with col2:
     else:
         if processed_df is not None:
             st.info("No upload detected. Showing first 200 rows from processed data as sample.")
-            df_batch = processed_df.head(200)
+            df_batch = processed_df.head(200).drop(columns=list(DERIVED_COLUMNS), errors="ignore")
         else:
             df_batch = None
             st.info("Upload a CSV file or run src/feature_engineering.py to create data/final_data.csv")
@@ -403,75 +547,215 @@ with col2:
         if st.button("Predict all (batch)", key="predict_batch_btn"):
             if feature_list is None:
                 st.error("Feature list unknown; cannot run batch predictions.")
+            elif background_job and uploaded_file is not None:
+                try:
+                    job_id = batch_jobs.submit(uploaded_file.getvalue(), job_scorer, job_key,
+                                               name=uploaded_file.name, chunk_rows=int(chunk_rows))
+                    st.session_state["batch_job_select"] = job_id
+                    if job_id not in st.session_state["batch_job_ids"]:
+                        st.session_state["batch_job_ids"].append(job_id)
+                    st.success(f"Batch job {job_id} submitted — progress and results under Batch jobs below")
+                except Exception as e:
+                    st.error(f"Could not start the batch job: {e}")
+                    st.exception(e)
+            elif streaming_mode and uploaded_file is not None and uploaded_file.size > MAX_INLINE_DOWNLOAD_BYTES:
+                # the predictions are larger than the upload, so they could not be downloaded in the browser
+                st.warning(f"This file ({uploaded_file.size / 1e6:,.0f} MB) is too large for a streamed download; "
+                           "tick 'Run uploads as a background job' — its result is kept on the server under jobs/.")
+            elif streaming_mode and uploaded_file is not None:
+                try:
+                    progress_text = st.empty()
+
+                    def report_progress(rows_done, rows_per_sec):
+                        progress_text.write(f"Scored {rows_done:,} rows ({rows_per_sec:,.0f} rows/sec)")
+
+                    uploaded_file.seek(0)
+                    trace = Trace("stream", session=perf_session, engine=scoring_engine,
+                                  uncertainty=batch_uncertainty, chunk_rows=int(chunk_rows))
+                    with trace.capture(profile=profile_cprofile, trace_memory=profile_memory):
+                        with trace.span("stream_batch_predictions"):
+                            out_file, stats, preview = stream_batch_predictions(
+                                uploaded_file, feature_list, processed_df,
+                                clf_model=clf_pipeline, reg_model=reg_pipeline,
+                                chunk_rows=chunk_rows, progress_callback=report_progress,
+                                schema=feature_schema, with_uncertainty=batch_uncertainty, engine=scoring_engine,
+                                cache=chunk_cache, fingerprint=model_fingerprint, scorer=batch_scorer,
+                                encoding=frame_encoding,
+                            )
+                    trace.add_timings(stats["stage_seconds"], depth=1)
+                    trace.meta["rows"] = stats["rows"]
+                    st.success(f"Streamed {stats['rows']:,} rows in {stats['chunks']} chunks "
+                               f"({stats['seconds']:.1f}s, {stats['rows_per_sec']:,.0f} rows/sec) — preview below")
+                    if preview is not None:
+                        st.dataframe(preview)
+                    render_performance_panel(trace)
+                    log_trace(trace)
+                    with out_file:
+                        size = out_file.seek(0, os.SEEK_END)
+                        out_file.seek(0)
+                        if size > MAX_INLINE_DOWNLOAD_BYTES:
+                            st.warning(f"The predictions ({size / 1e6:,.0f} MB) are too large to download in the browser; "
+                                       "run the file as a background job to keep the result on the server under jobs/.")
+                        else:
+                            st.download_button("Download predictions CSV", data=out_file.read(), file_name="predictions.csv", mime="text/csv", key="download_preds_btn")
+                except Exception as e:
+                    st.error(f"Batch prediction failed: {e}")
+                    st.exception(e)
             else:
                 try:
-                    X_batch = align_inputs_to_features(df_batch, feature_list, processed_df)
-                    df_out = df_batch.copy()
-
-                    # Classification
-                    if clf_pipeline is not None:
-                        clf_preds = predict_with_model(clf_pipeline, X_batch)
-                        clf_prob = predict_proba_if_available(clf_pipeline, X_batch)
-                        df_out["Good_Investment_Pred"] = clf_preds
-                        if clf_prob is not None:
-                            df_out["Good_Investment_Prob"] = clf_prob
-
-                    # Regression
-                    if reg_pipeline is not None:
-                        reg_preds = predict_with_model(reg_pipeline, X_batch)
-                        df_out["Future_Price_5Yrs_Pred"] = reg_preds
+                    trace = Trace("batch", session=perf_session, engine=scoring_engine,
+                                  uncertainty=batch_uncertainty, rows=len(df_batch))
+                    with trace.capture(profile=profile_cprofile, trace_memory=profile_memory):
+                        with trace.span("align_inputs_to_features"):
+                            X_batch = align_inputs_to_features(df_batch, feature_list, processed_df, schema=feature_schema)
+                            df_out = df_batch.copy()
+
+                        # duplicate listings (same features, different ID) are scored once and fanned out
+                        with trace.span("score"):
+                            scored = score_shared_cached(X_batch, clf_model=clf_pipeline, reg_model=reg_pipeline,
+                                                         cache=prediction_cache, fingerprint=model_fingerprint,
+                                                         with_uncertainty=batch_uncertainty, engine=scoring_engine,
+                                                         scorer=batch_scorer)
+                        trace.add_timings(scored["timings"], depth=1)
+                        with trace.span("add prediction columns"):
+                            add_scored_columns(df_out, scored)
+                        if batch_comparables and comparables_index is not None:
+                            with trace.span("comparables"):
+                                summary = comparables_index.summarize(df_batch, k=COMPARABLES_K)
+                                df_out[summary.columns] = summary
+                        with trace.span("to_csv export"):
+                            csv = df_out.to_csv(index=False).encode("utf-8")
 
                     st.success("Batch predictions complete — preview below")
                     st.dataframe(df_out.head())
+                    render_performance_panel(trace, scored)
+                    log_trace(trace)
 
-                    csv = df_out.to_csv(index=False).encode("utf-8")
                     st.download_button("Download predictions CSV", data=csv, file_name="predictions.csv", mime="text/csv", key="download_preds_btn")
                 except Exception as e:
                     st.error(f"Batch prediction failed: {e}")
                     st.exception(e)
 
     st.markdown("---")
-    st.subheader("Model insights & feature importance (best-effort)")
-    if reg_pipeline is not None:
-        try:
-            # Attempt to extract feature names from preprocessor if pipeline, else fallback to feature_list
-            if hasattr(reg_pipeline, "named_steps"):
-                preproc = list(reg_pipeline.named_steps.values())[0]
+    st.subheader("Batch jobs")
+
+    # jobs are listed per session: the ones it submitted, plus any opened by id (e.g. from an earlier session)
+    st.session_state.setdefault("batch_job_ids", [])
+    with st.expander("Open a job by id"):
+        open_id = st.text_input("Job id", key="batch_job_open_id").strip()
+        if open_id:
+            if batch_jobs.get(open_id) is None:
+                st.warning(f"No job {open_id} (it may have been removed by the retention limit)")
+            elif open_id not in st.session_state["batch_job_ids"]:
+                st.session_state["batch_job_ids"].append(open_id)
+
+    def render_batch_jobs():
+        jobs = batch_jobs.jobs(st.session_state["batch_job_ids"])
+        if not jobs:
+            st.caption(f"No batch jobs in this session yet. Jobs are kept on disk under jobs/ (the newest "
+                       f"{batch_jobs.max_jobs}, for up to {batch_jobs.retention_days} days).")
+            return
+        st.dataframe(pd.DataFrame([{
+            "job": j["id"], "file": j["name"], "status": j["status"], "rows": j["rows_done"],
+            "of ~": j["rows_estimate"], "seconds": round(j["seconds"], 1),
+            "created": time.strftime("%Y-%m-%d %H:%M", time.localtime(j["created"])),
+        } for j in jobs]))
+        by_id = {j["id"]: j for j in jobs}
+        if st.session_state.get("batch_job_select") not in by_id:
+            st.session_state["batch_job_select"] = jobs[0]["id"]
+        job = by_id[st.selectbox("Job", list(by_id), key="batch_job_select",
+                                 format_func=lambda i: f"{i} — {by_id[i]['name']} ({by_id[i]['status']})")]
+        if job["status"] in (RUNNING, QUEUED):
+            st.progress(min(1.0, job["rows_done"] / max(1, job["rows_estimate"])))
+            st.write(f"{job['status'].capitalize()}: {job['rows_done']:,} of ~{job['rows_estimate']:,} rows "
+                     f"({len(job['chunks'])} chunks checkpointed)")
+            if st.button("Cancel job", key="cancel_job_btn"):
+                batch_jobs.cancel(job["id"])
+        elif job["status"] == DONE:
+            rate = job["rows_done"] / job["seconds"] if job["seconds"] > 0 else 0.0
+            st.write(f"Done: {job['rows_done']:,} rows in {job['seconds']:.1f}s ({rate:,.0f} rows/sec)")
+            download_file_button("Download predictions CSV", batch_jobs.result_path(job["id"]),
+                                 f"predictions-{job['id']}.csv", key="download_job_btn")
+        elif job["status"] in RESUMABLE:
+            if job["status"] == FAILED:
+                st.error(f"Job failed: {job['error']}")
+            st.write(f"{job['status'].capitalize()} after {job['rows_done']:,} of ~{job['rows_estimate']:,} rows; "
+                     f"resuming continues from chunk {len(job['chunks']) + 1}.")
+            if st.button("Resume job", key="resume_job_btn"):
                 try:
-                    feature_names = preproc.get_feature_names_out()
-                except Exception:
-                    feature_names = feature_list
-                final_est = list(reg_pipeline.named_steps.values())[-1]
-                if feature_names is not None and len(feature_names) == len(importances := getattr(final_est, "feature_importances_", [])):
-                    imp_df = pd.DataFrame({"feature": feature_names, "importance": importances})
-                    imp_df = imp_df.sort_values("importance", ascending=False).head(15)
-                    st.write("Top feature importances (regressor):")
-                    st.table(imp_df.reset_index(drop=True))
-                else:
-                    st.write("Feature importance length mismatch; showing numeric columns from processed data.")
-                    if processed_df is not None:
-                        st.write(processed_df.select_dtypes(include=[np.number]).columns.tolist()[:15])
-                    else:
-                        st.write("No processed_df available.")
+                    batch_jobs.resume(job["id"], job_scorer, job_key)
+                except ValueError as e:
+                    st.error(str(e))
+        if job["status"] not in (RUNNING, QUEUED) and st.button("Delete job", key="delete_job_btn"):
+            batch_jobs.remove(job["id"])
+
+    # refresh the panel on its own while a job runs (st.fragment needs Streamlit >= 1.37)
+    jobs_running = any(j["status"] in (RUNNING, QUEUED) for j in batch_jobs.jobs(st.session_state["batch_job_ids"]))
+    if jobs_running and hasattr(st, "fragment"):
+        st.fragment(render_batch_jobs, run_every=2)()
+    else:
+        render_batch_jobs()
+        if jobs_running:
+            st.button("Refresh job status", key="refresh_jobs_btn")
+
+    st.markdown("---")
+    st.subheader("Model insights & feature importance")
+    importance_models = {kind: (model, model_registry.fingerprint(path)) for kind, model, path in (
+        ("regressor", reg_pipeline, MODEL_REG_PATH), ("classifier", clf_pipeline, MODEL_CLF_PATH)) if model is not None}
+    if not importance_models:
+        st.write("No trained model loaded to show importances.")
+    else:
+        importance_kind = st.selectbox("Model", list(importance_models), key="importance_model")
+        importance_model, importance_fp = importance_models[importance_kind]
+        try:
+            impurity = get_impurity_importance(importance_fp, tuple(feature_list or ()), importance_model)
+            if impurity is None:
+                st.write(f"The {importance_kind} does not expose feature_importances_.")
             else:
-                final_est = reg_pipeline
-                if hasattr(final_est, "feature_importances_"):
-                    importances = final_est.feature_importances_
-                    if feature_list is not None and len(feature_list) == len(importances):
-                        imp_df = pd.DataFrame({"feature": feature_list, "importance": importances}).sort_values("importance", ascending=False).head(15)
-                        st.write("Top feature importances (regressor):")
-                        st.table(imp_df.reset_index(drop=True))
-                    else:
-                        st.write("Cannot align importances to feature names automatically.")
-                else:
-                    st.write("Regressor does not expose feature_importances_.")
+                by_column, by_output = impurity
+                st.write(f"Top feature importances ({importance_kind}, impurity; one-hot outputs summed per column):")
+                st.table(by_column.head(15).round(4))
+                with st.expander("Per encoded feature", expanded=False):
+                    st.table(by_output.head(30).round(4))
         except Exception as e:
             st.write("Could not compute importances:", e)
-    else:
-        st.write("No trained regressor loaded to show importances.")
+
+        target = IMPORTANCE_TARGETS[importance_kind]
+        if processed_df is not None and feature_list is not None and target in processed_df.columns:
+            perm_rows = st.number_input("Permutation sample rows", min_value=100, max_value=100_000,
+                                        value=DEFAULT_IMPORTANCE_ROWS, step=500, key="perm_rows")
+            if st.checkbox("Permutation importance (score drop when a column is shuffled)", value=False, key="perm_importance"):
+                try:
+                    with st.spinner("Shuffling columns in parallel…"):
+                        perm, perm_stats = get_permutation_importance(
+                            importance_fp, tuple(feature_list), file_stat_key(PROCESSED_CSV), int(perm_rows), target,
+                            importance_model, processed_df, feature_schema,
+                        )
+                    st.caption(f"{perm_stats['rows']:,} sampled rows, base {perm_stats['metric']} "
+                               f"{perm_stats['base_score']:.3f}; {perm_stats['predictions']} of at most "
+                               f"{perm_stats['max_predictions']} predictions (early stopping), "
+                               f"{perm_stats['workers']} threads, {perm_stats['seconds']:.1f}s — cached for this model")
+                    st.table(perm.head(15).round(4))
+                except Exception as e:
+                    st.write("Could not compute permutation importance:", e)
 
 st.markdown("---")
 st.write("Developer notes:")
 st.write("• This app accepts either sklearn Pipelines (preferred) or raw estimators saved with pickle/joblib/cloudpickle.")
 st.write("• If predictions seem wrong, retrain pipelines with proper preprocessing and save them as pipeline pickles/joblib.")
-st.write("• Large model files (GBs) may be slow to load; consider saving smaller inference models or using fewer trees.")
+st.write("• Large model files (GBs) may be slow to load; export compact inference models with `python compact_forest.py export` (loaded automatically from models/*_compact).")
+
+# -------------------------
+# Sidebar: prediction cache stats (filled last so they include this run's predictions)
+# -------------------------
+with cache_box:
+    cache_stats = prediction_cache.stats()
+    st.write("Prediction cache:")
+    st.write(f"Hits / misses: {cache_stats['hits']:,} / {cache_stats['misses']:,} ({cache_stats['hit_rate']:.0%} hit rate)")
+    st.write(f"Entries: {cache_stats['entries']:,} (~{cache_stats['bytes'] / 1024:,.0f} KB)")
+    if cache_stats["invalidations"]:
+        st.caption(f"Cleared {cache_stats['invalidations']} time(s) after a model change")
+    if st.button("Clear prediction cache", key="clear_cache_btn"):
+        prediction_cache.clear()
+        rerun()
+    st.markdown("---")
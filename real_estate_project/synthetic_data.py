@@ -0,0 +1,131 @@
+# synthetic_data.py
+import os
+
+import numpy as np
+import pandas as pd
+
+STATES_CITIES = {
+    "Maharashtra": ["Mumbai", "Pune", "Nagpur"],
+    "Karnataka": ["Bangalore", "Mysore"],
+    "Tamil Nadu": ["Chennai", "Coimbatore"],
+    "Telangana": ["Hyderabad"],
+    "Delhi": ["New Delhi"],
+    "West Bengal": ["Kolkata"],
+}
+PROPERTY_TYPES = ["Apartment", "Villa", "House", "Plot"]
+FURNISHED = ["Unfurnished", "Semi", "Fully"]
+TRANSPORT = ["Poor", "Average", "Good", "Excellent"]
+SECURITY = ["None", "Gated", "CCTV", "Guard", "Other"]
+AMENITIES = ["Gym", "Pool", "Clubhouse", "Garden", "Playground"]
+FACING = ["North", "South", "East", "West"]
+OWNER_TYPES = ["Individual", "Builder", "Agent"]
+AVAILABILITY = ["Available", "Under Construction", "Sold"]
+LOCALITIES_PER_CITY = 40
+CURRENT_YEAR = 2025
+
+
+def make_synthetic_properties(n_rows, seed=0, start_id=1):
+    """
+    Random rows with the same columns and value domains as data/final_data.csv,
+    including the Future_Price_5Yrs / Good_Investment targets.
+    """
+    rng = np.random.default_rng(seed)
+    states = np.array(list(STATES_CITIES), dtype=object)
+    state_idx = rng.integers(0, len(states), n_rows)
+    state = states[state_idx]
+    # (state, i) -> city lookup table, so no per-row Python work
+    cities = np.array([[STATES_CITIES[s][i % len(STATES_CITIES[s])] for i in range(3)] for s in STATES_CITIES], dtype=object)
+    city_table = np.array([c for row in cities for c in row], dtype=object)
+    city_idx = state_idx * 3 + rng.integers(0, 3, n_rows)
+    city = city_table[city_idx]
+    locality_table = np.array([f"{c}_Locality_{k}" for c in city_table for k in range(1, LOCALITIES_PER_CITY + 1)], dtype=object)
+    locality = locality_table[city_idx * LOCALITIES_PER_CITY + rng.integers(0, LOCALITIES_PER_CITY, n_rows)]
+
+    bhk = rng.integers(1, 6, n_rows)
+    size = np.round(bhk * rng.uniform(350, 700, n_rows), 1)
+    year_built = rng.integers(1990, CURRENT_YEAR, n_rows)
+    total_floors = rng.integers(1, 41, n_rows)
+    floor_no = np.minimum(rng.integers(0, 41, n_rows), total_floors)
+    price_per_sqft = np.round(rng.lognormal(np.log(6000), 0.4, n_rows), 2)
+    price_lakhs = np.round(size * price_per_sqft / 1e5, 2)
+
+    amenity_mask = rng.random((n_rows, len(AMENITIES))) < 0.4
+    # every subset of AMENITIES as its joined string, indexed by the subset's bitmask
+    subsets = np.array([", ".join(a for j, a in enumerate(AMENITIES) if code >> j & 1)
+                        for code in range(1 << len(AMENITIES))], dtype=object)
+    amenities = subsets[amenity_mask @ (1 << np.arange(len(AMENITIES)))]
+
+    df = pd.DataFrame({
+        "ID": np.arange(start_id, start_id + n_rows),
+        "State": state,
+        "City": city,
+        "Locality": locality,
+        "Property_Type": rng.choice(PROPERTY_TYPES, n_rows),
+        "BHK": bhk,
+        "Size_in_SqFt": size,
+        "Price_in_Lakhs": price_lakhs,
+        "Price_per_SqFt": price_per_sqft,
+        "Year_Built": year_built,
+        "Furnished_Status": rng.choice(FURNISHED, n_rows),
+        "Floor_No": floor_no,
+        "Total_Floors": total_floors,
+        "Age_of_Property": CURRENT_YEAR - year_built,
+        "Nearby_Schools": rng.integers(0, 11, n_rows),
+        "Nearby_Hospitals": rng.integers(0, 11, n_rows),
+        "Public_Transport_Accessibility": rng.choice(TRANSPORT, n_rows),
+        "Parking_Space": rng.integers(0, 4, n_rows),
+        "Security": rng.choice(SECURITY, n_rows),
+        "Amenities": amenities,
+        "Facing": rng.choice(FACING, n_rows),
+        "Owner_Type": rng.choice(OWNER_TYPES, n_rows),
+        "Availability_Status": rng.choice(AVAILABILITY, n_rows),
+    })
+    growth = 1.0 + rng.normal(0.45, 0.15, n_rows) + 0.02 * amenity_mask.sum(axis=1)
+    df["Future_Price_5Yrs"] = np.round(price_lakhs * growth, 2)
+    df["Good_Investment"] = ((growth > 1.5) & (price_per_sqft < 7000)).astype(np.int64)
+    return df
+
+
+def write_synthetic_csv(path, n_rows, seed=0, chunk_rows=1_000_000):
+    """
+    Write n_rows synthetic rows to a CSV in chunks (memory stays O(chunk_rows) even for 10M rows).
+    Chunk k uses seed (seed, k), so the file for a given (n_rows, seed, chunk_rows) is reproducible.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        for k, start in enumerate(range(0, n_rows, chunk_rows)):
+            n = min(chunk_rows, n_rows - start)
+            chunk = make_synthetic_properties(n, seed=(seed, k), start_id=start + 1)
+            chunk.to_csv(f, index=False, header=(k == 0))
+    os.replace(tmp_path, path)
+    return path
+
+
+def train_synthetic_pipelines(n_rows=20_000, n_estimators=100, max_depth=None, seed=0, n_jobs=-1):
+    """
+    (classifier_pipeline, regressor_pipeline, train_df) fitted on synthetic rows, with the same
+    shape as models/*.pkl (impute/one-hot ColumnTransformer + RandomForest), for benchmarks.
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+
+    df = make_synthetic_properties(n_rows, seed=seed)
+    features = df.drop(columns=["ID", "Future_Price_5Yrs", "Good_Investment"])
+    numeric = features.select_dtypes(include=[np.number]).columns.tolist()
+    categorical = [c for c in features.columns if c not in numeric]
+
+    def pipeline(estimator):
+        preprocessor = ColumnTransformer([
+            ("num", SimpleImputer(strategy="median"), numeric),
+            ("cat", OneHotEncoder(handle_unknown="ignore"), categorical),
+        ])
+        return Pipeline([("preprocessor", preprocessor), ("model", estimator)])
+
+    clf = pipeline(RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=seed, n_jobs=n_jobs))
+    reg = pipeline(RandomForestRegressor(n_estimators=n_estimators, max_depth=max_depth, random_state=seed, n_jobs=n_jobs))
+    clf.fit(features, df["Good_Investment"])
+    reg.fit(features, df["Future_Price_5Yrs"])
+    return clf, reg, df
@@ -0,0 +1,15 @@
+# tests/conftest.py
+# The app's modules are flat files in real_estate_project/; make them importable from tests/.
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def synthetic_models():
+    """(classifier_pipeline, regressor_pipeline, train_df): small impute/one-hot + RandomForest pipelines."""
+    from synthetic_data import train_synthetic_pipelines
+    return train_synthetic_pipelines(n_rows=2000, n_estimators=20, n_jobs=1)
@@ -0,0 +1,93 @@
+# tests/test_batch_jobs.py
+import threading
+
+import pandas as pd
+
+from batch_jobs import BatchJobQueue, DONE, CANCELLED
+
+CSV = ("x\n" + "".join(f"{i}\n" for i in range(10))).encode()
+
+
+def double(chunk):
+    return chunk.assign(y=chunk["x"] * 2)
+
+
+def wait(queue, job_id):
+    return queue._active[job_id][0].result()
+
+
+def test_job_runs_to_a_result(tmp_path):
+    queue = BatchJobQueue(str(tmp_path))
+    job_id = queue.submit(CSV, double, key={"model": "a"}, chunk_rows=3)
+    assert wait(queue, job_id) == DONE
+    result = pd.read_csv(queue.result_path(job_id))
+    assert result["y"].tolist() == [i * 2 for i in range(10)]
+    assert queue.get(job_id)["rows_done"] == 10
+
+
+def test_cancelled_job_resumes_from_its_last_chunk(tmp_path):
+    queue = BatchJobQueue(str(tmp_path))
+    first_chunk_done, release = threading.Event(), threading.Event()
+    scored = []
+
+    def blocking(chunk):
+        scored.append(chunk["x"].iloc[0])
+        if len(scored) == 1:
+            first_chunk_done.set()
+            release.wait(5)
+        return double(chunk)
+
+    job_id = queue.submit(CSV, blocking, key={"model": "a"}, chunk_rows=3)
+    first_chunk_done.wait(5)
+    queue.cancel(job_id)
+    release.set()
+    assert wait(queue, job_id) == CANCELLED
+    assert queue.get(job_id)["rows_done"] == 3
+
+    queue.resume(job_id, blocking, key={"model": "a"})
+    assert wait(queue, job_id) == DONE
+    assert scored == [0, 3, 6, 9]  # the first chunk is not scored again
+    assert pd.read_csv(queue.result_path(job_id))["y"].tolist() == [i * 2 for i in range(10)]
+
+
+def test_duplicate_start_after_completion_keeps_the_result(tmp_path):
+    queue = BatchJobQueue(str(tmp_path))
+    job_id = queue.submit(CSV, double, key={"model": "a"}, chunk_rows=3)
+    wait(queue, job_id)
+    with queue._lock:
+        queue._start_locked(job_id, double)  # e.g. a second session that raced the first
+    assert wait(queue, job_id) == DONE
+    assert queue.get(job_id)["status"] == DONE and queue.get(job_id)["error"] is None
+
+
+def test_concurrent_submits_run_the_job_once(tmp_path):
+    queue = BatchJobQueue(str(tmp_path))
+    calls = []
+    barrier = threading.Barrier(4)
+
+    def counting(chunk):
+        calls.append(len(chunk))
+        return double(chunk)
+
+    def submit():
+        barrier.wait()
+        queue.submit(CSV, counting, key={"model": "a"}, chunk_rows=5)
+
+    threads = [threading.Thread(target=submit) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    job_id = next(iter(queue._active))
+    assert wait(queue, job_id) == DONE
+    assert calls == [5, 5]
+
+
+def test_prune_keeps_the_newest_jobs(tmp_path):
+    queue = BatchJobQueue(str(tmp_path), max_jobs=2)
+    ids = []
+    for i in range(4):
+        ids.append(queue.submit(CSV, double, key={"model": i}, chunk_rows=5))
+        wait(queue, ids[-1])
+    assert {j["id"] for j in queue.jobs()} == set(ids[-2:])
+    assert [j["id"] for j in queue.jobs(ids[-1:])] == ids[-1:]
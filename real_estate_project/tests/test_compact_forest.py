@@ -0,0 +1,75 @@
+# tests/test_compact_forest.py
+import numpy as np
+import pytest
+
+from compact_forest import CompactForest, CompactPipeline, DEFAULT_MIN_TREES, export_pipeline
+from feature_schema import FeatureSchema
+from model_registry import is_compact_dir
+from scoring import infer_feature_list_from_models
+from synthetic_data import make_synthetic_properties
+
+# float32 thresholds/leaf values, see compact_forest._float32_floor
+REL_TOL = 1e-5
+
+
+def quiet(_):
+    pass
+
+
+@pytest.fixture(scope="module")
+def inputs(synthetic_models):
+    clf, reg, train_df = synthetic_models
+    df = make_synthetic_properties(400, seed=11)
+    features = infer_feature_list_from_models(train_df, reg, clf)
+    return clf, reg, FeatureSchema.from_processed(features, train_df).align(df)
+
+
+def test_regressor_matches_sklearn(inputs, tmp_path):
+    _, reg, X = inputs
+    compact = export_pipeline(reg, str(tmp_path / "reg"), log=quiet)
+    np.testing.assert_allclose(compact.predict(X), reg.predict(X), rtol=REL_TOL)
+
+
+def test_classifier_matches_sklearn(inputs, tmp_path):
+    clf, _, X = inputs
+    compact = export_pipeline(clf, str(tmp_path / "clf"), log=quiet)
+    np.testing.assert_array_equal(compact.predict(X), clf.predict(X))
+    np.testing.assert_allclose(compact.predict_proba(X), clf.predict_proba(X), atol=1e-6)
+    np.testing.assert_array_equal(compact.forest.classes_, clf.classes_)
+
+
+def test_nan_inputs_are_imputed_like_sklearn(inputs, tmp_path):
+    clf, reg, X = inputs
+    X = X.copy()
+    numeric = X.select_dtypes(include=[np.number]).columns
+    X.loc[X.index[::3], numeric[0]] = np.nan
+    X.loc[X.index[1::4], numeric[-1]] = np.nan
+    reg_compact = export_pipeline(reg, str(tmp_path / "reg"), log=quiet)
+    clf_compact = export_pipeline(clf, str(tmp_path / "clf"), log=quiet)
+    np.testing.assert_allclose(reg_compact.predict(X), reg.predict(X), rtol=REL_TOL)
+    np.testing.assert_allclose(clf_compact.predict_proba(X), clf.predict_proba(X), atol=1e-6)
+
+
+def test_save_load_round_trip(inputs, tmp_path):
+    clf, reg, X = inputs
+    for model, name in ((reg, "reg"), (clf, "clf")):
+        out = str(tmp_path / name)
+        exported = export_pipeline(model, out, log=quiet)
+        assert is_compact_dir(out)
+        loaded = CompactPipeline.load(out)
+        assert isinstance(loaded.forest.threshold, np.memmap)
+        assert loaded.forest.n_trees == len(model[-1].estimators_)
+        np.testing.assert_array_equal(loaded.feature_names_in_, exported.feature_names_in_)
+        np.testing.assert_array_equal(loaded.predict(X), exported.predict(X))
+        in_memory = CompactForest.load(out, mmap=False)
+        assert not isinstance(in_memory.threshold, np.memmap)
+        assert in_memory.meta == exported.forest.meta
+
+
+def test_accuracy_budget_keeps_at_least_min_trees(synthetic_models, tmp_path):
+    _, reg, train_df = synthetic_models
+    val = train_df.head(300)
+    X_val = val.drop(columns=["ID", "Future_Price_5Yrs", "Good_Investment"])
+    compact = export_pipeline(reg, str(tmp_path / "reg"), X_val_df=X_val, y_val=val["Future_Price_5Yrs"],
+                              max_score_drop=1.0, log=quiet)
+    assert compact.forest.n_trees == DEFAULT_MIN_TREES
@@ -0,0 +1,53 @@
+# tests/test_comparables.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from comparables import ComparablesIndex
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    n = 600
+    return pd.DataFrame({
+        "ID": np.arange(n),
+        "City": rng.choice(["Mumbai", " Pune", "Delhi "], n),
+        "Locality": rng.choice(["Andheri", "Bandra West", "Kothrud"], n),
+        "BHK": rng.integers(1, 5, n),
+        "Size_in_SqFt": rng.uniform(400, 3000, n),
+        "Year_Built": rng.integers(1990, 2024, n),
+        "Price_in_Lakhs": rng.uniform(20, 500, n),
+        "Future_Price_5Yrs": rng.uniform(30, 700, n),
+        "Good_Investment": rng.integers(0, 2, n),
+    })
+
+
+def brute_force(index, query, rows, k):
+    scaled = index._scaled(index.payload)
+    d = np.sqrt(((scaled[rows] - index._scaled(query)[0]) ** 2).sum(axis=1))
+    return np.sort(d)[:k]
+
+
+def test_locations_match_regardless_of_case_and_whitespace(data):
+    index = ComparablesIndex.build(data)
+    query = data.head(1).assign(City="  mumbai", Locality="bandra   west ")
+    found = index.query(query, k=3)
+    assert (found["match_level"] == "locality").all()
+    assert set(found["City"].str.strip()) == {"Mumbai"} and set(found["Locality"]) == {"Bandra West"}
+
+
+def test_unknown_locality_falls_back_to_the_city_tree(data):
+    index = ComparablesIndex.build(data)
+    found = index.query(data.head(1).assign(City="DELHI", Locality="Nowhere"), k=5)
+    assert (found["match_level"] == "city").all()
+    rows = np.flatnonzero(index.payload["City"].str.strip() == "Delhi")
+    np.testing.assert_allclose(found["distance"], brute_force(index, data.head(1), rows, 5))
+
+
+def test_blank_location_searches_every_row(data):
+    index = ComparablesIndex.build(data)
+    query = data.head(1).assign(City="", Locality="")
+    found = index.query(query, k=5)
+    assert (found["match_level"] == "all").all()
+    np.testing.assert_allclose(found["distance"], brute_force(index, query, np.arange(len(data)), 5))
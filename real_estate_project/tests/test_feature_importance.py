@@ -0,0 +1,19 @@
+# tests/test_feature_importance.py
+import pandas as pd
+
+from feature_importance import permutation_importance
+from feature_schema import FeatureSchema
+from scoring import infer_feature_list_from_models
+
+
+def test_permutation_importance_does_not_depend_on_workers(synthetic_models):
+    clf, reg, train_df = synthetic_models
+    sample = train_df.head(400)
+    features = infer_feature_list_from_models(train_df, reg, clf)
+    X = FeatureSchema.from_processed(features, train_df).align(sample)
+    # threads reuse their permutation buffer across columns: results must not leak between columns
+    single, _ = permutation_importance(reg, X, sample["Future_Price_5Yrs"], features, n_jobs=1)
+    threaded, stats = permutation_importance(reg, X, sample["Future_Price_5Yrs"], features, n_jobs=3)
+    assert stats["workers"] == 3
+    pd.testing.assert_frame_equal(single, threaded)
+    assert set(single["column"]) <= set(features)
@@ -0,0 +1,111 @@
+# tests/test_feature_schema.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_schema import FeatureSchema, RENAME_RULES
+from synthetic_data import make_synthetic_properties
+
+TARGETS = ["ID", "Future_Price_5Yrs", "Good_Investment"]
+
+
+def legacy_align(input_df, feature_list, processed_df=None):
+    """The per-call pandas path align() replaced (streamlit_app.align_inputs_to_features before the schema)."""
+    df = input_df.copy()
+    rename_map = {c: RENAME_RULES[c.strip().lower()] for c in df.columns if c.strip().lower() in RENAME_RULES}
+    if rename_map:
+        df = df.rename(columns=rename_map)
+    defaults = {}
+    numeric_cols = [] if processed_df is None else processed_df.select_dtypes(include=[np.number]).columns.tolist()
+    for col in feature_list:
+        if col not in df.columns:
+            if col in numeric_cols:
+                defaults[col] = float(processed_df[col].median())
+            else:
+                defaults[col] = ""
+            df[col] = defaults[col]
+    df = df[list(feature_list)]
+    for c in df.columns:
+        if processed_df is not None and c in numeric_cols:
+            # present columns had no default, so their NaNs became 0
+            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(defaults.get(c, 0))
+        else:
+            try:
+                df[c] = pd.to_numeric(df[c])
+            except (ValueError, TypeError):
+                pass
+    return df
+
+
+@pytest.fixture(scope="module")
+def processed():
+    return make_synthetic_properties(500, seed=5)
+
+
+@pytest.fixture(scope="module")
+def schema(processed):
+    features = [c for c in processed.columns if c not in TARGETS]
+    return FeatureSchema.from_processed(features, processed)
+
+
+def user_input(processed):
+    df = make_synthetic_properties(40, seed=9).drop(columns=TARGETS)
+    # user-friendly names, two missing features and one the models never saw
+    df = df.rename(columns={"Size_in_SqFt": "sqft", "BHK": "bhk", "Year_Built": " Year "})
+    return df.drop(columns=["Floor_No", "Facing"]).assign(Notes="call back")
+
+
+def assert_matches_legacy(got, expected):
+    # a missing categorical column was "" parsed to NaN by the old to_numeric sweep; the schema knows it
+    # is categorical and keeps "" (both are unknown categories to the one-hot encoder)
+    assert (got["Facing"] == "").all() and expected["Facing"].isna().all()
+    pd.testing.assert_frame_equal(got.drop(columns="Facing"), expected.drop(columns="Facing"), check_dtype=False)
+
+
+def test_matches_legacy_path(processed, schema):
+    df = user_input(processed)
+    got = schema.align(df)
+    expected = legacy_align(df, schema.feature_list, processed)
+    assert list(got.columns) == schema.feature_list
+    assert_matches_legacy(got, expected)
+    assert all(got[c].dtype == np.float64 for c in schema.numeric_cols)
+
+
+def test_missing_columns_get_training_defaults(processed, schema):
+    got = schema.align(user_input(processed))
+    assert (got["Floor_No"] == processed["Floor_No"].median()).all()
+    assert (got["Facing"] == "").all()
+    assert "Notes" not in got.columns
+
+
+def test_nan_in_present_numeric_column_uses_median_not_zero(processed, schema):
+    df = user_input(processed)
+    df.loc[df.index[::5], "Price_in_Lakhs"] = np.nan
+    df.loc[df.index[1], "bhk"] = np.nan
+    got = schema.align(df)
+    expected = legacy_align(df, schema.feature_list, processed)
+    # documented difference: the old path filled present NaNs with 0
+    nan_rows = df["Price_in_Lakhs"].isna()
+    assert (expected.loc[nan_rows, "Price_in_Lakhs"] == 0).all()
+    assert (got.loc[nan_rows, "Price_in_Lakhs"] == processed["Price_in_Lakhs"].median()).all()
+    assert got.loc[df.index[1], "BHK"] == processed["BHK"].median()
+    # everything else is unchanged
+    changed = pd.DataFrame(False, index=df.index, columns=schema.feature_list)
+    changed.loc[nan_rows, "Price_in_Lakhs"] = True
+    changed.loc[df.index[1], "BHK"] = True
+    assert_matches_legacy(got.mask(changed), expected.mask(changed))
+
+
+def test_unparseable_numbers_become_the_default(processed, schema):
+    df = user_input(processed).astype({"sqft": object})
+    df.loc[df.index[0], "sqft"] = "n/a"
+    got = schema.align(df)
+    assert got.loc[df.index[0], "Size_in_SqFt"] == processed["Size_in_SqFt"].median()
+    np.testing.assert_array_equal(got["Size_in_SqFt"].iloc[1:], df["sqft"].iloc[1:].astype(float))
+
+
+def test_input_frame_is_not_modified(processed, schema):
+    df = user_input(processed)
+    before = df.copy()
+    schema.align(df)
+    pd.testing.assert_frame_equal(df, before)
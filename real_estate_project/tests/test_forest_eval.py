@@ -0,0 +1,44 @@
+# tests/test_forest_eval.py
+import numpy as np
+import pytest
+
+from feature_schema import FeatureSchema
+from scoring import infer_feature_list_from_models, predict_with_model, predict_proba_if_available
+from shared_inference import score_shared
+from synthetic_data import make_synthetic_properties
+
+# the numpy engine compares float32 inputs with float32-floored thresholds: same branches as sklearn,
+# leaf values summed in float32 -> relative error well below this
+REL_TOL = 1e-5
+
+
+@pytest.fixture(scope="module")
+def scoring_inputs(synthetic_models):
+    clf, reg, train_df = synthetic_models
+    df = make_synthetic_properties(500, seed=7)
+    df.loc[df.index[::17], "Price_in_Lakhs"] = np.nan  # imputed by the pipeline
+    features = infer_feature_list_from_models(train_df, reg, clf)
+    return clf, reg, FeatureSchema.from_processed(features, train_df).align(df)
+
+
+def test_regressor_engines_agree(scoring_inputs):
+    _, reg, X = scoring_inputs
+    expected = predict_with_model(reg, X, engine="sklearn")
+    got = predict_with_model(reg, X, engine="numpy")
+    np.testing.assert_allclose(got, expected, rtol=REL_TOL)
+
+
+def test_classifier_engines_agree(scoring_inputs):
+    clf, _, X = scoring_inputs
+    np.testing.assert_array_equal(predict_with_model(clf, X, engine="numpy"), predict_with_model(clf, X, engine="sklearn"))
+    np.testing.assert_allclose(predict_proba_if_available(clf, X, engine="numpy"),
+                               predict_proba_if_available(clf, X, engine="sklearn"), atol=1e-6)
+
+
+def test_score_shared_engines_agree(scoring_inputs):
+    clf, reg, X = scoring_inputs
+    expected = score_shared(X, clf, reg, with_uncertainty=True, engine="sklearn")
+    got = score_shared(X, clf, reg, with_uncertainty=True, engine="numpy")
+    np.testing.assert_array_equal(got["clf_pred"], expected["clf_pred"])
+    np.testing.assert_allclose(got["reg_pred"], expected["reg_pred"], rtol=REL_TOL)
+    np.testing.assert_allclose(got["bands"]["std"], expected["bands"]["std"], rtol=1e-4, atol=1e-3)
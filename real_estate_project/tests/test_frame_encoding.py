@@ -0,0 +1,41 @@
+# tests/test_frame_encoding.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_schema import FeatureSchema
+from frame_encoding import FrameEncoding, AMENITY_BITS_COLUMN
+from scoring import infer_feature_list_from_models, predict_with_model, predict_proba_if_available
+from synthetic_data import make_synthetic_properties
+
+
+@pytest.fixture(scope="module")
+def frames(synthetic_models):
+    clf, reg, train_df = synthetic_models
+    encoding = FrameEncoding.from_frame(train_df)
+    upload = make_synthetic_properties(300, seed=21)
+    upload.loc[upload.index[::11], "Price_in_Lakhs"] = np.nan
+    upload.loc[upload.index[0], "City"] = "Atlantis"  # unseen category
+    upload.loc[upload.index[1], "BHK"] = 10 ** 6  # outside the training range
+    features = infer_feature_list_from_models(train_df, reg, clf)
+    raw = FeatureSchema.from_processed(features, train_df).align(upload)
+    encoded_train = encoding.encode(train_df)
+    encoded = FeatureSchema.from_processed(features, encoded_train).align(encoding.encode(upload, amenity_bits=False))
+    return clf, reg, raw, encoded
+
+
+def test_encoding_is_compact(frames):
+    _, _, raw, encoded = frames
+    assert isinstance(encoded["City"].dtype, pd.CategoricalDtype)
+    assert "Atlantis" in encoded["City"].cat.categories
+    assert AMENITY_BITS_COLUMN not in encoded.columns
+    pd.testing.assert_frame_equal(encoded.astype(raw.dtypes.to_dict()), raw)
+
+
+@pytest.mark.parametrize("engine", ["sklearn", "numpy"])
+def test_predictions_match_raw_frame(frames, engine):
+    clf, reg, raw, encoded = frames
+    np.testing.assert_array_equal(predict_with_model(reg, encoded, engine=engine), predict_with_model(reg, raw, engine=engine))
+    np.testing.assert_array_equal(predict_with_model(clf, encoded, engine=engine), predict_with_model(clf, raw, engine=engine))
+    np.testing.assert_array_equal(predict_proba_if_available(clf, encoded, engine=engine),
+                                  predict_proba_if_available(clf, raw, engine=engine))
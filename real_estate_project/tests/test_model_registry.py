@@ -0,0 +1,65 @@
+# tests/test_model_registry.py
+import threading
+
+from model_registry import ModelRegistry
+
+
+class BlockingLoader:
+    """Loader that counts calls and can hold one load until released."""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, path):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(timeout=10)
+        return f"model-{self.calls}", None
+
+
+def test_get_loads_once_and_fingerprints(tmp_path):
+    path = tmp_path / "model.pkl"
+    path.write_bytes(b"v1")
+    loader = BlockingLoader()
+    registry = ModelRegistry(loader=loader)
+    assert registry.fingerprint(str(path)) is None
+    assert registry.get(str(path)) == ("model-1", None)
+    assert registry.get(str(path)) == ("model-1", None)
+    assert loader.calls == 1
+    assert registry.fingerprint(str(path))[0] == str(path)
+
+
+def test_invalidate_during_load_is_not_undone(tmp_path):
+    path = tmp_path / "model.pkl"
+    path.write_bytes(b"v1")
+    loader = BlockingLoader()
+    registry = ModelRegistry(loader=loader)
+    loader.release.clear()
+    loading = threading.Thread(target=registry.get, args=(str(path),))
+    loading.start()
+    assert loader.started.wait(timeout=10)
+    registry.invalidate(str(path))  # e.g. the reload button, while a session is still loading
+    loader.release.set()
+    loading.join(timeout=10)
+    # the load that was in flight must not be cached: the next get() reads the file again
+    assert registry.fingerprint(str(path)) is None
+    assert registry.get(str(path)) == ("model-2", None)
+    assert registry.fingerprint(str(path)) is not None
+
+
+def test_invalidate_all_during_load_is_not_undone(tmp_path):
+    path = tmp_path / "model.pkl"
+    path.write_bytes(b"v1")
+    loader = BlockingLoader()
+    registry = ModelRegistry(loader=loader)
+    loader.release.clear()
+    loading = threading.Thread(target=registry.get, args=(str(path),))
+    loading.start()
+    assert loader.started.wait(timeout=10)
+    registry.invalidate()
+    loader.release.set()
+    loading.join(timeout=10)
+    assert registry.fingerprint(str(path)) is None
@@ -0,0 +1,57 @@
+# tests/test_prediction_cache.py
+import numpy as np
+import pandas as pd
+
+from prediction_cache import PredictionCache, score_shared_cached
+
+
+class FakeScorer:
+    """score_shared stand-in: reg_pred = 2x, offset by engine so results from different engines differ."""
+
+    def __init__(self):
+        self.rows_scored = []
+
+    def __call__(self, X_df, clf_model, reg_model, with_uncertainty=True, quantiles=(), engine="sklearn"):
+        self.rows_scored.append(len(X_df))
+        reg_pred = X_df["x"].to_numpy() * 2.0 + (0.5 if engine == "numpy" else 0.0)
+        return {"clf_pred": None, "clf_proba": None, "reg_pred": reg_pred, "bands": None, "X_trans": None,
+                "shared": False, "n_transforms": 1, "timings": {}, "saved_seconds": 0.0}
+
+
+def score(X, cache, scorer, engine="sklearn", fingerprint="v1", **kwargs):
+    return score_shared_cached(X, reg_model=object(), cache=cache, fingerprint=fingerprint,
+                               with_uncertainty=False, engine=engine, scorer=scorer, **kwargs)
+
+
+def test_duplicates_and_repeats_are_scored_once():
+    cache, scorer = PredictionCache(), FakeScorer()
+    X = pd.DataFrame({"ID": [1, 2, 3], "x": [1.0, 1.0, 2.0]})
+    out = score(X, cache, scorer)
+    assert out["reg_pred"].tolist() == [2.0, 2.0, 4.0]
+    assert out["cache"] == {"rows": 3, "unique": 2, "hits": 0, "misses": 2}
+    out = score(X, cache, scorer)
+    assert out["cache"]["hits"] == 2 and scorer.rows_scored == [2]
+
+
+def test_engines_are_cached_apart():
+    cache, scorer = PredictionCache(), FakeScorer()
+    X = pd.DataFrame({"x": [1.0, 2.0]})
+    assert score(X, cache, scorer, engine="sklearn")["reg_pred"].tolist() == [2.0, 4.0]
+    out = score(X, cache, scorer, engine="numpy")
+    assert out["cache"]["misses"] == 2
+    assert out["reg_pred"].tolist() == [2.5, 4.5]
+
+
+def test_new_fingerprint_invalidates_entries():
+    cache, scorer = PredictionCache(), FakeScorer()
+    X = pd.DataFrame({"x": [1.0]})
+    score(X, cache, scorer, fingerprint="v1")
+    assert score(X, cache, scorer, fingerprint="v2")["cache"]["misses"] == 1
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_without_a_cache_rows_go_straight_to_the_scorer():
+    scorer = FakeScorer()
+    out = score(pd.DataFrame({"x": [1.0, 1.0]}), None, scorer)
+    assert "cache" not in out and scorer.rows_scored == [2]
+    assert np.allclose(out["reg_pred"], [2.0, 2.0])
@@ -0,0 +1,130 @@
+# tests/test_repair_pipeline.py
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from repair_pipeline import RepairPipeline, ReplaceInf, Fill, Dedupe
+
+ROWS = 1000
+PARTITION_ROWS = 100
+
+
+def quiet(_):
+    pass
+
+
+def make_pipeline():
+    return RepairPipeline([ReplaceInf(), Fill("Parking_Space", 0)], partition_rows=PARTITION_ROWS)
+
+
+def write_input(path):
+    n = np.arange(ROWS)
+    pd.DataFrame({"ID": n, "Parking_Space": np.where(n % 7 == 0, np.nan, 1.0)}).to_csv(path, index=False)
+
+
+def test_repairs_and_writes_manifest(tmp_path):
+    src, out = tmp_path / "in.csv", tmp_path / "out.csv"
+    write_input(src)
+    report = make_pipeline().run(str(src), str(out), log=quiet)
+    assert report == {"partitions": 10, "repaired": 10, "skipped": 0, "rows": ROWS, "changed": True}
+    assert pd.read_csv(out)["Parking_Space"].isna().sum() == 0
+    manifest = json.loads((tmp_path / "out.csv.manifest.json").read_text())
+    assert len(manifest["partitions"]) == 10
+    assert all(p["out_hash"] for p in manifest["partitions"])
+
+
+def test_unchanged_input_is_a_no_op(tmp_path):
+    src, out = tmp_path / "in.csv", tmp_path / "out.csv"
+    write_input(src)
+    pipeline = make_pipeline()
+    pipeline.run(str(src), str(out), log=quiet)
+    assert pipeline.run(str(src), str(out), log=quiet)["changed"] is False
+
+
+def test_separate_output_reuses_unchanged_partitions(tmp_path):
+    src, out = tmp_path / "in.csv", tmp_path / "out.csv"
+    write_input(src)
+    pipeline = make_pipeline()
+    pipeline.run(str(src), str(out), log=quiet)
+    df = pd.read_csv(src)
+    df.loc[550, "Parking_Space"] = np.nan
+    df.loc[551, "ID"] = -1
+    df.to_csv(src, index=False)
+    report = pipeline.run(str(src), str(out), log=quiet)
+    assert (report["repaired"], report["skipped"]) == (1, 9)
+    assert pd.read_csv(out).loc[551, "ID"] == -1
+
+
+def test_in_place_edit_repairs_only_the_edited_partition(tmp_path):
+    path = tmp_path / "final_data.csv"
+    write_input(path)
+    pipeline = make_pipeline()
+    pipeline.run(str(path), str(path), log=quiet)
+    # the file is now repaired output; edit one row of partition 5
+    df = pd.read_csv(path)
+    df.loc[550, "Parking_Space"] = np.nan
+    df.to_csv(path, index=False)
+    report = pipeline.run(str(path), str(path), log=quiet)
+    assert (report["repaired"], report["skipped"]) == (1, 9)
+    repaired = pd.read_csv(path)
+    assert len(repaired) == ROWS
+    assert repaired["Parking_Space"].isna().sum() == 0
+    # and the rerun on the result does nothing
+    assert pipeline.run(str(path), str(path), log=quiet)["changed"] is False
+
+
+def write_rooms_input(path, rooms):
+    # ID 150 repeats row 10 exactly, in the next partition
+    n = np.arange(ROWS)
+    ids = np.where(n == 150, 10, n)
+    pd.DataFrame({"ID": ids, "Rooms": rooms}).to_csv(path, index=False)
+
+
+def test_dedupe_across_partitions_with_int_and_nan_column(tmp_path):
+    src, out = tmp_path / "in.csv", tmp_path / "out.csv"
+    n = np.arange(ROWS)
+    rooms = pd.array(n % 5 + 1, dtype="Int64")
+    rooms[150] = rooms[10]
+    rooms[160] = pd.NA  # only partition 1 has a gap, so it alone would infer float
+    write_rooms_input(src, rooms)
+    pipeline = RepairPipeline([Dedupe()], partition_rows=PARTITION_ROWS)
+    report = pipeline.run(str(src), str(out), log=quiet)
+    assert report["rows"] == ROWS - 1
+    lines = out.read_text().splitlines()
+    assert not any(line.endswith(".0") for line in lines)
+    assert lines.count("10,1") == 1
+
+
+def test_column_that_stops_fitting_is_widened(tmp_path):
+    src, out = tmp_path / "in.csv", tmp_path / "out.csv"
+    rooms = (np.arange(ROWS) % 5 + 1).astype(object)
+    rooms[750] = 2.5
+    write_rooms_input(src, rooms)
+    messages = []
+    report = RepairPipeline([Dedupe()], partition_rows=PARTITION_ROWS).run(str(src), str(out), log=messages.append)
+    assert report["rows"] == ROWS - 1
+    assert any("Widened" in m for m in messages)
+    df = pd.read_csv(out)
+    assert df["Rooms"].dtype == np.float64 and df.loc[df["ID"] == 750, "Rooms"].item() == 2.5
+
+
+def test_columnar_copy_in_place_repairs_only_the_edited_partition(tmp_path):
+    pytest.importorskip("pyarrow")
+    from columnar_store import ensure_columnar
+
+    path = tmp_path / "final_data.csv"
+    write_input(path)
+    pipeline = make_pipeline()
+    messages = []
+    ensure_columnar(str(path))
+    pipeline.run(str(path), str(path), log=messages.append)
+    assert any("columnar copy" in m for m in messages)
+    df = pd.read_csv(path)
+    df.loc[550, "Parking_Space"] = np.nan
+    df.to_csv(path, index=False)
+    ensure_columnar(str(path))
+    report = pipeline.run(str(path), str(path), log=quiet)
+    assert (report["repaired"], report["skipped"]) == (1, 9)
+    assert pd.read_csv(path)["Parking_Space"].isna().sum() == 0
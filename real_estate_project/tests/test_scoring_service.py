@@ -0,0 +1,85 @@
+# tests/test_scoring_service.py
+import json
+import asyncio
+
+import pytest
+
+from scoring_service import MicroBatcher, encode_response, json_safe
+
+
+def score_batch(records):
+    if any(r.get("bad") for r in records):
+        raise ValueError("malformed record")
+    return [{"Future_Price_5Yrs_Pred": float(r["x"]) * 2} for r in records]
+
+
+def run_concurrently(records, batch_fn=score_batch):
+    async def main():
+        batcher = MicroBatcher(batch_fn, max_batch_size=len(records), max_wait_ms=50)
+        batcher.start()
+        try:
+            results = await asyncio.gather(*(batcher.submit(r) for r in records), return_exceptions=True)
+        finally:
+            await batcher.stop()
+        return results, batcher.stats
+
+    return asyncio.run(main())
+
+
+def test_records_are_coalesced_into_one_batch():
+    results, stats = run_concurrently([{"x": i} for i in range(5)])
+    assert results == [{"Future_Price_5Yrs_Pred": i * 2.0} for i in range(5)]
+    assert stats["batches"] == 1 and stats["max_batch"] == 5
+
+
+def test_malformed_record_fails_only_its_own_request():
+    records = [{"x": 1}, {"x": 2, "bad": True}, {"x": 3}]
+    results, stats = run_concurrently(records)
+    assert results[0] == {"Future_Price_5Yrs_Pred": 2.0}
+    assert isinstance(results[1], ValueError)
+    assert results[2] == {"Future_Price_5Yrs_Pred": 6.0}
+    assert stats["isolated_batches"] == 1 and stats["failed_records"] == 1
+
+
+def test_batcher_keeps_serving_after_a_failure():
+    async def main():
+        batcher = MicroBatcher(score_batch, max_batch_size=1, max_wait_ms=0)
+        batcher.start()
+        try:
+            with pytest.raises(ValueError):
+                await batcher.submit({"x": 1, "bad": True})
+            return await batcher.submit({"x": 4})
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(main()) == {"Future_Price_5Yrs_Pred": 8.0}
+
+
+def test_non_finite_values_become_null():
+    payload = [{"a": float("nan"), "b": float("inf"), "c": [1.5, float("-inf")], "d": "x"}]
+    assert json_safe(payload) == [{"a": None, "b": None, "c": [1.5, None], "d": "x"}]
+    body = encode_response(200, payload).split(b"\r\n\r\n", 1)[1]
+    assert json.loads(body) == [{"a": None, "b": None, "c": [1.5, None], "d": "x"}]
+
+
+@pytest.mark.parametrize("engine", ["sklearn", "numpy"])
+def test_naive_and_batched_paths_use_the_same_engine(synthetic_models, tmp_path, engine):
+    from model_registry import ModelRegistry
+    from scoring_core import ScoringCore
+
+    clf, reg, train_df = synthetic_models
+    models = {}
+    for name, model in (("reg.pkl", reg), ("clf.pkl", clf)):
+        path = tmp_path / name
+        path.write_bytes(name.encode())
+        models[str(path)] = model
+    train_df.head(500).to_csv(tmp_path / "final_data.csv", index=False)
+    registry = ModelRegistry(loader=lambda path: (models[path], None))
+    core = ScoringCore(str(tmp_path / "reg.pkl"), str(tmp_path / "clf.pkl"), str(tmp_path / "final_data.csv"),
+                       engine=engine, registry=registry).load()
+    records = train_df.drop(columns=["Future_Price_5Yrs", "Good_Investment"]).head(5).to_dict("records")
+    batched = core.score_records(records)
+    for record, expected in zip(records, batched):
+        naive = core.score_naive(record)
+        assert naive.keys() <= expected.keys()
+        assert naive == pytest.approx({k: expected[k] for k in naive}, rel=1e-9)
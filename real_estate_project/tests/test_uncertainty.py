@@ -0,0 +1,71 @@
+# tests/test_uncertainty.py
+import numpy as np
+import pytest
+
+from compact_forest import CompactForest
+from feature_schema import FeatureSchema
+from scoring import infer_feature_list_from_models
+from shared_inference import split_pipeline
+from synthetic_data import make_synthetic_properties
+from uncertainty import _merge_welford, _welford_over_trees, _as_tree_input, tree_prediction_stats
+
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+@pytest.fixture(scope="module")
+def forest_inputs(synthetic_models):
+    clf, reg, train_df = synthetic_models
+    df = make_synthetic_properties(300, seed=3)
+    features = infer_feature_list_from_models(train_df, reg, clf)
+    preprocessor, forest = split_pipeline(reg)
+    X = _as_tree_input(preprocessor.transform(FeatureSchema.from_processed(features, train_df).align(df)))
+    per_tree = np.stack([est.predict(X) for est in forest.estimators_])  # (trees, rows)
+    return forest, X, per_tree
+
+
+def rows_budget(rows, n_jobs):
+    """memory_budget_bytes giving Welford blocks of `rows` rows (several blocks per call)."""
+    return 8 * 3 * n_jobs * rows
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2, 3, 7])
+def test_welford_mean_and_std_match_numpy(forest_inputs, n_jobs):
+    forest, X, per_tree = forest_inputs
+    stats = tree_prediction_stats(forest.estimators_, X, n_jobs=n_jobs, memory_budget_bytes=rows_budget(64, n_jobs))
+    np.testing.assert_allclose(stats["mean"], per_tree.mean(axis=0), rtol=1e-10)
+    np.testing.assert_allclose(stats["std"], per_tree.std(axis=0), rtol=1e-8, atol=1e-9)
+    assert "quantiles" not in stats
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2, 5])
+def test_quantile_bands_match_numpy(forest_inputs, n_jobs):
+    forest, X, per_tree = forest_inputs
+    budget = 8 * len(forest.estimators_) * 50  # 50-row blocks
+    stats = tree_prediction_stats(forest.estimators_, X, quantiles=QUANTILES, n_jobs=n_jobs, memory_budget_bytes=budget)
+    expected = np.quantile(per_tree, QUANTILES, axis=0)
+    for q, values in zip(QUANTILES, expected):
+        np.testing.assert_allclose(stats["quantiles"][q], values, rtol=1e-12)
+    np.testing.assert_allclose(stats["std"], per_tree.std(axis=0), rtol=1e-10, atol=1e-12)
+
+
+def test_tree_matrix_matches_per_tree_loop(forest_inputs):
+    forest, X, _ = forest_inputs
+    compact = CompactForest.from_sklearn(forest)
+    per_tree = compact.tree_predictions(X).astype(np.float64)
+    stats = tree_prediction_stats(compact.estimators_, X, quantiles=QUANTILES, tree_matrix=compact.tree_predictions)
+    np.testing.assert_allclose(stats["mean"], per_tree.mean(axis=0), rtol=1e-10)
+    np.testing.assert_allclose(stats["std"], per_tree.std(axis=0), rtol=1e-8, atol=1e-9)
+    np.testing.assert_allclose(stats["quantiles"][0.9], np.quantile(per_tree, 0.9, axis=0), rtol=1e-12)
+
+
+def test_chan_merge_equals_one_pass(forest_inputs):
+    forest, X, per_tree = forest_inputs
+    trees = forest.estimators_
+    whole = _welford_over_trees(trees, X)
+    for cut in (1, 7, len(trees) - 1):
+        merged = _merge_welford(_welford_over_trees(trees[:cut], X), _welford_over_trees(trees[cut:], X))
+        assert merged[0] == whole[0] == len(trees)
+        np.testing.assert_allclose(merged[1], whole[1], rtol=1e-12)
+        np.testing.assert_allclose(merged[2], whole[2], rtol=1e-9, atol=1e-9)
+    empty = (0, None, None)
+    assert _merge_welford(empty, whole) is whole and _merge_welford(whole, empty) is whole
@@ -0,0 +1,140 @@
+# uncertainty.py
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+DEFAULT_QUANTILES = (0.1, 0.9)
+# Upper bound for the per-tree scratch arrays held at any one time
+DEFAULT_MEMORY_BUDGET_BYTES = 256 * 1024 * 1024
+
+
+def _as_tree_input(X):
+    """Convert once to the dtype/layout sklearn trees use, so each tree can skip input validation."""
+    # a scipy sparse input means scipy.sparse is already imported; don't import it just to check
+    sp = sys.modules.get("scipy.sparse")
+    if sp is not None and sp.issparse(X):
+        return sp.csr_matrix(X, dtype=np.float32)
+    return np.ascontiguousarray(np.asarray(X), dtype=np.float32)
+
+
+def _tree_predict(est, X):
+    try:
+        pred = est.predict(X, check_input=False)
+    except TypeError:
+        pred = est.predict(X)
+    return np.asarray(pred, dtype=np.float64).reshape(len(pred), -1)[:, 0]
+
+
+def _welford_over_trees(trees, X):
+    """Online mean/M2 over a subset of trees: O(n_rows) memory regardless of how many trees."""
+    count = 0
+    mean = np.zeros(X.shape[0], dtype=np.float64)
+    m2 = np.zeros(X.shape[0], dtype=np.float64)
+    for est in trees:
+        pred = _tree_predict(est, X)
+        count += 1
+        delta = pred - mean
+        mean += delta / count
+        m2 += delta * (pred - mean)
+    return count, mean, m2
+
+
+def _merge_welford(a, b):
+    """Chan et al. parallel merge of two (count, mean, M2) accumulators."""
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    if n_a == 0:
+        return b
+    if n_b == 0:
+        return a
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    mean = mean_a + delta * (n_b / n)
+    m2 = m2_a + m2_b + delta * delta * (n_a * n_b / n)
+    return n, mean, m2
+
+
+def _split(seq, n_parts):
+    size, rem = divmod(len(seq), n_parts)
+    parts, start = [], 0
+    for i in range(n_parts):
+        stop = start + size + (1 if i < rem else 0)
+        if stop > start:
+            parts.append(seq[start:stop])
+        start = stop
+    return parts
+
+
+def tree_prediction_stats(estimators, X, quantiles=None, n_jobs=None,
+                          memory_budget_bytes=DEFAULT_MEMORY_BUDGET_BYTES, tree_matrix=None):
+    """
+    Mean and std (ddof=0) of the per-tree predictions for every row of X, optionally with quantiles.
+
+    Trees are spread over a thread pool (sklearn trees release the GIL while predicting, and
+    threads share the forest instead of copying it into each worker). Rows are processed in
+    blocks sized to memory_budget_bytes:
+    - without quantiles each worker keeps Welford accumulators, so memory is O(workers x rows)
+      instead of O(trees x rows);
+    - with quantiles a (trees x block) matrix is needed, so the block is shrunk to fit the budget.
+
+    tree_matrix(X_block) -> (trees x block) replaces the per-tree loop when all trees can be
+    evaluated in one call (CompactForest.tree_predictions); blocks are then sized as for quantiles.
+
+    Returns {"mean": array, "std": array} plus {"quantiles": {q: array}} when requested.
+    """
+    estimators = list(estimators)
+    if not estimators:
+        raise ValueError("No estimators to evaluate")
+    X = _as_tree_input(X)
+    n_rows, n_trees = X.shape[0], len(estimators)
+    n_workers = max(1, min(n_jobs or os.cpu_count() or 1, n_trees))
+    quantiles = tuple(quantiles) if quantiles else ()
+
+    if quantiles or tree_matrix is not None:
+        block_rows = memory_budget_bytes // (8 * n_trees)
+    else:
+        # per worker: mean, M2 and one prediction vector
+        block_rows = memory_budget_bytes // (8 * 3 * n_workers)
+    block_rows = int(max(1, min(n_rows, block_rows)))
+
+    mean = np.empty(n_rows, dtype=np.float64)
+    std = np.empty(n_rows, dtype=np.float64)
+    q_out = {q: np.empty(n_rows, dtype=np.float64) for q in quantiles}
+    tree_groups = _split(estimators, n_workers)
+    tree_index_groups = _split(list(range(n_trees)), n_workers)
+
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        for start in range(0, n_rows, block_rows):
+            stop = min(n_rows, start + block_rows)
+            X_block = X[start:stop]
+            if quantiles or tree_matrix is not None:
+                if tree_matrix is not None:
+                    preds = np.asarray(tree_matrix(X_block), dtype=np.float64)
+                else:
+                    preds = np.empty((n_trees, stop - start), dtype=np.float64)
+
+                    def fill(idx):
+                        for i in idx:
+                            preds[i] = _tree_predict(estimators[i], X_block)
+
+                    list(pool.map(fill, tree_index_groups))
+                mean[start:stop] = preds.mean(axis=0)
+                std[start:stop] = preds.std(axis=0)
+                if quantiles:
+                    for q, values in zip(quantiles, np.quantile(preds, quantiles, axis=0)):
+                        q_out[q][start:stop] = values
+                del preds
+            else:
+                acc = (0, None, None)
+                for part in pool.map(lambda trees: _welford_over_trees(trees, X_block), tree_groups):
+                    acc = _merge_welford(acc, part)
+                count, block_mean, block_m2 = acc
+                mean[start:stop] = block_mean
+                std[start:stop] = np.sqrt(np.maximum(block_m2 / count, 0.0))
+
+    result = {"mean": mean, "std": std}
+    if quantiles:
+        result["quantiles"] = q_out
+    return result
@@ -0,0 +1,77 @@
+# whatif.py
+import time
+
+import numpy as np
+import pandas as pd
+
+from shared_inference import score_shared
+from batch_stream import add_scored_columns
+from uncertainty import DEFAULT_QUANTILES
+
+SWEEP_FEATURES = ("Size_in_SqFt", "BHK", "Floor_No", "Year_Built")
+INTEGER_FEATURES = {"BHK", "Floor_No", "Year_Built"}
+DEFAULT_POINTS = 25
+# value range taken from the processed data (percentiles), so sweeps stay where the models saw data
+RANGE_QUANTILES = (0.01, 0.99)
+# without processed data: +-50% around the entered value
+FALLBACK_SPAN = 0.5
+
+
+def sweep_values(feature, base_value, processed_df=None, n_points=DEFAULT_POINTS):
+    """
+    Evenly spaced values for one feature over the processed data's 1st-99th percentile range,
+    widened to include base_value, rounded (integer features to whole numbers) and deduplicated.
+    """
+    base_value = float(base_value)
+    lo = hi = None
+    if processed_df is not None and feature in processed_df.columns:
+        col = pd.to_numeric(processed_df[feature], errors="coerce").dropna()
+        if len(col):
+            lo, hi = (float(v) for v in col.quantile(list(RANGE_QUANTILES)))
+    if lo is None:
+        span = abs(base_value) * FALLBACK_SPAN or 1.0
+        lo, hi = base_value - span, base_value + span
+    lo, hi = min(lo, base_value), max(hi, base_value)
+    values = np.linspace(lo, hi, max(2, int(n_points)))
+    # readable axis labels; rounding can merge neighbours on narrow ranges
+    return np.unique(np.round(values, 0 if feature in INTEGER_FEATURES else 1))
+
+
+def build_grid(X_base, axes):
+    """
+    Full grid of variants of a one-row aligned frame: every combination of the `axes`
+    ({feature: values}) with all other features as in X_base. Returns (X_grid, grid) where
+    grid holds just the swept columns; both are built with array ops, not per-variant rows.
+    """
+    missing = [f for f in axes if f not in X_base.columns]
+    if missing:
+        raise ValueError(f"Features not used by the models: {missing}")
+    names = list(axes)
+    mesh = np.meshgrid(*[np.asarray(axes[f], dtype=np.float64) for f in names], indexing="ij")
+    n_points = mesh[0].size
+    grid = pd.DataFrame({f: m.ravel() for f, m in zip(names, mesh)})
+    X_grid = X_base.iloc[np.zeros(n_points, dtype=np.intp)].reset_index(drop=True)
+    X_grid = X_grid.assign(**{f: grid[f].to_numpy() for f in names})
+    return X_grid, grid
+
+
+def run_sweep(X_base, axes, clf_model=None, reg_model=None, engine="sklearn", quantiles=DEFAULT_QUANTILES,
+              scorer=score_shared):
+    """
+    Score every grid point in one batched call (one encode, one pass per forest, per-tree bands).
+    Returns (grid with prediction columns, stats) where stats has points and per-stage seconds.
+    """
+    t0 = time.perf_counter()
+    X_grid, grid = build_grid(X_base, axes)
+    t1 = time.perf_counter()
+    scored = scorer(X_grid, clf_model, reg_model, with_uncertainty=True, quantiles=quantiles, engine=engine)
+    t2 = time.perf_counter()
+    add_scored_columns(grid, scored)
+    stats = {
+        "points": len(grid),
+        "build_seconds": t1 - t0,
+        "score_seconds": t2 - t1,
+        "seconds": time.perf_counter() - t0,
+        "timings": scored["timings"],
+    }
+    return grid, stats